@@ -12,6 +12,9 @@ setup(
             'pytest-cov>=2.0',
             'pytest-mock>=3.0',
         ],
+        'arrow': [
+            'pyarrow>=8.0',
+        ],
     },
     entry_points={
         'console_scripts': [
@@ -1,19 +1,50 @@
 # src/analyzer/generic_analyzer.py
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from src.db.base_table_handler import BaseTableHandler
+from src.db.connection import ConnectionManager
+from src.db.time_filter import TimeFilter
+from src.utils.columnar import ColumnarResult
 import json
+import os
+import queue
 import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from constants import *
-import pandas as pd
 
 SECTION_NAME_CON = '-'
+# Table kind compared across arenas by 'arena_pattern' analyses
+ARENA_COMPARISON_KIND = 'overall'
+# Stands in for the table name in compiled query templates
+TABLE_PLACEHOLDER = '{table}'
+# Fused scans share one aggregation between analyses; SQLite 3.35+ can be
+# told to compute it once even though every analysis reads it
+FUSED_CTE_HINT = 'MATERIALIZED ' if sqlite3.sqlite_version_info >= (3, 35, 0) else ''
+# Metric operations whose per-snapshot partials can be merged (see aggregate_source)
+MERGEABLE_OPERATIONS = {'sum', 'count', 'min', 'max', 'avg'}
+# Stats tables hold one row per snapshot and key, so an aggregation grouped by
+# one of these is about as large as the table and not worth rolling up from
+SNAPSHOT_COLUMNS = {'timestamp', 'metadata_id'}
+
 class GenericAnalyzer(BaseTableHandler):
-    def __init__(self, db_path: str, schema_path: str, config: dict):
-        super().__init__(db_path, schema_path)
+    def __init__(self, db_path: str, schema_path: str, config: dict, connection: Optional[ConnectionManager] = None):
+        super().__init__(db_path, schema_path, connection)
         self.analyzer_config = config['analyses']
         self.current_analysis = None  # Add this line
+        # Compiled analysis clauses and per-schema-shape query templates
+        self._compiled: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+        self._query_templates: Dict[Tuple[str, bool, Tuple[str, ...], Optional[Tuple]], str] = {}
+        self._fused_templates: Dict[Tuple[Tuple[str, ...], bool, Tuple[str, ...], Optional[Tuple]], str] = {}
+        # Per-table queries run on up to this many connections at once
+        self.jobs = config.get('jobs') or os.cpu_count() or 1
+
+    def analyze(self, analysis_name: str, timestamp=None, over_time: bool = False) -> Dict[str, Any]:
+        """Results of an analysis per matching table; timestamp is a snapshot timestamp or a TimeFilter.
 
-    def analyze(self, analysis_name: str, timestamp=None) -> Dict[str, Any]:
+        With over_time=True the groups are also split by snapshot: rows are
+        (timestamp, groupby..., metrics...) ordered by timestamp, computed in
+        one query per table (see ColumnarResult.cube()).
+        """
         self.current_analysis = analysis_name  # Set current analysis name
         config = self.analyzer_config.get(analysis_name)
         if not config:
@@ -21,11 +52,34 @@ class GenericAnalyzer(BaseTableHandler):
 
         # Check if this is a special arena comparison analysis
         if config.get('special') == 'arena_pattern':
-            return self._analyze_arena_comparison(config)
+            return ColumnarResult.from_result(self._analyze_arena_comparison(config, timestamp))
+
+        return self._run_queries(self._analysis_queries(analysis_name, config, timestamp, over_time))
+
+    def stream(self, analysis_name: str, timestamp=None, over_time: bool = False) -> Iterator[Dict[str, Any]]:
+        """Like analyze(), but one table at a time, with 'data' a lazy StreamingResult.
+
+        Each table's query runs when the previous result has been consumed,
+        and its rows are fetched `arraysize` at a time.
+        """
+        self.current_analysis = analysis_name
+        config = self.analyzer_config.get(analysis_name)
+        if not config:
+            raise ValueError(f"No configuration found for analysis: {analysis_name}")
+        if config.get('special') == 'arena_pattern':
+            yield self._analyze_arena_comparison(config, timestamp)
+            return
+        for query, params in self._analysis_queries(analysis_name, config, timestamp, over_time):
+            result = self.stream_query(query, params)
+            yield {'columns': result.columns, 'data': result}
 
+    def _analysis_queries(self, analysis_name: str, config: Dict[str, Any], timestamp=None,
+                          over_time: bool = False) -> List[Tuple[str, tuple]]:
+        """(query, params) of an analysis for each table it matches"""
+        time_filter = TimeFilter.of(timestamp)
         table_pattern = config['table']
         matching_tables = self._get_matching_tables(table_pattern)
-        results = []
+        queries = []
         if not matching_tables:
                 available_tables = self.list_available_tables()
                 error_msg = f"No tables found matching the pattern '{table_pattern}'\n"
@@ -39,148 +93,463 @@ class GenericAnalyzer(BaseTableHandler):
 
             # table = matching_tables[0]
             schema = self._get_schema_for_table(table)
-            query = self._build_query(table, config['metrics'], config.get('groupby', []), schema, timestamp)
-            with self._get_cursor() as cursor:
-                cursor.execute(query)
-                columns = [description[0] for description in cursor.description]
-                rows = cursor.fetchall()
-
-            results.append({
-                'columns': columns,
-                'data': rows
-            })
+            if self.checkpoints is not None and time_filter is None and not over_time \
+                    and self._is_mergeable(config['metrics']):
+                query, params = self._build_incremental_query(analysis_name, table, config, schema)
+            else:
+                query, params = self._build_query(analysis_name, table, schema, time_filter, over_time)
+            queries.append((query, params))
+        return queries
+
+    def analyze_fused(self, analysis_names: List[str], timestamp=None,
+                      over_time: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        """Results of the analyses that can share their table scans, keyed by analysis name.
+
+        Analyses that read the same tables with the same row filters are
+        evaluated together: one aggregation per table, at the union of their
+        GROUP BY columns, computes the metrics of all of them. Analyses
+        grouped more coarsely roll their groups up from it (see
+        _fusion_clusters and _build_fused_query), then each analysis' HAVING
+        and sort are applied to its share of the groups. Analyses that cannot
+        be fused, or have no partner, are left out for analyze() to run.
+        """
+        time_filter = TimeFilter.of(timestamp)
+        groups: Dict[Tuple, List[str]] = {}
+        for name in analysis_names:
+            key = self._fusion_key(name, time_filter, over_time)
+            if key is not None:
+                groups.setdefault(key, []).append(name)
+
+        results = {}
+        for (tables, _), members in groups.items():
+            # Analyses whose columns are missing are left to analyze() to report
+            schemas = {table: self._get_schema_for_table(table) for table in tables}
+            members = [name for name in members if self._fits_tables(name, schemas, time_filter, over_time)]
+            for names in self._fusion_clusters(members, over_time):
+                if len(names) < 2:
+                    continue
+                queries = [self._build_fused_query(names, table, schemas[table], time_filter, over_time)
+                           for table in tables]
+                fused = self._run_queries(queries)
+                for i, name in enumerate(names):
+                    results[name] = [self._split_fused_result(result, i, name, over_time) for result in fused]
         return results
 
-    def _build_query(self, table: str, metrics: List[Dict[str, str]], groupby: List[str], schema: Dict[str, Any], timestamp = None) -> str:
-        select_clauses = []
-        where_clauses = []
-        having_clauses = []
-        
-        for metric in metrics:
+    def _fusion_key(self, analysis_name: str, time_filter: Optional[TimeFilter] = None,
+                    over_time: bool = False) -> Optional[Tuple]:
+        """(tables, row filters) of an analysis that can join a fused scan, else None"""
+        config = self.analyzer_config.get(analysis_name)
+        if not config or config.get('special') == 'arena_pattern':
+            return None
+        if self.checkpoints is not None and time_filter is None and not over_time \
+                and self._is_mergeable(config.get('metrics', [])):
+            return None  # answered from checkpointed partials instead
+        try:
+            compiled = self._compile_analysis(analysis_name, over_time)
+        except (KeyError, TypeError):
+            return None
+        groupby = compiled['groupby']
+        outputs = set(groupby) | {name for _, name in compiled['metrics']}
+        # Fused results can only be sorted by columns they return
+        if not groupby or any(by not in outputs for by, _ in compiled['sort']):
+            return None
+        tables = tuple(self._get_matching_tables(config['table']))
+        if not tables:
+            return None
+        return tables, tuple(sorted(compiled['where']))
+
+    def _fusion_clusters(self, analysis_names: List[str], over_time: bool = False) -> List[List[str]]:
+        """Analyses of one fusion key split into the sets that can share an aggregation.
+
+        Analyses whose metrics all have mergeable partials (see _rolls_up)
+        can be computed from an aggregation grouped by a superset of their
+        GROUP BY; the others, and those grouped per snapshot, need one
+        grouped exactly like them.
+        """
+        fixed: Dict[frozenset, List[str]] = {}
+        rolling = []
+        for name in analysis_names:
+            compiled = self._compile_analysis(name, over_time)
+            grouping = frozenset(compiled['groupby'])
+            if self._rolls_up(compiled) and not grouping & SNAPSHOT_COLUMNS:
+                rolling.append(name)
+            else:
+                fixed.setdefault(grouping, []).append(name)
+        clusters = list(fixed.values())
+        shared = []
+        for name in rolling:
+            groupby = set(self._compile_analysis(name, over_time)['groupby'])
+            covering = next((names for grouping, names in fixed.items()
+                             if groupby <= grouping and not grouping & SNAPSHOT_COLUMNS), None)
+            (covering if covering is not None else shared).append(name)
+        if shared:
+            clusters.append(shared)
+        return clusters
+
+    @staticmethod
+    def _rolls_up(compiled: Dict[str, Any]) -> bool:
+        """Whether an analysis' metrics can be merged from the partials of finer groups"""
+        return all(operation in MERGEABLE_OPERATIONS and not operand.lstrip().lower().startswith('distinct')
+                   for operation, operand in compiled['operands'])
+
+    def _fits_tables(self, analysis_name: str, schemas: Dict[str, Dict[str, Any]],
+                     time_filter: Optional[TimeFilter] = None, over_time: bool = False) -> bool:
+        try:
+            for table, schema in schemas.items():
+                self._query_template(analysis_name, table, schema, time_filter, over_time)
+        except ValueError:
+            return False
+        return True
+
+    def _build_fused_query(self, analysis_names: List[str], table: str, schema: Dict[str, Any],
+                           time_filter: Optional[TimeFilter] = None, over_time: bool = False) -> Tuple[str, tuple]:
+        """One query computing several analyses from a single aggregation of a table.
+
+        The table is aggregated once, grouped by every column any of the
+        analyses groups by. Analyses with that grouping read their metrics
+        straight from it; the others GROUP BY their own columns over it,
+        merging per-group partials like _build_incremental_query does (SUM,
+        MIN and MAX of themselves, COUNT as SUM, AVG from SUM and COUNT).
+
+        Rows come back tagged with the analysis index and the row's position
+        in that analysis' sort order (see _split_fused_result).
+        """
+        shape = tuple(col['name'] for col in schema['columns'])
+        key = (tuple(analysis_names), over_time, shape, time_filter.shape if time_filter else None)
+        template = self._fused_templates.get(key)
+        if template is None:
+            compiled = [self._compile_analysis(name, over_time) for name in analysis_names]
+            grouping = []
+            for analysis in compiled:
+                grouping += [by for by in analysis['groupby'] if by not in grouping]
+            # Aggregates used by several analyses are computed once
+            aliases = {}
+            def alias(aggregate):
+                return aliases.setdefault(aggregate, f"_fused{len(aliases)}")
+
+            width = max(len(analysis['groupby']) + len(analysis['metrics']) for analysis in compiled)
+            branches = []
+            for i, analysis in enumerate(compiled):
+                groupby = analysis['groupby']
+                if set(groupby) == set(grouping):
+                    metrics = [f"{alias(aggregate)} AS {name}" for aggregate, name in analysis['metrics']]
+                    source = "fused"
+                else:
+                    metrics = []
+                    for (operation, operand), (_, name) in zip(analysis['operands'], analysis['metrics']):
+                        if operation == 'avg':
+                            partial_sum, partial_count = alias(f"sum({operand})"), alias(f"count({operand})")
+                            metrics.append(f"CAST(SUM({partial_sum}) AS REAL) / NULLIF(SUM({partial_count}), 0) AS {name}")
+                        else:
+                            merge = 'sum' if operation == 'count' else operation
+                            metrics.append(f"{merge.upper()}({alias(f'{operation}({operand})')}) AS {name}")
+                    source = f"fused GROUP BY {', '.join(groupby)}"
+                order = [f"{by} {direction}" for by, direction in analysis['sort']] + list(groupby)
+                padding = ''.join(', NULL' for _ in range(width - len(groupby) - len(metrics)))
+                branch = (f"SELECT {i}, ROW_NUMBER() OVER (ORDER BY {', '.join(order)}), *{padding} "
+                          f"FROM (SELECT {', '.join(list(groupby) + metrics)} FROM {source})")
+                if analysis['having']:
+                    branch += f" WHERE {' AND '.join(analysis['having'])}"
+                branches.append(branch)
+
+            where_clauses = list(compiled[0]['where'])
+            if time_filter:
+                where_clauses.append(self._timestamp_condition(table, shape, time_filter))
+            fused = (f'SELECT {", ".join(grouping)}, '
+                     f'{", ".join(f"{aggregate} AS {name}" for aggregate, name in aliases.items())} '
+                     f'FROM "{TABLE_PLACEHOLDER}"')
+            if where_clauses:
+                fused += f" WHERE {' AND '.join(where_clauses)}"
+            fused += f" GROUP BY {', '.join(grouping)}"
+            template = f"WITH fused AS {FUSED_CTE_HINT}({fused}) {' UNION ALL '.join(branches)} ORDER BY 1, 2"
+            self._fused_templates[key] = template
+        query = template.replace(TABLE_PLACEHOLDER, self.resolve_table(table))
+        return query, (time_filter.params if time_filter else ())
+
+    def _split_fused_result(self, result: Dict[str, Any], index: int, analysis_name: str,
+                            over_time: bool = False) -> Dict[str, Any]:
+        """The rows of one analysis from a fused result, shaped like analyze() returns them"""
+        compiled = self._compile_analysis(analysis_name, over_time)
+        columns = list(compiled['groupby']) + [name for _, name in compiled['metrics']]
+        end = 2 + len(columns)
+        return ColumnarResult(columns, [tuple(row[2:end]) for row in result['data'] if row[0] == index])
+
+    def _run_queries(self, queries: List[Tuple[str, tuple]]) -> List[Dict[str, Any]]:
+        """Execute the per-table queries, in parallel when more than one job is allowed.
+
+        Queries are spread over up to `jobs` read-only connections (SQLite
+        releases the GIL while it executes); results keep the input order.
+        """
+        jobs = min(self.jobs, len(queries))
+        if jobs <= 1:
+            return [self._fetch_result(self.conn, query, params) for query, params in queries]
+
+        readers = queue.Queue()
+        for reader in self.connection.readers(jobs):
+            readers.put(reader)
+
+        def run(item):
+            reader = readers.get()
+            try:
+                return self._fetch_result(reader, *item)
+            finally:
+                readers.put(reader)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(run, queries))
+
+    @staticmethod
+    def _fetch_result(conn, query: str, params: tuple) -> Dict[str, Any]:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            return ColumnarResult([description[0] for description in cursor.description], cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def _compile_analysis(self, analysis_name: str, over_time: bool = False) -> Dict[str, Any]:
+        """Table-independent clauses of a configured analysis, built once and cached.
+
+        The over_time variant groups and sorts by timestamp first, so every
+        snapshot gets its own groups.
+        """
+        compiled = self._compiled.get((analysis_name, over_time))
+        if compiled is not None:
+            return compiled
+        if over_time:
+            compiled = dict(self._compile_analysis(analysis_name))
+            compiled['columns'] = ['timestamp'] + compiled['columns']
+            compiled['groupby'] = ['timestamp'] + [by for by in compiled['groupby'] if by != 'timestamp']
+            compiled['sort'] = [('timestamp', 'ASC')] + [key for key in compiled['sort'] if key[0] != 'timestamp']
+            compiled['order_by'] = f" ORDER BY {', '.join(f'{by} {order}' for by, order in compiled['sort'])}"
+            self._compiled[(analysis_name, over_time)] = compiled
+            return compiled
+        config = self.analyzer_config[analysis_name]
+        compiled = {'metrics': [], 'operands': [], 'where': [], 'having': [], 'columns': [],
+                    'groupby': config.get('groupby', []), 'sort': self._sort_keys(config), 'order_by': self._order_by_clause(config)}
+        for metric in config['metrics']:
             if metric['operation'] == 'expression':
                 formula = metric['formula']
-                row_op = formula['row_operation']
-                agg = formula['aggregation']
-                
                 if 'filter' in formula:
-                    where_clauses.append(formula['filter'])
+                    compiled['where'].append(formula['filter'])
                 if 'having' in formula:
-                    having_clauses.append(f"{metric['name']} {formula['having']}")
-                    
-                select_clauses.append(f"{agg}({row_op}) as {metric['name']}")
+                    compiled['having'].append(f"{metric['name']} {formula['having']}")
+                compiled['metrics'].append((f"{formula['aggregation']}({formula['row_operation']})", metric['name']))
+                compiled['operands'].append((formula['aggregation'].lower(), formula['row_operation']))
             else:
-                column = metric['column']
-                if column not in [col['name'] for col in schema['columns']]:
-                    raise ValueError(f"Column '{column}' not found in schema for table '{table}'")
-                select_clauses.append(f"{metric['operation']}({column}) as {metric['name']}")
-        if timestamp:
-            print(f"Timestamp: {timestamp}")
-            where_clauses.append(f"m.timestamp = '{timestamp}'")
-        query = f'SELECT {", ".join(groupby)}, {", ".join(select_clauses)} FROM "{table}"'
+                compiled['columns'].append(metric['column'])
+                compiled['metrics'].append((f"{metric['operation']}({metric['column']})", metric['name']))
+                compiled['operands'].append((metric['operation'].lower(), metric['column']))
+        compiled['select'] = [f"{aggregate} as {name}" for aggregate, name in compiled['metrics']]
+        self._compiled[(analysis_name, over_time)] = compiled
+        return compiled
+
+    def _query_template(self, analysis_name: str, table: str, schema: Dict[str, Any],
+                        time_filter: Optional[TimeFilter] = None, over_time: bool = False) -> str:
+        """Parameterized SQL of an analysis for one schema shape, with TABLE_PLACEHOLDER for the table.
+
+        Tables that share their columns share the template, and identical
+        SQL text lets the connection's statement cache reuse the prepared
+        statement across snapshots.
+        """
+        shape = tuple(col['name'] for col in schema['columns'])
+        key = (analysis_name, over_time, shape, time_filter.shape if time_filter else None)
+        template = self._query_templates.get(key)
+        if template is not None:
+            return template
+
+        compiled = self._compile_analysis(analysis_name, over_time)
+        for column in compiled['columns']:
+            if column not in shape:
+                raise ValueError(f"Column '{column}' not found in schema for table '{table}'")
+        where_clauses = list(compiled['where'])
+        if time_filter:
+            where_clauses.append(self._timestamp_condition(table, shape, time_filter))
+        groupby = compiled['groupby']
+        template = f'SELECT {", ".join(groupby)}, {", ".join(compiled["select"])} FROM "{TABLE_PLACEHOLDER}"'
         
         if where_clauses:
-            query += f" WHERE {' AND '.join(where_clauses)}"
+            template += f" WHERE {' AND '.join(where_clauses)}"
             
         if groupby:
-            query += f" GROUP BY {', '.join(groupby)}"
+            template += f" GROUP BY {', '.join(groupby)}"
             
-        if having_clauses:
-            query += f" HAVING {' AND '.join(having_clauses)}"
+        if compiled['having']:
+            template += f" HAVING {' AND '.join(compiled['having'])}"
 
         # Add ORDER BY clause if sort is specified
-        if self.current_analysis and 'sort' in self.analyzer_config[self.current_analysis]:
-            sort_config = self.analyzer_config[self.current_analysis]['sort']
-            if isinstance(sort_config, list):
-                sort_clauses = [f"{sort['by']} {sort['order'].upper()}" for sort in sort_config]
-                query += f" ORDER BY {', '.join(sort_clauses)}"
+        template += compiled['order_by']
+
+        self._query_templates[key] = template
+        return template
+
+    @staticmethod
+    def _timestamp_condition(table: str, shape: Tuple[str, ...], time_filter: TimeFilter) -> str:
+        """WHERE condition selecting the filtered snapshots, its values bound as ?"""
+        condition = time_filter.table_condition(f'"{TABLE_PLACEHOLDER}"', shape)
+        if condition is None:
+            raise ValueError(f"Table '{table}' has no timestamp or metadata_id column to filter by")
+        return condition
+
+    def _build_query(self, analysis_name: str, table: str, schema: Dict[str, Any], timestamp=None,
+                     over_time: bool = False) -> Tuple[str, tuple]:
+        """SQL and parameters of an analysis for one table"""
+        time_filter = TimeFilter.of(timestamp)
+        template = self._query_template(analysis_name, table, schema, time_filter, over_time)
+        query = template.replace(TABLE_PLACEHOLDER, self.resolve_table(table))
+        return query, (time_filter.params if time_filter else ())
+
+    @staticmethod
+    def _sort_keys(config: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """(column, ASC/DESC) of the configured sort, single or list form"""
+        sort_config = config.get('sort', [])
+        if not isinstance(sort_config, list):
+            sort_config = [sort_config]
+        return [(sort['by'], sort['order'].upper()) for sort in sort_config]
+
+    def _order_by_clause(self, config: Dict[str, Any]) -> str:
+        sort_keys = self._sort_keys(config)
+        if not sort_keys:
+            return ""
+        return f" ORDER BY {', '.join(f'{by} {order}' for by, order in sort_keys)}"
+
+    @staticmethod
+    def _metric_operation(metric: Dict[str, Any]) -> str:
+        if metric['operation'] == 'expression':
+            return metric['formula']['aggregation'].lower()
+        return metric['operation'].lower()
+
+    def _is_mergeable(self, metrics: List[Dict[str, Any]]) -> bool:
+        return all(self._metric_operation(metric) in MERGEABLE_OPERATIONS for metric in metrics)
+
+    def _build_incremental_query(self, analysis_name: str, table: str, config: Dict[str, Any],
+                                 schema: Dict[str, Any]) -> Tuple[str, tuple]:
+        """Same result as _build_query, computed from checkpointed partial aggregates.
+
+        Each metric becomes a mergeable partial (AVG is split into SUM and
+        COUNT); the final values, HAVING filters and sort are applied on top
+        of the merged groups.
+        """
+        groupby = config.get('groupby', [])
+        column_names = [col['name'] for col in schema['columns']]
+        partials, selects, filters, having = [], [], [], []
+        for metric in config['metrics']:
+            name, operation = metric['name'], self._metric_operation(metric)
+            if metric['operation'] == 'expression':
+                formula = metric['formula']
+                operand = formula['row_operation']
+                if 'filter' in formula:
+                    filters.append(formula['filter'])
+                if 'having' in formula:
+                    having.append(f"{name} {formula['having']}")
+            else:
+                operand = metric['column']
+                if operand not in column_names:
+                    raise ValueError(f"Column '{operand}' not found in schema for table '{table}'")
+            if operation == 'avg':
+                partials.append((f"{name}__sum", f"SUM({operand})", 'sum'))
+                partials.append((f"{name}__count", f"COUNT({operand})", 'sum'))
+                selects.append(f"CAST({name}__sum AS REAL) / NULLIF({name}__count, 0) as {name}")
             else:
-                query += f" ORDER BY {sort_config['by']} {sort_config['order'].upper()}"
+                merge = 'sum' if operation == 'count' else operation
+                partials.append((name, f"{operation.upper()}({operand})", merge))
+                selects.append(name)
 
-        return query
+        where = ' AND '.join(filters) if filters else None
+        source, params = self.aggregate_source(analysis_name, table, groupby, partials, where)
+        query = f"SELECT * FROM (SELECT {', '.join(list(groupby) + selects)} FROM ({source}))"
+        if having:
+            query += f" WHERE {' AND '.join(having)}"
+        order_by = self._order_by_clause(config)
+        if not order_by and groupby:
+            # Keep GROUP BY's order for unsorted analyses
+            order_by = f" ORDER BY {', '.join(groupby)}"
+        return query + order_by, params
 
     def list_available_tables(self, prefix=None):
         """
         List all tables in the database, optionally filtered by prefix
         """
-        with self._get_cursor() as cursor:
-            if prefix:
-                # Use SQL LIKE for prefix matching
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ? ORDER BY name", (f'{prefix}%',))
-            else:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-            return [row[0] for row in cursor.fetchall()]
+        return self.catalog.list_tables(prefix)
+
+    def source_tables(self, analysis_name: str, timestamp=None) -> List[str]:
+        """Tables an analysis reads, including the derived copies it would read instead"""
+        config = self.analyzer_config[analysis_name]
+        if config.get('special') == 'arena_pattern':
+            tables = [table for _, table in self.catalog.arena_kind_tables(ARENA_COMPARISON_KIND)]
+            consolidated = self.resolve_arena_table(ARENA_COMPARISON_KIND)
+            tables += [consolidated] if consolidated else []
+        else:
+            tables = self._get_matching_tables(config['table'])
+            derived = [self.resolve_table(table) for table in tables]
+            tables += [name for name in derived if name not in tables]
+        if timestamp and self.catalog.has_table('je_metadata'):
+            tables.append('je_metadata')
+        return tables
 
     def _get_matching_tables(self, table_pattern: str) -> List[str]:
-        available_tables = self.list_available_tables()
-        # print(f"Available tables: {table_pattern}{available_tables}")
-        # Convert the pattern to a regex
-        # regex_pattern = '^' + table_pattern.replace('*', '.*') + '$'
-        pattern = re.compile(table_pattern)
-        
-        matching_tables = [t for t in available_tables if pattern.match(t)]
-        return matching_tables
+        return self.catalog.match(table_pattern, how='match')
 
     def _get_schema_for_table(self, table_name: str) -> Dict[str, Any]:
-        for schema_pattern, schema in self.schemas.items():
-            if re.match('^' + schema_pattern + '$', table_name):
-                return schema
-        raise ValueError(f"No schema found for table: {table_name}")
+        return self.schemas.resolve(table_name)
         
-    def _analyze_arena_comparison(self, config: Dict) -> Dict[str, Any]:
-        """Special handler for arena comparison analysis"""
+    def _analyze_arena_comparison(self, config: Dict, timestamp=None) -> Dict[str, Any]:
+        """Special handler for arena comparison analysis; timestamp is a snapshot timestamp or a TimeFilter.
+
+        'data' is a StreamingResult: rows are fetched as they are consumed.
+        """
         # Get all arena overall tables
-        arena_tables = self._get_matching_tables(f"arenas{SECTION_NAME_CON}*{SECTION_TABLE_CON}overall")
+        arena_tables = self.catalog.arena_kind_tables(ARENA_COMPARISON_KIND)
         
         if not arena_tables:
             raise ValueError("No arena tables found")
 
         # Build and execute the combined query
-        query = self._build_arena_comparison_query(arena_tables, config['metrics'])
-        
-        with self._get_cursor() as cursor:
-            cursor.execute(query)
-            columns = [description[0] for description in cursor.description]
-            rows = cursor.fetchall()
-
-        return {
-            'columns': columns,
-            'data': rows
-        }
-
-    def _build_arena_comparison_query(self, arena_tables: List[str], metrics: List[Dict]) -> str:
-        """Builds a UNION ALL query for arena comparison"""
-        import re
-        arena_pattern = re.compile(r'arenas_(\d+)%soverall' % SECTION_TABLE_CON)
-        
-        # First, create a CTE (Common Table Expression) to calculate total allocation
-        cte_queries = []
-        main_queries = []
-        
-        for table in arena_tables:
-            arena_id = arena_pattern.match(table).group(1)
-            select_clauses = []
-            
-            # Add arena_id as a constant
-            select_clauses.append(f"'{arena_id}' as arena_id")
-            
-            # Add basic metrics
-            for metric in metrics:
-                if metric['operation'] == 'expression':
-                    continue  # Handle expressions separately
-                else:
-                    column = metric['column']
-                    select_clauses.append(f"{metric['operation']}({column}) as {metric['name']}")
-            
-            query = f"""
-                SELECT {', '.join(select_clauses)}
-                FROM "{table}"
+        query, params = self._build_arena_comparison_query(arena_tables, config['metrics'], timestamp)
+        result = self.stream_query(query, params)
+        return {'columns': result.columns, 'data': result}
+
+    def _build_arena_comparison_query(self, arena_tables: List[Tuple[int, str]], metrics: List[Dict],
+                                      timestamp=None) -> Tuple[str, tuple]:
+        """One GROUP BY over the consolidated arena table, else a UNION ALL of the (arena id, table) list.
+
+        Returns the query and its parameters; timestamp (a snapshot
+        timestamp or a TimeFilter) restricts every table to its snapshots.
+        """
+        select_clauses = []
+        for metric in metrics:
+            if metric['operation'] == 'expression':
+                continue  # Handle expressions separately
+            select_clauses.append(f"{metric['operation']}({metric['column']}) as {metric['name']}")
+
+        consolidated = self.resolve_arena_table(ARENA_COMPARISON_KIND)
+        params = []
+        if consolidated:
+            condition, params = self.snapshot_filter(consolidated, timestamp)
+            arena_stats = f"""
+                SELECT arena_id, {', '.join(select_clauses)}
+                FROM "{consolidated}"{f" WHERE {condition}" if condition else ""}
+                GROUP BY arena_id
             """
-            main_queries.append(query)
+        else:
+            branches = []
+            for arena_id, table in arena_tables:
+                condition, table_params = self.snapshot_filter(table, timestamp, hint=False)
+                branches.append(f"""
+                SELECT {arena_id} as arena_id, {', '.join(select_clauses)}
+                FROM "{table}"{f" WHERE {condition}" if condition else ""}
+            """)
+                params += table_params
+            arena_stats = " UNION ALL ".join(branches)
+            if TimeFilter.of(timestamp):
+                tables = [table for _, table in arena_tables]
+                columns = [name for name, _ in self.get_table_schema(tables[0])]
+                self.hint_missing_index(tables, self.snapshot_columns(columns))
 
-        # Combine the main queries
+        # Combine the per-arena rows with the total allocation
         combined_query = f"""
         WITH arena_stats AS (
-            {" UNION ALL ".join(main_queries)}
+            {arena_stats}
         ),
         total_stats AS (
             SELECT SUM(total_allocated) as total_memory
@@ -193,5 +562,4 @@ class GenericAnalyzer(BaseTableHandler):
         ORDER BY total_allocated DESC
         """
         
-        return combined_query
-    
\ No newline at end of file
+        return combined_query, tuple(params)
@@ -0,0 +1,77 @@
+# src/analyzer/graph_batch.py
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Figure size (inches) and resolution of --graph plots; the pixel width caps
+# the points per series
+PLOT_SIZE = (12, 6)
+PLOT_DPI = 100
+
+def read_graph_batch(path: str) -> List[str]:
+    """--graph specs of a batch file: one per line, blank lines and # comments skipped"""
+    with open(path) as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+def plan_loads(figures: List[Dict[str, Any]]) -> Dict[Tuple[str, str], List[str]]:
+    """The y columns to load per (table, x expression), each once however many figures use it"""
+    loads: Dict[Tuple[str, str], List[str]] = {}
+    for figure in figures:
+        for table in figure['tables']:
+            columns = loads.setdefault((table, figure['x_expr']), [])
+            if figure['y_column'] not in columns:
+                columns.append(figure['y_column'])
+    return loads
+
+def _init_worker() -> None:
+    # Workers only write files, so no GUI backend is ever loaded
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+
+def render_figure(figure: Dict[str, Any]) -> Tuple[str, float]:
+    """Draw one planned figure and save it; returns (output file, seconds)"""
+    start = time.perf_counter()
+    import matplotlib.pyplot as plt
+    from src.utils.downsample import MARKER_MAX_POINTS
+
+    x_label, y_label = figure['x_label'], f"total_{figure['y_column']}"
+    # Define a fixed color map for tables
+    colors = plt.cm.tab10.colors  # Use Matplotlib's tab10 color palette
+    table_color_map = {table: colors[i % len(colors)] for i, table in enumerate(figure['tables'])}
+
+    fig = plt.figure(figsize=PLOT_SIZE, dpi=PLOT_DPI)
+    shown, total, widths = 0, 0, []
+    for table, x_values, y_values, count, width in figure['series']:
+        shown += len(x_values)
+        total += count
+        if width:
+            widths.append(width)
+        plt.plot(x_values, y_values, label=table, color=table_color_map[table],
+                 marker='o' if len(x_values) <= MARKER_MAX_POINTS else None)
+    plt.xlabel(x_label)
+    plt.ylabel(y_label)
+
+    resolution = f"~{max(widths):.4g} {x_label} per bucket, " if widths else ""
+    plt.title(f"{y_label} vs {x_label}\n({resolution}{shown:,} of {total:,} points plotted)")
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.grid(True)
+
+    plt.savefig(figure['output_file'], bbox_inches='tight')
+    plt.close(fig)
+    return figure['output_file'], time.perf_counter() - start
+
+def render_figures(figures: List[Dict[str, Any]], jobs: int) -> Iterator[Tuple[str, float]]:
+    """Render planned figures on a pool of `jobs` processes (in this process for one job).
+
+    Figures carry their already downsampled series, so workers never touch
+    the database. Results are yielded in figure order.
+    """
+    if jobs <= 1 or len(figures) <= 1:
+        _init_worker()
+        for figure in figures:
+            yield render_figure(figure)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(figures)), initializer=_init_worker) as pool:
+        yield from pool.map(render_figure, figures)
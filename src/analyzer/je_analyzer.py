@@ -1,33 +1,73 @@
 # src/analyzer/je_analyzer.py
 import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
 from src.db.stats_handler import StatsHandler
 from src.db.display_handler import DisplayHandler
+from src.db.connection import ConnectionManager
+from src.db.checkpoint import CheckpointStore
+from src.db.result_cache import ResultCache, cache_key, DEFAULT_MAX_BYTES
+from src.db.time_filter import TimeFilter, TIMESTAMP_UNITS_PER_SECOND
 from src.analyzer.generic_analyzer import GenericAnalyzer
 from src.utils.table_formatter import TableFormatter
+from src.utils.columnar import ColumnarResult
 import re
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-import numpy as np
 
 from constants import *
+
+# Columns the page usage summary under an analysis' table is computed from
+PAGE_SUMMARY_COLUMNS = ('bins', 'bin_size', 'total_pages', 'utilization', 'total_allocated')
+# matplotlib, seaborn and pandas are imported inside the plotting methods so
+# that non-plotting modes do not pay their import cost on every CLI call.
 def load_config(config_path):
     with open(config_path, 'r') as f:
         return json.load(f)
 class JeAnalyzer:
-    def __init__(self, db_path: str, config=None):
+    def __init__(self, db_path: str, config=None, checkpoint_file: str = None, cache_file: str = None):
         self.db_path = db_path
         if not config:
             config = load_config('config/analyzer_config.json')
         self.config = config
-        self.stats_handler = StatsHandler(db_path)
-        self.display_handler = DisplayHandler(db_path)
-        self.generic_analyzer = GenericAnalyzer(db_path, config['schema_path'], config)
+        # One read-only connection shared by every handler
+        self.connection = ConnectionManager.from_config(db_path, config)
+        self.stats_handler = StatsHandler(db_path, self.connection)
+        self.display_handler = DisplayHandler(db_path, self.connection)
+        self.generic_analyzer = GenericAnalyzer(db_path, config['schema_path'], config, self.connection)
+        for handler in (self.stats_handler, self.display_handler, self.generic_analyzer):
+            handler.use_typed_tables = config.get('use_typed_tables', True)
+            handler.use_rollups = config.get('use_rollups', True)
+        # Processes used by whole-database `--mode stats` runs
+        self.jobs = config.get('jobs') or os.cpu_count() or 1
+        # Incremental mode: analyses merge newly added snapshots into saved state
+        self.checkpoints = CheckpointStore(checkpoint_file) if checkpoint_file else None
+        for handler in (self.stats_handler, self.generic_analyzer):
+            handler.checkpoints = self.checkpoints
+        # Results of config-driven analyses, reused while their tables are unchanged
+        cache_config = config.get('result_cache', {})
+        self.result_cache = None
+        if cache_file:
+            try:
+                self.result_cache = ResultCache(cache_file, cache_config.get('max_bytes') or DEFAULT_MAX_BYTES)
+            except sqlite3.Error as e:
+                print(f"[cache] disabled, cannot open {cache_file}: {e}", file=sys.stderr)
         self.table_formatter = TableFormatter()
+        # Set to a ResultExporter to write analyses, tables and stats as data instead of text
+        self.exporter = None
+
+    def analyze(self, mode_pattern: str, table_pattern: str = None, timestamp: str = None, limit=[20, 15],
+                over_time: bool = False, quantiles: str = 'exact', quantile_error: float = 0.01):
+        """Analyze the database based on the specified mode
 
-    def analyze(self, mode_pattern: str, table_pattern: str = None, timestamp: str = None, limit=[20, 15]):
-        """Analyze the database based on the specified mode"""
-        modes = ['raw', 'stats', 'arena', 'meta', 'bins', 'table']
+        timestamp is one snapshot timestamp or a TimeFilter selecting the
+        snapshots every mode except 'meta' reads. With over_time, configured
+        analyses are evaluated per snapshot (see GenericAnalyzer.analyze).
+        quantiles and quantile_error choose how 'stats' computes percentiles
+        (see compute_table_stats).
+        """
+        modes = ['raw', 'stats', 'arena', 'meta', 'bins', 'table', 'report']
         modes.extend(self.config['analyses'])
         # modes_match = re.search(r'\b(?:%s)\b' % '|'.join(modes), mode_pattern)
 
@@ -36,33 +76,154 @@ class JeAnalyzer:
         # for mode in modes:
         #     print(f"Analyzing in mode: {mode} match = {mode_pattern}")
         # raise ValueError(f"KNOWN mode: {modes_match}")
+        # Analyses that aggregate the same tables are computed together up front
+        selected = [mode for mode in self.config['analyses'] if re.search(mode_pattern, mode)]
+        prefetched = self.run_analyses(selected, timestamp, over_time)
+        status = self.status
         for mode in modes:
             match = re.search(mode_pattern, mode)
             if not match:
                 continue
-            print(f"Analyzing in mode: {mode} match = {mode_pattern}")
+            print(f"Analyzing in mode: {mode} match = {mode_pattern}", file=status)
             try:
-                if mode == 'raw':
-                    self.display_handler.display_raw_data(table_pattern, limit)
+                if mode == 'raw' and self.exporter is not None:
+                    self.display_handler.export_raw_data(self.exporter, table_pattern, timestamp)
+                elif mode == 'raw':
+                    self.display_handler.display_raw_data(table_pattern, limit, timestamp)
                 elif mode == 'stats':
-                    self.analyze_table_stats(table_pattern)
+                    self.analyze_table_stats(table_pattern, quantiles, quantile_error, timestamp)
                 elif mode == 'arena':
-                    self.stats_handler.analyze_arenas_activity(table_pattern, timestamp)
+                    self.stats_handler.analyze_arenas_activity(table_pattern, timestamp, collect=False,
+                                                               exporter=self.exporter)
+                elif mode == 'meta' and self.exporter is not None:
+                    print("Mode 'meta' is a text summary and is not exported; "
+                          "export the je_metadata table with --mode table --table je_metadata", file=status)
                 elif mode == 'meta':
+                    if TimeFilter.of(timestamp):
+                        print("Mode 'meta' summarizes every snapshot; the time window is not applied",
+                              file=sys.stderr)
                     self.display_metadata()
                 elif mode == 'table':
                     self.print_table(table_pattern, timestamp, limit)
+                elif mode == 'report':
+                    self.print_comprehensive_report(timestamp)
+                elif mode in self.config['analyses'] and self.result_cache is None and mode not in prefetched:
+                    # Nothing to keep: rows go from the cursor to the export or the screen chunk by chunk
+                    for result in self.generic_analyzer.stream(mode, timestamp, over_time):
+                        if self.exporter is not None:
+                            self.exporter.write(mode, result['columns'], result['data'])
+                        elif over_time:
+                            self.table_formatter.print_table(result['columns'], result['data'])
+                        else:
+                            self._print_formatted_result(result)
                 elif mode in self.config['analyses']:
-                    result = self.generic_analyzer.analyze(mode, timestamp)
+                    result = prefetched[mode] if mode in prefetched else self.run_analysis(mode, timestamp, over_time)
+                    if self.exporter is not None:
+                        self.exporter.write_result(mode, result)
+                        continue
+                    if over_time:
+                        # Per-snapshot rows; the summaries below describe a single snapshot
+                        for table_result in (result if isinstance(result, list) else [result]):
+                            self.table_formatter.print_table(table_result['columns'], table_result['data'])
+                        continue
                     try:
                         self._print_formatted_result(result)
                     except Exception as e:
-                        print(f"Error printing formatted result for mode '{mode}': {str(e)}")
+                        print(f"Error printing formatted result for mode '{mode}': {str(e)}", file=status)
                 else:
-                    print(f"Unknown mode: {mode} {self.config['analyses']}")
+                    print(f"Unknown mode: {mode}", file=status)
             except Exception as e:
-                print(f"An unexpected error occurred: {str(e)} {self.config['analyses']}")
-            print("Done analysing in mode {mode}\n-------------------\n")
+                print(f"An unexpected error occurred: {str(e)} {self.config['analyses']}", file=status)
+            finally:
+                print("Done analysing in mode {mode}\n-------------------\n", file=status)
+        if self.checkpoints is not None:
+            self.checkpoints.save()
+
+    def _cached_result(self, analysis_name: str, timestamp: str = None, over_time: bool = False):
+        """(cache key, fingerprint, cached result or None) of a configured analysis"""
+        start = time.perf_counter()
+        analyzer = self.generic_analyzer
+        key = cache_key(os.path.realpath(self.db_path), analysis_name, self.config['analyses'][analysis_name],
+                        TimeFilter.of(timestamp), over_time, analyzer.use_typed_tables, analyzer.use_rollups)
+        fingerprint = analyzer.data_fingerprint(analyzer.source_tables(analysis_name, timestamp))
+        result = self.result_cache.get(key, fingerprint)
+        if result is not None:
+            print(f"[cache] {analysis_name}: cached result ({(time.perf_counter() - start) * 1000:.1f} ms)",
+                  file=sys.stderr)
+        return key, fingerprint, result
+
+    def run_analysis(self, analysis_name: str, timestamp: str = None, over_time: bool = False):
+        """Result of a configured analysis, served from the result cache while its tables are unchanged"""
+        if self.result_cache is None:
+            return self.generic_analyzer.analyze(analysis_name, timestamp, over_time)
+        key, fingerprint, result = self._cached_result(analysis_name, timestamp, over_time)
+        if result is None:
+            result = self.generic_analyzer.analyze(analysis_name, timestamp, over_time)
+            self.result_cache.put(key, fingerprint, result)
+        return result
+
+    def run_analyses(self, analysis_names: List[str], timestamp: str = None, over_time: bool = False) -> Dict[str, Any]:
+        """Results of configured analyses that are cached or can share table scans, keyed by name.
+
+        Analyses missing from the result are run on their own with
+        run_analysis(), which also reports their errors.
+        """
+        results, pending = {}, {}
+        for name in analysis_names:
+            if self.result_cache is None:
+                pending[name] = None
+                continue
+            try:
+                key, fingerprint, result = self._cached_result(name, timestamp, over_time)
+            except (ValueError, KeyError, sqlite3.Error):
+                continue
+            if result is not None:
+                results[name] = result
+            else:
+                pending[name] = (key, fingerprint)
+        try:
+            fused = self.generic_analyzer.analyze_fused(list(pending), timestamp, over_time)
+        except (ValueError, KeyError, sqlite3.Error) as e:
+            print(f"[fused] falling back to one scan per analysis: {e}", file=sys.stderr)
+            fused = {}
+        for name, result in fused.items():
+            if pending[name] is not None:
+                self.result_cache.put(*pending[name], result)
+            results[name] = result
+        return results
+
+    @property
+    def status(self):
+        """Where progress and error messages go: stderr while an export may be writing to stdout"""
+        return sys.stderr if self.exporter is not None else sys.stdout
+
+    def print_comprehensive_report(self, timestamp=None):
+        """Print memory trends, fragmentation, arena efficiency and leak detection.
+
+        With an exporter each section is exported as 'report.<section>',
+        and the summary as 'report.summary' (metric, value) rows.
+        """
+        report = self.stats_handler.generate_comprehensive_report(timestamp=timestamp)
+        if not report:
+            return
+        for section in ('memory_trends', 'fragmentation_analysis', 'arena_efficiency', 'potential_leaks'):
+            rows = report[section]
+            if self.exporter is not None:
+                if rows:
+                    self.exporter.write(f"report.{section}", list(rows[0].keys()), [list(row.values()) for row in rows])
+                continue
+            print(f"\n=== {section} ===")
+            if not rows:
+                print("No data")
+                continue
+            headers = list(rows[0].keys())
+            self.table_formatter.print_table(headers, [list(row.values()) for row in rows])
+        if self.exporter is not None:
+            self.exporter.write('report.summary', ['metric', 'value'], list(report['summary'].items()))
+            return
+        print("\nSummary:")
+        for key, value in report['summary'].items():
+            print(f"  {key}: {value}")
 
     def print_table(self, table_name: str, timestamp = None, limit=(20, 15)):
         if not table_name:
@@ -73,11 +234,14 @@ class JeAnalyzer:
                 matching_tables = self.generic_analyzer._get_matching_tables(table_name)
                 for table in matching_tables:
                     try:
+                        if self.exporter is not None:
+                            self.display_handler.export_table_data(self.exporter, table, timestamp)
+                            continue
                         self.display_handler.print_table_data(table, timestamp, limit)
                     except Exception as e:
-                        print(f"Error print_table_data table '{table}': {str(e)}")
+                        print(f"Error print_table_data table '{table}': {str(e)}", file=self.status)
             except Exception as e:
-                print(f"Error accessing table '{table_name}': {str(e)}")
+                print(f"Error accessing table '{table_name}': {str(e)}", file=self.status)
 
     def analyze_bins(self):
         result = self.generic_analyzer.analyze('bins_analysis')
@@ -89,45 +253,47 @@ class JeAnalyzer:
         tables = self.generic_analyzer.list_available_tables(prefix)
         return tables
     def _print_activity_analysis(self, result):
-        columns = result['columns']
-        data = result['data']
+        table = ColumnarResult.from_result(result)
+        columns, data, col = table['columns'], table['data'], table.index
         
         # Print the basic table
         self.table_formatter.print_table(columns, data)
         
-        # Sort data by different metrics for analysis
-        by_requests = sorted(data, key=lambda x: x[columns.index('total_requests')], reverse=True)
-        by_rates = sorted(data, key=lambda x: x[columns.index('alloc_rate')] + x[columns.index('dealloc_rate')], reverse=True)
-        by_churn = sorted(data, key=lambda x: x[columns.index('fills')] + x[columns.index('flushes')], reverse=True)
+        # Top rows by different metrics for analysis
+        by_requests = table.top_k('total_requests', 5)
+        by_rates = table.top_k(table.column('alloc_rate') + table.column('dealloc_rate'), 5)
+        by_churn = table.top_k(table.column('fills') + table.column('flushes'), 5)
         
         print("\nActivity Analysis:")
         
         # Most active bins by requests
         print("\nTop 5 Most Active Bins (by total requests):")
-        for row in by_requests[:5]:
-            bin_id = row[columns.index('bins')]
-            bin_size = row[columns.index('bin_size')]
-            requests = row[columns.index('total_requests')]
-            allocs = row[columns.index('alloc_ops')]
-            deallocs = row[columns.index('dealloc_ops')]
+        for i in by_requests:
+            row = data[i]
+            bin_id = row[col['bins']]
+            bin_size = row[col['bin_size']]
+            requests = row[col['total_requests']]
+            allocs = row[col['alloc_ops']]
+            deallocs = row[col['dealloc_ops']]
             
             print(f"\nBin {bin_id} (size {bin_size} bytes):")
             print(f"  Total Requests: {requests:,}")
             print(f"  Allocations: {allocs:,}")
             print(f"  Deallocations: {deallocs:,}")
             print(f"  Cache hit ratio: {((requests - allocs) / requests * 100):.2f}%")
-            print(f"  Current allocation rate: {row[columns.index('alloc_rate')]:,}/s")
-            print(f"  Current deallocation rate: {row[columns.index('dealloc_rate')]:,}/s")
+            print(f"  Current allocation rate: {row[col['alloc_rate']]:,}/s")
+            print(f"  Current deallocation rate: {row[col['dealloc_rate']]:,}/s")
         
         # Bins with highest operation rates
         print("\nTop 5 Bins with Highest Operation Rates:")
-        for row in by_rates[:5]:
-            bin_id = row[columns.index('bins')]
-            bin_size = row[columns.index('bin_size')]
-            alloc_rate = row[columns.index('alloc_rate')]
-            dealloc_rate = row[columns.index('dealloc_rate')]
-            fill_rate = row[columns.index('fill_rate')]
-            flush_rate = row[columns.index('flush_rate')]
+        for i in by_rates:
+            row = data[i]
+            bin_id = row[col['bins']]
+            bin_size = row[col['bin_size']]
+            alloc_rate = row[col['alloc_rate']]
+            dealloc_rate = row[col['dealloc_rate']]
+            fill_rate = row[col['fill_rate']]
+            flush_rate = row[col['flush_rate']]
             
             print(f"\nBin {bin_id} (size {bin_size} bytes):")
             print(f"  Allocation Rate: {alloc_rate:,}/s")
@@ -137,13 +303,14 @@ class JeAnalyzer:
         
         # Bins with high slab churn
         print("\nTop 5 Bins with Highest Slab Activity:")
-        for row in by_churn[:5]:
-            bin_id = row[columns.index('bins')]
-            bin_size = row[columns.index('bin_size')]
-            fills = row[columns.index('fills')]
-            flushes = row[columns.index('flushes')]
-            lock_ops = row[columns.index('lock_ops')]
-            owner_switches = row[columns.index('owner_switches')]
+        for i in by_churn:
+            row = data[i]
+            bin_id = row[col['bins']]
+            bin_size = row[col['bin_size']]
+            fills = row[col['fills']]
+            flushes = row[col['flushes']]
+            lock_ops = row[col['lock_ops']]
+            owner_switches = row[col['owner_switches']]
             
             print(f"\nBin {bin_id} (size {bin_size} bytes):")
             print(f"  Total Fills: {fills:,}")
@@ -153,11 +320,11 @@ class JeAnalyzer:
             print(f"  Ops per owner switch: {(fills + flushes) / owner_switches:.2f}" if owner_switches > 0 else "  No owner switches")
         
         # Overall statistics
-        total_requests = sum(row[columns.index('total_requests')] for row in data)
-        total_allocs = sum(row[columns.index('alloc_ops')] for row in data)
-        total_deallocs = sum(row[columns.index('dealloc_ops')] for row in data)
-        total_fills = sum(row[columns.index('fills')] for row in data)
-        total_flushes = sum(row[columns.index('flushes')] for row in data)
+        total_requests = table.total('total_requests')
+        total_allocs = table.total('alloc_ops')
+        total_deallocs = table.total('dealloc_ops')
+        total_fills = table.total('fills')
+        total_flushes = table.total('flushes')
         
         print("\nOverall Activity Statistics:")
         print(f"Total Requests: {total_requests:,}")
@@ -170,17 +337,17 @@ class JeAnalyzer:
     
 
     def _print_pages_analysis(self, result):
-        columns = result['columns']
-        data = result['data']
+        table = ColumnarResult.from_result(result)
+        columns, data = table['columns'], table['data']
         
         # Print the basic table
         self.table_formatter.print_table(columns, data)
         try:
             if columns.index('total_pages'):
                 # Pages analysis specific calculations
-                total_pages = sum(row[columns.index('total_pages')] for row in data)
+                total_pages = table.total('total_pages')
             if columns.index('total_allocated'):
-                total_memory = sum(row[columns.index('total_allocated')] for row in data)
+                total_memory = table.total('total_allocated')
             
             print("\nPages Analysis Summary:")
             if columns.index('total_pages'):
@@ -194,30 +361,25 @@ class JeAnalyzer:
         if isinstance(result, list):
             for r in result:
                 self._print_formatted_result(r)
-        
-        columns = result['columns']
-        data = result['data']
+            return
+        if not all(col in result['columns'] for col in PAGE_SUMMARY_COLUMNS):
+            # No page usage summary: the rows are printed as they are fetched
+            self.table_formatter.print_table(result['columns'], result['data'])
+            return
+
+        table = ColumnarResult.from_result(result)
+        columns, data, col = table['columns'], table['data'], table.index
         had_error = False
         # Print the table
         self.table_formatter.print_table(columns, data)
         try:
             if columns.index('total_allocated'):
-                total_memory = sum(row[columns.index('total_allocated')] for row in data)
-            # except Exception as e:
-            #     print(f"Error calculating total memory: {str(e)}")
-            #     total_memory = 0
-            #     had_error = True
+                total_memory = table.total('total_allocated')
             if columns.index('total_pages'):
                 # Calculate total pages and memory
-                total_pages = sum(row[columns.index('total_pages')] for row in data)
-                # Sort bins by page usage
-                sorted_by_pages = sorted(data, key=lambda x: x[columns.index('total_pages')], reverse=True)
-            # except Exception as e:
-            #     print(f"Error calculating total pages: {str(e)}")
-            #     total_pages = 0
-            #     had_error = True
-            
-
+                total_pages = table.total('total_pages')
+                # Bins by page usage
+                top_by_pages = table.top_k('total_pages', 10)
             
             print(f"\nPage Usage Analysis: (had_error = {had_error})")
             if columns.index('total_pages'):
@@ -227,15 +389,16 @@ class JeAnalyzer:
                 print(f"Overall Memory Efficiency: {(total_memory / (total_pages * 4096)) * 100:.2f}%")
             
             print("\nTop 10 Bins by Page Usage:")
-            for row in sorted_by_pages[:10]:
-                bin_id = row[columns.index('bins')]
-                bin_size = row[columns.index('bin_size')]
+            for i in top_by_pages:
+                row = data[i]
+                bin_id = row[col['bins']]
+                bin_size = row[col['bin_size']]
                 try:
                     if columns.index('total_pages'):
-                        pages = row[columns.index('total_pages')]
-                    util = row[columns.index('utilization')]
+                        pages = row[col['total_pages']]
+                    util = row[col['utilization']]
                     if columns.index('total_allocated'):
-                        allocated = row[columns.index('total_allocated')]
+                        allocated = row[col['total_allocated']]
                 except Exception as e:
                     print(f"Error fetching data for bin {bin_id}: {str(e)}")
                     continue
@@ -246,10 +409,10 @@ class JeAnalyzer:
                 print(f"  Memory Efficiency: {(allocated / (pages * 4096)) * 100:.2f}%")
             
             print("\nUtilization Summary:")
-            poor_util_bins = [row for row in data if row[columns.index('utilization')] < 0.5]
-            print(f"Bins with <50% utilization: {len(poor_util_bins)}")
+            poor_util = table.column('utilization') < 0.5
+            print(f"Bins with <50% utilization: {int(poor_util.sum())}")
             if columns.index('total_pages'):
-                wasted_pages = sum(row[columns.index('total_pages')] for row in poor_util_bins)
+                wasted_pages = table.column('total_pages')[poor_util].sum().item()
                 print(f"Pages in poorly utilized bins: {wasted_pages:,} ({wasted_pages * 4:,} KB)")
         except Exception as e:
             print(f"Error printing formatted result: _print_formatted_result {str(e)}\ncolumns={columns}\ndata={data}")
@@ -258,19 +421,47 @@ class JeAnalyzer:
         analysis = self.stats_handler.analyze_bins(table_name)
         print(json.dumps(analysis, indent=2))
 
-    def analyze_table_stats(self, table_pattern: str) -> None:
-        """Calculate and display statistics for a table"""
+    def analyze_table_stats(self, table_pattern: str, quantiles: str = 'exact', quantile_error: float = 0.01,
+                            timestamp=None) -> None:
+        """Calculate and display statistics for a table, over the snapshots timestamp selects"""
         
-        tables = [t for t in self.generic_analyzer.list_available_tables() if re.search(table_pattern, t)]
+        tables = self.generic_analyzer.catalog.match(table_pattern)
+        if self.exporter is not None:
+            for table_name in tables:
+                columns, rows = self.stats_handler.table_stats_rows(table_name, quantiles, quantile_error, timestamp)
+                self.exporter.write(table_name, columns, rows)
+            return
         print(f"Tables: {tables} pattern: {table_pattern}")
+        jobs = min(self.jobs, len(tables))
+        if jobs > 1:
+            self._analyze_table_stats_parallel(tables, jobs, quantiles, quantile_error, timestamp)
+            return
         for table_name in tables:
             print(f"\nAnalyzing statistics for {table_name}...")
-            self.stats_handler.print_table_stats(table_name)
+            self.stats_handler.print_table_stats(table_name, quantiles=quantiles, epsilon=quantile_error,
+                                                 timestamp=timestamp)
             # self.display_handler.print_table_stats(table_name)
         # print(f"\nAnalyzing statistics for {table_name}...")
         # self.stats_handler.calculate_table_stats(table_name)
         # self.display_handler.print_table_stats(table_name)
 
+    def _analyze_table_stats_parallel(self, tables: List[str], jobs: int, quantiles: str = 'exact',
+                                      quantile_error: float = 0.01, timestamp=None) -> None:
+        """Fan the tables out to a process pool, printing reports in table order"""
+        from src.analyzer.parallel_stats import table_stats_reports
+        start = time.perf_counter()
+        table_seconds = 0.0
+        reports = table_stats_reports(self.db_path, self.config, tables, jobs,
+                                      quantiles=quantiles, epsilon=quantile_error, timestamp=timestamp)
+        for done, (table_name, report, seconds) in enumerate(reports, start=1):
+            print(f"\nAnalyzing statistics for {table_name}...")
+            print(report)
+            table_seconds += seconds
+            print(f"[{done}/{len(tables)}] {table_name}: {seconds:.2f}s", file=sys.stderr)
+        wall = time.perf_counter() - start
+        print(f"Stats for {len(tables)} tables: {wall:.2f}s wall, {table_seconds:.2f}s of table work "
+              f"on {jobs} processes", file=sys.stderr)
+
     def display_metadata(self) -> None:
         """Display metadata information"""
         self.display_handler.print_metadata_summary()
@@ -278,121 +469,138 @@ class JeAnalyzer:
 
     def close(self) -> None:
         """Clean up resources"""
-        self.stats_handler.close()
-        self.display_handler.close()
+        if self.checkpoints is not None:
+            self.checkpoints.save()
+        if self.result_cache is not None:
+            self.result_cache.close()
+        if self.exporter is not None:
+            self.exporter.close()
+        self.connection.close()
+
+    def plot_recall_for_configurations(self, graph_spec, timestamp=None):
+        figure = self._graph_plan(graph_spec)
+        if figure:
+            self._plot_figures([figure], timestamp, jobs=1)
+    
+    def plot_by_time(self, graph_spec, timestamp=None):
+        figure = self._graph_plan(graph_spec, by_time=True)
+        if figure:
+            self._plot_figures([figure], timestamp, jobs=1)
 
-    def plot_recall_for_configurations(self, graph_spec):
-        # self.plot_by_time(graph_spec)
+    def plot_graph_batch(self, graph_specs: List[str], timestamp=None) -> None:
+        """Save the plots of several --graph specs, e.g. a standard incident pack.
+
+        Every (table, x) is read once for all the y columns the specs ask of
+        it, then the figures are rendered on up to `jobs` processes.
+        """
+        figures = [figure for figure in map(self._graph_plan, graph_specs) if figure]
+        if figures:
+            self._plot_figures(figures, timestamp, min(self.jobs, len(figures)))
+
+    def _graph_plan(self, graph_spec: str, by_time: bool = False) -> Optional[Dict[str, Any]]:
+        """What to draw for a --graph spec; None when no table matches"""
         parts = graph_spec.split(',')
         table_regex = parts[0]
         x_column = parts[1]
         y_column = parts[2]
 
-        # Get matching tables
-        # tables = self.display_handler.get_tables(table_regex)
         # Get matching tables
         tables = self.display_handler.get_matching_tables(table_regex)    
         if not tables:
             print(f"No tables found matching regex '{table_regex}'")
-            return
-
-        # Define a fixed color map for tables
-        colors = plt.cm.tab10.colors  # Use Matplotlib's tab10 color palette
-        table_color_map = {table: colors[i % len(colors)] for i, table in enumerate(tables)}
-
-        plt.figure(figsize=(12, 6))
-
-        for table in tables:
-            #SUM(allocated) as total_allocated,
-            # Fetch data for each table
-            query = f"SELECT {x_column}, SUM(CAST({y_column} as FLOAT)) as total_{y_column} FROM '{table}' GROUP BY {x_column}"
-            try:
-                df = pd.read_sql_query(query, self.display_handler.conn)
-            except Exception as e:
-                print(f"Error fetching data for table '{table}': {str(e)}")
-                continue
-            try:
-                print(f"Plotting data for table '{table}'")
-                print(f"Data: {df}")
-                # Sort the data by x_column for proper line plotting
-                df = df.sort_values(by=x_column)
-                plt.plot(df[x_column], df[f'total_{y_column}'], label=table, marker='o', color=table_color_map[table])
-            except Exception as e:
-                print(f"Error plotting data for table '{table}': {str(e)}")
-                continue
-        plt.xlabel(x_column)
-        plt.ylabel(f'total_{y_column}')
+            return None
 
-        # Set y-axis limits and ticks if y_column is 'recall'
-        # if y_column.lower() == 'recall':
-        #     plt.ylim(0.8, 1.0)
-        #     plt.yticks([0.8, 0.82, 0.84, 0.86, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0])
+        if by_time:
+            return {'tables': tables, 'x_expr': f"ROUND(CAST(timestamp AS FLOAT) / {TIMESTAMP_UNITS_PER_SECOND}, 2)",
+                    'x_label': 'time_sec', 'y_column': y_column,
+                    'output_file': f"t_{table_regex}_{'time_sec'}_vs_{f'total_{y_column}'}.png"}
+        return {'tables': tables, 'x_expr': x_column, 'x_label': x_column, 'y_column': y_column,
+                'output_file': f"{table_regex}_{x_column}_vs_{f'total_{y_column}'}.png"}
 
-        plt.title(f'{f'total_{y_column}'} vs {x_column}')
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.grid(True)
+    def _plot_figures(self, figures: List[Dict[str, Any]], timestamp=None, jobs: int = 1) -> None:
+        """Line plots of SUM(y_column) per x of every table, at most one point per PIXELS_PER_POINT pixels.
 
-        output_file = f"{table_regex}_{x_column}_vs_{f'total_{y_column}'}.png"
-        plt.savefig(output_file, bbox_inches='tight')
-        plt.close()
-        print(f"Saved Plot: {output_file}")    
-    
-    def plot_by_time(self, graph_spec):
-        parts = graph_spec.split(',')
-        table_regex = parts[0]
-        x_column = 'timestamp'
-        y_column = parts[2]
+        Long series are bucketed in SQL (DisplayHandler.series_points) and
+        then reduced with LTTB, so rendering cost follows the image width
+        instead of the number of snapshots; the title states the resolution.
+        """
+        from src.analyzer.graph_batch import plan_loads, render_figures, PLOT_SIZE, PLOT_DPI
+        from src.utils.downsample import PIXELS_PER_POINT
 
-        # Get matching tables
-        # tables = self.display_handler.get_tables(table_regex)
-        # Get matching tables
-        tables = self.display_handler.get_matching_tables(table_regex)    
-        if not tables:
-            print(f"No tables found matching regex '{table_regex}'")
-            return
+        start = time.perf_counter()
+        max_points = max(PLOT_SIZE[0] * PLOT_DPI // PIXELS_PER_POINT, 3)
+        series = {}
+        loads = plan_loads(figures)
+        for (table, x_expr), y_columns in loads.items():
+            for columns, (points, count, width) in self._load_series(table, x_expr, y_columns, max_points, timestamp):
+                self._add_series(series, table, x_expr, columns, points, count, width, max_points)
+        for figure in figures:
+            figure['series'] = []
+            for table in figure['tables']:
+                loaded = series.get((table, figure['x_expr'], figure['y_column']))
+                if not loaded or not loaded[0]:
+                    continue
+                print(f"Plotting data for table '{table}': {len(loaded[0]):,} of {loaded[2]:,} points")
+                figure['series'].append((table, *loaded))
+        load_seconds = time.perf_counter() - start
+        for figure in figures:
+            if not figure['series']:
+                print(f"No data to plot for {figure['output_file']}")
+        figures = [figure for figure in figures if figure['series']]
 
-        # Define a fixed color map for tables
-        colors = plt.cm.tab10.colors  # Use Matplotlib's tab10 color palette
-        table_color_map = {table: colors[i % len(colors)] for i, table in enumerate(tables)}
+        for done, (output_file, seconds) in enumerate(render_figures(figures, jobs), start=1):
+            print(f"Saved Plot: {output_file}")
+            if len(figures) > 1:
+                print(f"[{done}/{len(figures)}] {output_file}: {seconds:.2f}s", file=sys.stderr)
+        if len(figures) > 1:
+            print(f"Graphs: {len(figures)} from {len(loads)} table loads, {load_seconds:.2f}s loading, "
+                  f"{time.perf_counter() - start:.2f}s wall on {jobs} processes", file=sys.stderr)
 
-        plt.figure(figsize=(12, 6))
+    def _load_series(self, table: str, x_expr: str, y_columns: List[str], max_points: int, timestamp=None) -> list:
+        """[(y columns, series_points() result)] of a table: one scan for all columns when it succeeds.
 
-        for table in tables:
-            #SUM(allocated) as total_allocated,
-            # Fetch data for each table
-            query = f"SELECT ROUND(CAST(timestamp as FLOAT)/1000000000,2) as time_sec, SUM(CAST({y_column} as FLOAT)) as total_{y_column} FROM '{table}' GROUP BY 'time_sec'"
-            try:
-                df = pd.read_sql_query(query, self.display_handler.conn)
-            except Exception as e:
+        If the combined query fails (e.g. one spec names a missing column),
+        each column is loaded on its own, so only the failing one is lost.
+        """
+        try:
+            return [(y_columns, self.display_handler.series_points(table, x_expr, y_columns, max_points, timestamp))]
+        except Exception as e:
+            if len(y_columns) == 1:
                 print(f"Error fetching data for table '{table}': {str(e)}")
-                continue
+                return []
+        loaded = []
+        for y_column in y_columns:
             try:
-                print(f"Plotting data for table '{table}'")
-                print(f"Data: {df}")
-                # Sort the data by x_column for proper line plotting
-                df = df.sort_values(by='time_sec')
-                plt.plot(df['time_sec'], df[f'total_{y_column}'], label=table, marker='o', color=table_color_map[table])
+                loaded.append(([y_column], self.display_handler.series_points(table, x_expr, [y_column], max_points,
+                                                                              timestamp)))
             except Exception as e:
-                print(f"Error plotting data for table '{table}': {str(e)}")
-                continue
-        plt.xlabel('time_sec')
-        plt.ylabel(f'total_{y_column}')
-
-        # Set y-axis limits and ticks if y_column is 'recall'
-        # if y_column.lower() == 'recall':
-        #     plt.ylim(0.8, 1.0)
-        #     plt.yticks([0.8, 0.82, 0.84, 0.86, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0])
+                print(f"Error fetching data for table '{table}', column '{y_column}': {str(e)}")
+        return loaded
 
-        plt.title(f'{f'total_{y_column}'} vs {'time_sec'}')
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.grid(True)
-
-        output_file = f"t_{table_regex}_{'time_sec'}_vs_{f'total_{y_column}'}.png"
-        plt.savefig(output_file, bbox_inches='tight')
-        plt.close()
-        print(f"Saved Plot: {output_file}")            
+    @staticmethod
+    def _add_series(series: dict, table: str, x_expr: str, y_columns: List[str], points: list, count: int,
+                    width, max_points: int) -> None:
+        """Split loaded (x, y1, y2, ...) points into one LTTB-reduced series per y column"""
+        from src.utils.downsample import lttb
+        for i, y_column in enumerate(y_columns, start=1):
+            x_values = [point[0] for point in points if point[i] is not None]
+            y_values = [point[i] for point in points if point[i] is not None]
+            try:
+                # TEXT columns such as timestamp would otherwise be drawn as categories
+                x_values = [float(x) for x in x_values]
+            except (TypeError, ValueError):
+                pass  # x is not numeric; plot the bucketed points as they are
+            else:
+                if len(x_values) > max_points:
+                    keep = lttb(x_values, y_values, max_points)
+                    x_values = [x_values[k] for k in keep]
+                    y_values = [y_values[k] for k in keep]
+            series[table, x_expr, y_column] = (x_values, y_values, count, width)
 
     def generate_graph(self, graph_spec):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        import pandas as pd
         table_prefix, x_column, y_column, *legend_column = graph_spec.split(',')
         legend_column = legend_column[0] if legend_column else None
 
@@ -0,0 +1,57 @@
+# src/analyzer/parallel_stats.py
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util
+from typing import Any, Dict, Iterator, List, Tuple
+from src.db.connection import ConnectionManager
+from src.db.stats_handler import StatsHandler
+
+# Batches per worker: small enough to balance uneven tables, large enough
+# that per-task overhead stays negligible
+BATCHES_PER_JOB = 4
+
+# Per-process handler, created once by _init_worker
+_worker_handler = None
+
+def _init_worker(db_path: str, config: Dict[str, Any]) -> None:
+    global _worker_handler
+    # Load numpy up front so it does not count towards the first table's time
+    import src.db.stats_engine
+    connection = ConnectionManager.from_config(db_path, config)
+    # Pool workers leave through os._exit, which skips atexit handlers but
+    # still runs multiprocessing finalizers
+    util.Finalize(connection, connection.close, exitpriority=10)
+    _worker_handler = StatsHandler(db_path, connection)
+    _worker_handler.use_typed_tables = config.get('use_typed_tables', True)
+
+def _stats_batch(tables: List[str], limit: Tuple[int, int], quantiles: str, epsilon: float,
+                 timestamp: Any) -> List[Tuple[str, str, float]]:
+    """(table, report, seconds) for every table of a batch, on the worker's connection"""
+    reports = []
+    for table in tables:
+        start = time.perf_counter()
+        report = _worker_handler.format_table_stats(table, limit, quantiles, epsilon, timestamp)
+        reports.append((table, report, time.perf_counter() - start))
+    return reports
+
+def batch_tables(tables: List[str], jobs: int) -> List[List[str]]:
+    """Split tables into contiguous batches, keeping their order"""
+    size = max(1, math.ceil(len(tables) / (jobs * BATCHES_PER_JOB)))
+    return [tables[i:i + size] for i in range(0, len(tables), size)]
+
+def table_stats_reports(db_path: str, config: Dict[str, Any], tables: List[str], jobs: int,
+                        limit: Tuple[int, int] = (20, 15), quantiles: str = 'exact',
+                        epsilon: float = 0.01, timestamp: Any = None) -> Iterator[Tuple[str, str, float]]:
+    """Compute `--mode stats` reports on a pool of `jobs` processes.
+
+    Each worker opens its own connection and handles batches of tables.
+    Reports are yielded in table order as soon as they and all reports
+    before them are done. timestamp is a snapshot timestamp or a TimeFilter.
+    """
+    batches = batch_tables(tables, jobs)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(batches)), initializer=_init_worker,
+                             initargs=(db_path, config)) as pool:
+        settings = [[setting] * len(batches) for setting in (limit, quantiles, epsilon, timestamp)]
+        for reports in pool.map(_stats_batch, batches, *settings):
+            yield from reports
@@ -7,13 +7,168 @@ import json
 # Add the parent directory of 'src' to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.analyzer.je_analyzer import JeAnalyzer
+# The analyzer is imported by the commands that open one, so that
+# `je-analyze query` stays a thin client
 
 def load_config(config_path):
     with open(config_path, 'r') as f:
         return json.load(f)
 
-def main():
+def normalize_command(argv):
+    """je-analyze normalize <db_path>: build typed copies of the stats tables"""
+    parser = argparse.ArgumentParser(prog='je-analyze normalize',
+                                     description='Build typed INTEGER/REAL copies of the stats tables')
+    parser.add_argument('db_path', help='Path to SQLite database')
+    parser.add_argument('--table', default='.*', help='Table name or pattern to normalize')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db_path):
+        print(f"Error: Database file not found: {args.db_path}")
+        sys.exit(1)
+
+    from src.db.normalize_handler import NormalizeHandler
+    handler = NormalizeHandler(args.db_path)
+    try:
+        handler.normalize(args.table)
+    finally:
+        handler.close()
+
+def index_command(argv):
+    """je-analyze index <db_path>: build the indexes analyses look up by"""
+    parser = argparse.ArgumentParser(prog='je-analyze index',
+                                     description='Index timestamp, metadata_id and primary-key columns')
+    parser.add_argument('db_path', help='Path to SQLite database')
+    parser.add_argument('--table', default='.*', help='Table name or pattern to index')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db_path):
+        print(f"Error: Database file not found: {args.db_path}")
+        sys.exit(1)
+
+    from src.db.index_handler import IndexHandler
+    handler = IndexHandler(args.db_path)
+    try:
+        handler.build_indexes(args.table)
+    finally:
+        handler.close()
+
+def rollup_command(argv):
+    """je-analyze rollup <db_path>: refresh the per-snapshot arena rollup"""
+    parser = argparse.ArgumentParser(prog='je-analyze rollup',
+                                     description='Refresh the per-snapshot rollup of the overall arena stats')
+    parser.add_argument('db_path', help='Path to SQLite database')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild from scratch instead of appending new rows')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db_path):
+        print(f"Error: Database file not found: {args.db_path}")
+        sys.exit(1)
+
+    from src.db.rollup_handler import RollupHandler
+    handler = RollupHandler(args.db_path)
+    try:
+        report = handler.refresh(rebuild=args.rebuild)
+        handler.print_report([report] if report else [])
+    finally:
+        handler.close()
+
+def consolidate_command(argv):
+    """je-analyze consolidate <db_path>: fold per-arena tables into long-format tables"""
+    parser = argparse.ArgumentParser(prog='je-analyze consolidate',
+                                     description='Fold the arenas-N__<kind> tables into one table per kind')
+    parser.add_argument('db_path', help='Path to SQLite database')
+    parser.add_argument('--kind', action='append',
+                        help='Table kind to consolidate, e.g. "overall" (repeatable; default: all kinds)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db_path):
+        print(f"Error: Database file not found: {args.db_path}")
+        sys.exit(1)
+
+    from src.db.consolidate_handler import ConsolidateHandler
+    handler = ConsolidateHandler(args.db_path)
+    try:
+        handler.print_report(handler.consolidate(args.kind))
+    finally:
+        handler.close()
+
+def serve_command(argv):
+    """je-analyze serve <db_path>: answer analysis requests from one warm process"""
+    parser = argparse.ArgumentParser(prog='je-analyze serve',
+                                     description='Keep the database, catalog, compiled queries and results warm '
+                                                 'and answer `je-analyze query` requests')
+    parser.add_argument('db_path', help='Path to SQLite database')
+    parser.add_argument('--config', default='config/analyzer_config.json', help='Path to analyzer configuration file')
+    parser.add_argument('--socket', help='Unix socket to listen on (default: <db_path>.sock)')
+    parser.add_argument('--port', type=int, help='Listen on localhost HTTP at this port instead of a Unix socket')
+    parser.add_argument('--jobs', type=int,
+                        help='Tables queried in parallel per analysis (default: "jobs" in the config, else CPU count)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute config-driven analyses instead of reusing cached results')
+    parser.add_argument('--cache-file', help='Where analysis results are cached (default: <db_path>.results.sqlite)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db_path):
+        print(f"Error: Database file not found: {args.db_path}")
+        sys.exit(1)
+
+    if not os.path.exists(args.config):
+        print(f"Error: Configuration file not found: {args.config}")
+        sys.exit(1)
+
+    config = load_config(args.config)
+    if args.jobs:
+        config['jobs'] = args.jobs
+    cache_file = None
+    if not args.no_cache and config.get('result_cache', {}).get('enabled', True):
+        from src.db.result_cache import cache_path
+        cache_file = args.cache_file or cache_path(args.db_path)
+
+    from src.analyzer.je_analyzer import JeAnalyzer
+    from src.server import AnalysisServer, socket_path
+    try:
+        server = AnalysisServer(JeAnalyzer(args.db_path, config, cache_file=cache_file), build_parser(), run,
+                                socket=None if args.port else args.socket or socket_path(args.db_path),
+                                port=args.port)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    server.serve()
+
+def query_command(argv):
+    """je-analyze query <db_path> [options]: run an analysis on a `je-analyze serve` process"""
+    parser = argparse.ArgumentParser(prog='je-analyze query',
+                                     description='Send je-analyze options to a running `je-analyze serve`; '
+                                                 'every option other than these is passed through')
+    parser.add_argument('db_path', help='Path to the SQLite database the server was started on')
+    parser.add_argument('--socket', help='Unix socket of the server (default: <db_path>.sock)')
+    parser.add_argument('--port', type=int, help='Localhost HTTP port of the server')
+    args, options = parser.parse_known_args(argv)
+
+    from src.server import query, socket_path
+    try:
+        response = query(args.db_path, options, socket=None if args.port else args.socket or socket_path(args.db_path),
+                         port=args.port)
+    except OSError as e:
+        print(f"Error: no je-analyze server for {args.db_path} ({e}); start one with `je-analyze serve`")
+        sys.exit(1)
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.exit(response['status'])
+
+# Subcommands, dispatched on the first argument: maintenance commands that
+# write derived data, and the analysis server with its client
+COMMANDS = {
+    'normalize': normalize_command,
+    'index': index_command,
+    'rollup': rollup_command,
+    'consolidate': consolidate_command,
+    'serve': serve_command,
+    'query': query_command,
+}
+
+def build_parser():
+    """Parser of the analysis options, shared by the CLI and `je-analyze serve` requests"""
     parser = argparse.ArgumentParser(description='Analyze jemalloc statistics')
     parser.add_argument('db_path', help='Path to SQLite database')
     parser.add_argument('--config', default='config/analyzer_config.json', help='Path to analyzer configuration file')
@@ -21,13 +176,75 @@ def main():
                         default='table', help='Analysis mode')
     parser.add_argument('--table', default='.*', help='Table name or pattern to analyze')
     parser.add_argument('--timestamp', help='Filter by timestamp')
+    parser.add_argument('--since', help='Only snapshots at or after this timestamp, or within a duration '
+                                        '(e.g. 1h, 30m, 7d) of the newest snapshot')
+    parser.add_argument('--until', help='Only snapshots at or before this timestamp, or a duration before the newest')
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument('--every-nth', type=int, metavar='N', help='Only every N-th snapshot (after --since/--until)')
+    sampling.add_argument('--resample', metavar='INTERVAL',
+                          help='Only the first snapshot of each interval (e.g. 5m, 1h, or timestamp units)')
+    parser.add_argument('--over-time', action='store_true',
+                        help='Evaluate configured analyses per snapshot: one row per (timestamp, group)')
+    parser.add_argument('--quantiles', choices=['exact', 'sketch'], default='exact',
+                        help='How --mode stats computes percentiles: keep every value, or a bounded-memory sketch')
+    parser.add_argument('--quantile-error', type=float, default=0.01, metavar='EPSILON',
+                        help='Rank error of --quantiles sketch percentiles (default: 0.01)')
     parser.add_argument('--limit', default="20, 15", help='Limit number of rows and colmns in display (default: [20, 15])')
     parser.add_argument('--list-tables', action='store_true', help='List all tables in the database')
     # Add this new argument
     parser.add_argument('--prefix', help='Filter tables by prefix (e.g., "merged" or "arenas")')
     parser.add_argument('--graph', help='Generate graph. Format: "<table-name-prefix>,<x-column>,<y-column>[,<legend-column>]"')
+    parser.add_argument('--graph-batch', metavar='FILE',
+                        help='Generate the graphs of a file with one --graph spec per line, rendered on --jobs processes')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only aggregate snapshots added since the last --incremental run')
+    parser.add_argument('--jobs', type=int,
+                        help='Tables queried in parallel per analysis (default: "jobs" in the config, else CPU count)')
+    parser.add_argument('--checkpoint-file', help='Where --incremental keeps its state (default: <db_path>.checkpoints.json)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute config-driven analyses instead of reusing cached results')
+    parser.add_argument('--cache-file', help='Where analysis results are cached (default: <db_path>.results.sqlite)')
+    parser.add_argument('--output-format', choices=['text', 'csv', 'jsonl', 'parquet', 'arrow'], default='text',
+                        help='Write analyses, tables and stats as data instead of text tables')
+    parser.add_argument('--output', help='File for csv/jsonl (default: stdout), directory for parquet/arrow')
+    return parser
 
+def run(analyzer, args):
+    """Run what parsed analysis options ask for (tables, graphs or analyses) on an open analyzer"""
+    from src.db.time_filter import TimeFilter
+    time_filter = TimeFilter.of(TimeFilter(args.timestamp, args.since, args.until, args.every_nth, args.resample))
+    if args.output_format != 'text':
+        from src.utils.exporter import ResultExporter
+        analyzer.exporter = ResultExporter(args.output_format, args.output)
+    try:
+        # Add this block to handle the --list-tables argument
+        if args.list_tables:
+            tables = analyzer.list_tables(prefix=args.prefix)
+            print("\nAvailable tables in database:")
+            if args.prefix:
+                print(f"(filtered by prefix: '{args.prefix}')")
+            for table in sorted(tables):  # Sort tables for better readability
+                print(f"- {table}")
+            return
+        if args.graph_batch:
+            from src.analyzer.graph_batch import read_graph_batch
+            analyzer.plot_graph_batch(read_graph_batch(args.graph_batch), time_filter)
+        elif args.graph:
+            analyzer.plot_recall_for_configurations(args.graph, time_filter)
+        else:
+            analyzer.analyze(args.mode, args.table, time_filter, [int(l) for l in args.limit.split(',')],
+                             over_time=args.over_time, quantiles=args.quantiles,
+                             quantile_error=args.quantile_error)  # Split limit argument into list
+    finally:
+        if analyzer.exporter is not None:
+            analyzer.exporter.close()
+            analyzer.exporter = None
 
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+
+    parser = build_parser()
     args = parser.parse_args()
 
     if not os.path.exists(args.db_path):
@@ -39,22 +256,21 @@ def main():
         sys.exit(1)
 
     config = load_config(args.config)
+    if args.jobs:
+        config['jobs'] = args.jobs
     
     try:
-        analyzer = JeAnalyzer(args.db_path, config)
-        # Add this block to handle the --list-tables argument
-        if args.list_tables:
-            tables = analyzer.list_tables(prefix=args.prefix)
-            print("\nAvailable tables in database:")
-            if args.prefix:
-                print(f"(filtered by prefix: '{args.prefix}')")
-            for table in sorted(tables):  # Sort tables for better readability
-                print(f"- {table}")
-            return
-        if args.graph:
-            analyzer.plot_recall_for_configurations(args.graph)
-        else:
-            analyzer.analyze(args.mode, args.table, args.timestamp, [int(l) for l in args.limit.split(',')])  # Split limit argument into list
+        checkpoint_file = None
+        if args.incremental:
+            from src.db.checkpoint import checkpoint_path
+            checkpoint_file = args.checkpoint_file or checkpoint_path(args.db_path)
+        cache_file = None
+        if not args.no_cache and config.get('result_cache', {}).get('enabled', True):
+            from src.db.result_cache import cache_path
+            cache_file = args.cache_file or cache_path(args.db_path)
+        from src.analyzer.je_analyzer import JeAnalyzer
+        analyzer = JeAnalyzer(args.db_path, config, checkpoint_file, cache_file)
+        run(analyzer, args)
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
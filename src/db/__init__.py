@@ -1,4 +1,5 @@
 # src/db/__init__.py
+from .connection import ConnectionManager
 from .base_handler import BaseDBHandler
 from .stats_handler import StatsHandler
 from .display_handler import DisplayHandler
\ No newline at end of file
@@ -1,63 +1,329 @@
 # src/db/base_handler.py
+import json
+import os
 import sqlite3
-from typing import List, Optional, Any
+import sys
+from typing import List, Optional, Any, Tuple, Union
 from contextlib import contextmanager
 from ..utils.table_formatter import TableFormatter
+from .connection import ConnectionManager
+from .catalog import TableCatalog, INTERNAL_PREFIX, WRITES_TABLE
+from .streaming import DEFAULT_ARRAYSIZE, StreamingResult
+from .time_filter import TimeFilter
+from .checkpoint import (CheckpointStore, WATERMARK_COLUMN, merge_groups, json_rows_source,
+                         partial_signature)
 import re
+
+# Offset of the file change counter in the SQLite database header
+FILE_CHANGE_COUNTER_OFFSET = 24
+# Statements that change source rows in place, counted by track_writes
+WRITE_EVENTS = ('UPDATE', 'DELETE')
+
+def write_trigger_name(table_name: str, event: str) -> str:
+    return f"{INTERNAL_PREFIX}writes_{event.lower()}_{table_name}"
+
+def write_signature(db_path: str) -> list:
+    """Values that change on every committed write to a database file.
+
+    The header's file change counter is bumped by each transaction in
+    rollback-journal mode. In WAL mode it is not, but every commit
+    appends to (or, after a checkpoint, rewrites) the -wal file, so its
+    size and mtime are included, as are the main file's.
+    """
+    with open(db_path, 'rb') as f:
+        f.seek(FILE_CHANGE_COUNTER_OFFSET)
+        counter = int.from_bytes(f.read(4), 'big')
+    main = os.stat(db_path)
+    signature = [counter, main.st_size, main.st_mtime_ns]
+    wal_path = f"{db_path}-wal"
+    if os.path.exists(wal_path):
+        wal = os.stat(wal_path)
+        signature += [wal.st_size, wal.st_mtime_ns]
+    return signature
+
 class BaseDBHandler:
     """Base class for database operations"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, connection: Optional[ConnectionManager] = None):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Handlers created on their own keep a private, writable connection;
+        # JeAnalyzer passes one shared read-only manager to all its handlers.
+        self._owns_connection = connection is None
+        self.connection = connection or ConnectionManager(db_path, read_only=False)
+        self.conn = self.connection.conn
         self.formatter = TableFormatter()
+        # Query typed shadow copies (see NormalizeHandler) when they are current
+        self.use_typed_tables = True
+        # Answer snapshot-level analyses from rollups (see RollupHandler) when current
+        self.use_rollups = True
+        # Set to a CheckpointStore to aggregate only snapshots added since the last run
+        self.checkpoints: Optional[CheckpointStore] = None
+        self._index_hints = set()
+
+    @property
+    def arraysize(self) -> int:
+        """Rows fetched at a time by streamed results ('arraysize' in the connection profile)"""
+        return self.connection.profile.get('arraysize') or DEFAULT_ARRAYSIZE
+
+    def stream_query(self, query: str, params: tuple = ()) -> StreamingResult:
+        """Execute a query on its own cursor and return its rows as a lazy, chunked iterator"""
+        cursor = self.conn.cursor()
+        cursor.arraysize = self.arraysize
+        try:
+            cursor.execute(query, params)
+        except Exception:
+            cursor.close()
+            raise
+        return StreamingResult(cursor)
 
     @contextmanager
     def _get_cursor(self):
-        """Context manager for database cursor"""
+        """Context manager for database cursor (reads never commit)"""
         cursor = self.conn.cursor()
+        cursor.arraysize = self.arraysize
         try:
             yield cursor
+        except Exception:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def _get_write_cursor(self):
+        """Context manager for a cursor whose changes are committed together on success.
+
+        The transaction is opened explicitly: sqlite3 would otherwise run
+        DROP/CREATE statements in autocommit mode, and readers could see a
+        rebuilt table empty, or a failed rebuild leave it so.
+        """
+        cursor = self.conn.cursor()
+        try:
+            if not self.conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            yield cursor
             self.conn.commit()
+            # Derived-table registries may have changed
+            self.catalog.invalidate()
         except Exception:
             self.conn.rollback()
             raise
         finally:
             cursor.close()
 
-    def get_matching_tables(self, pattern: str = None) -> List[str]:
-        """Get tables matching pattern: prefix*, *suffix, or exact name"""
-        tables = self.list_tables()
-        if not pattern:
-            return tables
-            
-        if pattern.startswith('*') and pattern.endswith('*'):
-            substr = pattern[1:-1]
-            return [t for t in tables if substr in t]
-        elif pattern.startswith('*'):
-            suffix = pattern[1:]
-            return [t for t in tables if t.endswith(suffix)]
-        elif pattern.endswith('*'):
-            prefix = pattern[:-1]
-            return [t for t in tables if t.startswith(prefix)]
-        return [t for t in tables if t == pattern]
+    @property
+    def catalog(self) -> TableCatalog:
+        """Cached table catalog shared by all handlers of the connection"""
+        return self.connection.catalog
+
     def get_matching_tables(self, pattern: str = None) -> List[str]:
         """Get tables matching the regex pattern"""
-        tables = self.list_tables()
         if not pattern:
-            return tables
+            return self.list_tables()
 
         try:
-            regex = re.compile(pattern)
-            return [t for t in tables if regex.search(t)]
+            return self.catalog.match(pattern)
         except re.error:
             print(f"Invalid regex pattern: {pattern}")
             return []
+
     def list_tables(self) -> List[str]:
         """Get list of all tables in database"""
+        return self.catalog.tables
+
+    def resolve_table(self, table_name: str) -> str:
+        """Name of the table analyses should read: the typed copy if it is current"""
+        if not self.use_typed_tables:
+            return table_name
+        entry = self.catalog.typed_tables().get(table_name)
+        if not entry:
+            return table_name
+        typed_table, watermark, writes = entry
+        return typed_table if self.is_unchanged(table_name, watermark, writes) else table_name
+
+    def resolve_rollup(self, table_name: str) -> Optional[str]:
+        """Per-snapshot rollup of a table (see RollupHandler) if it is current, else None"""
+        if not self.use_rollups:
+            return None
+        entry = self.catalog.rollups().get(table_name)
+        if not entry:
+            return None
+        rollup_table, watermark, writes = entry
+        return rollup_table if self.is_unchanged(table_name, watermark, writes) else None
+
+    def resolve_arena_table(self, kind: str) -> Optional[str]:
+        """Long-format table of all per-arena tables of a kind (see ConsolidateHandler) if current"""
+        entry = self.catalog.arena_sources().get(kind)
+        if not entry:
+            return None
+        arena_table, sources = entry
+        current = {table for _, table in self.catalog.arena_kind_tables(kind)}
+        if current != set(sources):
+            return None
+        if not all(self.is_unchanged(table, rowid, writes) for table, (_, rowid, writes) in sources.items()):
+            return None
+        return arena_table
+
+    def max_rowid(self, table_name: str) -> Optional[int]:
+        """MAX(rowid) of a table: the watermark derived tables are checked against"""
+        return self.conn.execute(f'SELECT MAX(rowid) FROM "{table_name}"').fetchone()[0]
+
+    def track_writes(self, cur, table_name: str) -> int:
+        """Count in-place UPDATEs/DELETEs of a source table from now on; returns the current count.
+
+        MAX(rowid) only shows appends, so derived tables also record this
+        count. The triggers go away with the table: a source that was
+        dropped and re-created is untracked (see write_count), and
+        tracking it again bumps its count past any recorded one.
+        """
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {WRITES_TABLE} "
+                    f"(source_table TEXT PRIMARY KEY, writes INTEGER NOT NULL)")
+        cur.execute(f"INSERT OR IGNORE INTO {WRITES_TABLE} VALUES (?, 0)", (table_name,))
+        literal = table_name.replace("'", "''")
+        for event in WRITE_EVENTS:
+            trigger = write_trigger_name(table_name, event)
+            if self.catalog.has_trigger(trigger):
+                continue
+            cur.execute(f"UPDATE {WRITES_TABLE} SET writes = writes + 1 WHERE source_table = ?", (table_name,))
+            cur.execute(f'CREATE TRIGGER IF NOT EXISTS "{trigger}" AFTER {event} ON "{table_name}" BEGIN '
+                        f"UPDATE {WRITES_TABLE} SET writes = writes + 1 WHERE source_table = '{literal}'; END")
+        cur.execute(f"SELECT writes FROM {WRITES_TABLE} WHERE source_table = ?", (table_name,))
+        return cur.fetchone()[0]
+
+    def add_registry_writes_column(self, cur, registry: str) -> None:
+        """Add the source_writes column to a registry created before it was recorded"""
+        cur.execute(f"PRAGMA table_info({registry})")
+        if 'source_writes' not in {row[1] for row in cur.fetchall()}:
+            cur.execute(f"ALTER TABLE {registry} ADD COLUMN source_writes INTEGER")
+
+    def write_count(self, table_name: str) -> Optional[int]:
+        """In-place writes counted on a table by track_writes; None if it is not tracked"""
+        if not all(self.catalog.has_trigger(write_trigger_name(table_name, event)) for event in WRITE_EVENTS):
+            return None
+        row = self.conn.execute(f"SELECT writes FROM {WRITES_TABLE} WHERE source_table = ?",
+                                (table_name,)).fetchone()
+        return row[0] if row else None
+
+    def is_unchanged(self, table_name: str, watermark: Optional[int], writes: Optional[int]) -> bool:
+        """True if a table has neither grown past `watermark` nor been written in place since `writes` was read"""
+        return (writes is not None and self.max_rowid(table_name) == watermark
+                and self.write_count(table_name) == writes)
+
+    def data_fingerprint(self, tables: List[str]) -> list:
+        """What results computed from `tables` depend on (see ResultCache).
+
+        The schema version, the database file identity and its write
+        signature (see write_signature), plus the MAX(rowid) of every
+        table. Any committed write changes the signature, so in-place
+        UPDATEs and DELETEs invalidate as well as appends and rebuilds;
+        the price is that writes to unrelated tables invalidate too.
+        """
+        return [self.catalog.schema_version, os.stat(self.db_path).st_ino, write_signature(self.db_path),
+                [[table, self.max_rowid(table)] for table in tables]]
+
+    def aggregate_source(self, name: str, table: str, keys: List[str],
+                         partials: List[Tuple[str, str, str]], where: Optional[str] = None,
+                         timestamp: Any = None) -> Tuple[str, tuple]:
+        """SELECT body (and its parameters) yielding `keys` plus grouped partial aggregates.
+
+        partials are (alias, aggregate expression, merge op in MERGE_OPS).
+        Without a checkpoint store this is a plain GROUP BY over the table.
+        With one, only rows whose WATERMARK_COLUMN is above the saved
+        watermark are aggregated; they are merged into the saved groups,
+        which are handed back to SQLite as JSON rows. A timestamp or
+        TimeFilter restricts the scan to its snapshots and bypasses the
+        checkpoints, which always cover the whole table.
+        """
+        source = self.resolve_table(table)
+        select = ', '.join(list(keys) + [f"{expr} AS {alias}" for alias, expr, _ in partials])
+        group_by = f" GROUP BY {', '.join(keys)}" if keys else ""
+        conditions = [where] if where else []
+        columns = {col for col, _ in self.get_table_schema(source)}
+        time_condition, time_params = self.snapshot_filter(source, timestamp)
+        if time_condition:
+            conditions.append(time_condition)
+        if self.checkpoints is None or WATERMARK_COLUMN not in columns or time_condition:
+            where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            return f'SELECT {select} FROM "{source}"{where_sql}{group_by}', time_params
+
+        key = f"{name}:{table}"
+        signature = partial_signature(source, keys, partials, where)
+        state = self.checkpoints.get(key)
         with self._get_cursor() as cur:
-            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            return [row[0] for row in cur.fetchall()]
+            cur.execute(f'SELECT MAX({WATERMARK_COLUMN}) FROM "{source}"')
+            high = cur.fetchone()[0]
+            # Start over when the query changed or the table was rewritten
+            if (not state or state['signature'] != signature or high is None
+                    or (state['watermark'] is not None and high < state['watermark'])):
+                state = {'signature': signature, 'watermark': None, 'groups': []}
+            low = state['watermark']
+            if high is not None and high != low:
+                delta = conditions + [f"{WATERMARK_COLUMN} <= ?"]
+                params = [high]
+                if low is not None:
+                    delta.append(f"{WATERMARK_COLUMN} > ?")
+                    params.append(low)
+                cur.execute(f'SELECT {select} FROM "{source}" WHERE {" AND ".join(delta)}{group_by}', params)
+                state['groups'] = merge_groups(state['groups'], cur.fetchall(), len(keys),
+                                               [op for _, _, op in partials])
+                state['watermark'] = high
+                self.checkpoints.put(key, state)
+        columns = list(keys) + [alias for alias, _, _ in partials]
+        return json_rows_source(columns), (json.dumps(state['groups']),)
+
+    def typed_numeric_columns(self, table_name: str) -> set:
+        """Columns of a typed copy declared INTEGER or REAL"""
+        return {name for name, col_type in self.get_table_schema(table_name) if col_type in ('INTEGER', 'REAL')}
+
+    def has_index(self, table_name: str, columns: Tuple[str, ...]) -> bool:
+        """True if an index recorded by `je-analyze index` starts with these columns"""
+        columns = tuple(columns)
+        indexes = self.catalog.recorded_indexes().get(table_name, [])
+        return any(index[:len(columns)] == columns for index in indexes)
+
+    def hint_missing_index(self, tables: Union[str, List[str]], columns: Tuple[str, ...]) -> None:
+        """Suggest `je-analyze index` once per table/columns the analysis looks up by.
+
+        tables is one table or all the tables of one analysis; those lacking
+        the index share a single note.
+        """
+        columns = tuple(columns)
+        tables = [tables] if isinstance(tables, str) else tables
+        missing = [table for table in dict.fromkeys(tables)
+                   if (table, columns) not in self._index_hints and not self.has_index(table, columns)]
+        if not missing:
+            return
+        self._index_hints.update((table, columns) for table in missing)
+        if len(missing) == 1:
+            subject = f"{missing[0]}({', '.join(columns)}) is not indexed"
+        else:
+            shown = ', '.join(missing[:3]) + (', ...' if len(missing) > 3 else '')
+            subject = f"{len(missing)} tables lack an index on {', '.join(columns)} ({shown})"
+        print(f"Note: {subject}; run 'je-analyze index {self.db_path}' to avoid full scans", file=sys.stderr)
+
+    @staticmethod
+    def snapshot_columns(columns: List[str]) -> Tuple[str, ...]:
+        """The column a time filter on a table with these columns looks rows up by"""
+        return ('timestamp',) if 'timestamp' in columns else ('metadata_id',)
+
+    def snapshot_filter(self, table_name: str, timestamp: Any = None, hint: bool = True) -> Tuple[str, tuple]:
+        """WHERE condition (and its parameters) keeping the rows of the snapshots a timestamp or TimeFilter selects.
+
+        ("", ()) when nothing is filtered; raises ValueError if the table has
+        no timestamp or metadata_id column to filter by. hint=False leaves
+        the missing-index note to a caller filtering several tables.
+        """
+        time_filter = TimeFilter.of(timestamp)
+        if not time_filter:
+            return "", ()
+        columns = [col for col, _ in self.get_table_schema(table_name)]
+        condition = time_filter.table_condition(f'"{table_name}"', columns)
+        if condition is None:
+            raise ValueError(f"Table '{table_name}' has no timestamp or metadata_id column to filter by")
+        if hint:
+            self.hint_missing_index(table_name, self.snapshot_columns(columns))
+        return condition, time_filter.params
 
     def get_table_schema(self, table_name: str) -> List[tuple]:
         """Get schema information for a table"""
@@ -88,5 +354,6 @@ class BaseDBHandler:
                 return False
 
     def close(self) -> None:
-        """Close database connection"""
-        self.conn.close()
\ No newline at end of file
+        """Close database connection if this handler owns it"""
+        if self._owns_connection:
+            self.connection.close()
\ No newline at end of file
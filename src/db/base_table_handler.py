@@ -1,14 +1,14 @@
 # src/db/base_table_handler.py
-import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from src.db.base_handler import BaseDBHandler
+from src.db.connection import ConnectionManager
+from src.db.schema_registry import SchemaRegistry
 from constants import *
 
 class BaseTableHandler(BaseDBHandler):
-    def __init__(self, db_path: str, schema_path: str):
-        super().__init__(db_path)
-        with open(schema_path, 'r') as f:
-            self.schemas = json.load(f)
+    def __init__(self, db_path: str, schema_path: str, connection: Optional[ConnectionManager] = None):
+        super().__init__(db_path, connection)
+        self.schemas = SchemaRegistry.from_file(schema_path)
 
     def get_schema(self, table_name: str) -> Dict[str, Any]:
         return self.schemas.get(table_name, {})
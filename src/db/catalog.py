@@ -0,0 +1,244 @@
+# src/db/catalog.py
+import re
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+from constants import *
+
+STATS_PREFIX = 'stats-'
+# Tables and indexes the analyzer derives from the raw data (typed copies,
+# rollups, bookkeeping). They are hidden from the regular listings.
+INTERNAL_PREFIX = '_je_'
+# Registry of typed shadow copies written by `je-analyze normalize`
+TYPED_REGISTRY_TABLE = '_je_typed_tables'
+# Registry of indexes written by `je-analyze index`
+INDEX_REGISTRY_TABLE = '_je_indexes'
+# Registry of per-snapshot rollups written by `je-analyze rollup`
+ROLLUP_REGISTRY_TABLE = '_je_rollups'
+# Registry of the per-arena tables folded into long-format arena tables by `je-analyze consolidate`
+ARENA_REGISTRY_TABLE = '_je_arena_sources'
+# In-place UPDATEs/DELETEs per source table, counted by triggers the
+# derived-table builders install (see BaseDBHandler.track_writes)
+WRITES_TABLE = '_je_source_writes'
+
+def is_internal_table(table: str) -> bool:
+    """Derived analyzer tables and SQLite's own (sqlite_stat1, ...)"""
+    return table.startswith(INTERNAL_PREFIX) or table.startswith('sqlite_')
+
+ARENA_SECTION_RE = re.compile(r'^arenas-(\d+)$')
+
+class TableCatalog:
+    """In-memory index of the tables of one connection.
+
+    Built from sqlite_master on first use and rebuilt only when
+    PRAGMA schema_version changes. Table names are indexed by section
+    (the part before SECTION_TABLE_CON), by table kind (the part after it),
+    by arena id and by the 'stats-' prefix. Regex lookups are memoized.
+    Derived and SQLite-internal tables are tracked separately.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._schema_version = None
+        self._data_version = None
+        self._tables: List[str] = []
+        self._names: set = set()
+        self._internal: List[str] = []
+        self._triggers: set = set()
+        self._typed: Optional[Dict[str, Tuple[str, int]]] = None
+        self._indexes: Optional[Dict[str, List[Tuple[str, ...]]]] = None
+        self._rollups: Optional[Dict[str, Tuple[str, int]]] = None
+        self._arena_sources: Optional[Dict[str, Tuple[str, Dict[str, Tuple[int, int, Optional[int]]]]]] = None
+        self._by_section: Dict[str, List[str]] = {}
+        self._by_kind: Dict[str, List[str]] = {}
+        self._by_arena: Dict[int, List[str]] = {}
+        self._stats_tables: List[str] = []
+        self._match_cache: Dict[Tuple[str, str], List[str]] = {}
+
+    def invalidate(self) -> None:
+        """Forget the registry contents; they are reloaded on next use"""
+        self._typed = None
+        self._indexes = None
+        self._rollups = None
+        self._arena_sources = None
+
+    def _refresh(self) -> None:
+        # Registries change without a schema change; data_version moves
+        # whenever another connection commits
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self.invalidate()
+        schema_version = self.conn.execute("PRAGMA schema_version").fetchone()[0]
+        if schema_version == self._schema_version:
+            return
+        rows = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
+        names = [row[0] for row in rows]
+        self._tables = [t for t in names if not is_internal_table(t)]
+        self._internal = [t for t in names if is_internal_table(t)]
+        self._names = set(names)
+        self._triggers = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'")}
+        self._by_section, self._by_kind, self._by_arena = {}, {}, {}
+        self._stats_tables = []
+        self._match_cache = {}
+        self.invalidate()
+        for table in self._tables:
+            name = table
+            if name.startswith(STATS_PREFIX):
+                self._stats_tables.append(table)
+                name = name[len(STATS_PREFIX):]
+            section, sep, kind = name.partition(SECTION_TABLE_CON)
+            if not sep:
+                continue
+            self._by_section.setdefault(section, []).append(table)
+            self._by_kind.setdefault(kind, []).append(table)
+            arena = ARENA_SECTION_RE.match(section)
+            if arena:
+                self._by_arena.setdefault(int(arena.group(1)), []).append(table)
+        self._schema_version = schema_version
+
+    @staticmethod
+    def parse_table_name(table: str) -> Dict[str, Optional[str]]:
+        """Split a table name into its stats flag, section, kind and arena id"""
+        is_stats = table.startswith(STATS_PREFIX)
+        name = table[len(STATS_PREFIX):] if is_stats else table
+        section, sep, kind = name.partition(SECTION_TABLE_CON)
+        arena = ARENA_SECTION_RE.match(section) if sep else None
+        return {
+            'stats': is_stats,
+            'section': section if sep else None,
+            'kind': kind if sep else None,
+            'arena_id': int(arena.group(1)) if arena else None,
+        }
+
+    @property
+    def tables(self) -> List[str]:
+        """All table names, sorted"""
+        self._refresh()
+        return list(self._tables)
+
+    def list_tables(self, prefix: str = None) -> List[str]:
+        """All table names, optionally filtered by prefix"""
+        self._refresh()
+        if not prefix:
+            return list(self._tables)
+        return [t for t in self._tables if t.startswith(prefix)]
+
+    def section_tables(self, section: str) -> List[str]:
+        self._refresh()
+        return list(self._by_section.get(section, []))
+
+    def kind_tables(self, kind: str) -> List[str]:
+        self._refresh()
+        return list(self._by_kind.get(kind, []))
+
+    def arena_tables(self, arena_id: int = None) -> List[str]:
+        """Tables of one arena, or of every arena when arena_id is None"""
+        self._refresh()
+        if arena_id is not None:
+            return list(self._by_arena.get(arena_id, []))
+        return [t for arena in sorted(self._by_arena) for t in self._by_arena[arena]]
+
+    def arena_kind_tables(self, kind: str) -> List[Tuple[int, str]]:
+        """(arena id, table) of the per-arena tables of one kind ('overall', 'bins_v0', ...)"""
+        self._refresh()
+        tables = []
+        for table in self._by_kind.get(kind, []):
+            parsed = self.parse_table_name(table)
+            if parsed['arena_id'] is not None and not parsed['stats']:
+                tables.append((parsed['arena_id'], table))
+        return sorted(tables)
+
+    def arena_ids(self) -> List[int]:
+        self._refresh()
+        return sorted(self._by_arena)
+
+    def stats_tables(self) -> List[str]:
+        self._refresh()
+        return list(self._stats_tables)
+
+    def internal_tables(self) -> List[str]:
+        self._refresh()
+        return list(self._internal)
+
+    def _writes_column(self, registry: str) -> str:
+        """source_writes, or NULL for registries written before it was recorded"""
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({registry})")}
+        return 'source_writes' if 'source_writes' in columns else 'NULL'
+
+    def _load_registry(self, registry: str, derived_column: str) -> Dict[str, Tuple[str, int, Optional[int]]]:
+        """source table -> (derived table, source MAX(rowid) and write count when it was built)"""
+        if registry not in self._names:
+            return {}
+        rows = self.conn.execute(f"SELECT source_table, {derived_column}, source_max_rowid, "
+                                 f"{self._writes_column(registry)} FROM {registry}").fetchall()
+        return {source: (derived, rowid, writes) for source, derived, rowid, writes in rows
+                if derived in self._names}
+
+    def typed_tables(self) -> Dict[str, Tuple[str, int, Optional[int]]]:
+        """source table -> (typed copy, source MAX(rowid) and write count when the copy was built)"""
+        self._refresh()
+        if self._typed is None:
+            self._typed = self._load_registry(TYPED_REGISTRY_TABLE, 'typed_table')
+        return self._typed
+
+    def rollups(self) -> Dict[str, Tuple[str, int, Optional[int]]]:
+        """source table -> (rollup table, source MAX(rowid) it has absorbed, source write count)"""
+        self._refresh()
+        if self._rollups is None:
+            self._rollups = self._load_registry(ROLLUP_REGISTRY_TABLE, 'rollup_table')
+        return self._rollups
+
+    def recorded_indexes(self) -> Dict[str, List[Tuple[str, ...]]]:
+        """table -> column tuples of the indexes recorded by `je-analyze index`"""
+        self._refresh()
+        if self._indexes is None:
+            self._indexes = {}
+            if INDEX_REGISTRY_TABLE in self._names:
+                existing = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+                rows = self.conn.execute(f"SELECT index_name, table_name, columns FROM {INDEX_REGISTRY_TABLE}").fetchall()
+                for index_name, table, columns in rows:
+                    if index_name in existing:
+                        self._indexes.setdefault(table, []).append(tuple(columns.split(',')))
+        return self._indexes
+
+    def arena_sources(self) -> Dict[str, Tuple[str, Dict[str, Tuple[int, int, Optional[int]]]]]:
+        """kind -> (long-format arena table, {source table: (arena id, source MAX(rowid), source write count)})"""
+        self._refresh()
+        if self._arena_sources is None:
+            self._arena_sources = {}
+            if ARENA_REGISTRY_TABLE in self._names:
+                rows = self.conn.execute(f"SELECT kind, arena_table, source_table, arena_id, source_max_rowid, "
+                                         f"{self._writes_column(ARENA_REGISTRY_TABLE)} "
+                                         f"FROM {ARENA_REGISTRY_TABLE}").fetchall()
+                for kind, arena_table, source, arena_id, rowid, writes in rows:
+                    if arena_table in self._names:
+                        entry = self._arena_sources.setdefault(kind, (arena_table, {}))
+                        entry[1][source] = (arena_id, rowid, writes)
+        return self._arena_sources
+
+    @property
+    def schema_version(self) -> int:
+        self._refresh()
+        return self._schema_version
+
+    def has_table(self, table: str) -> bool:
+        """True for any existing table, derived tables included"""
+        self._refresh()
+        return table in self._names
+
+    def has_trigger(self, trigger: str) -> bool:
+        self._refresh()
+        return trigger in self._triggers
+
+    def match(self, pattern: str, how: str = 'search') -> List[str]:
+        """Tables matching a regex, using re.search (default) or re.match semantics.
+
+        Raises re.error for invalid patterns.
+        """
+        self._refresh()
+        key = (pattern, how)
+        if key not in self._match_cache:
+            regex = re.compile(pattern)
+            test = regex.match if how == 'match' else regex.search
+            self._match_cache[key] = [t for t in self._tables if test(t)]
+        return list(self._match_cache[key])
@@ -0,0 +1,74 @@
+# src/db/checkpoint.py
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Column new rows are detected by: je_metadata.id of the snapshot a row belongs to
+WATERMARK_COLUMN = 'metadata_id'
+# How partial aggregates of the same group combine
+MERGE_OPS = {
+    'sum': lambda a, b: b if a is None else a if b is None else a + b,
+    'max': lambda a, b: b if a is None else a if b is None else max(a, b),
+    'min': lambda a, b: b if a is None else a if b is None else min(a, b),
+}
+
+def checkpoint_path(db_path: str) -> str:
+    """Default sidecar file for the checkpoints of a database"""
+    return f"{db_path}.checkpoints.json"
+
+class CheckpointStore:
+    """Saved state of incremental analyses, kept in a JSON sidecar file.
+
+    Each entry holds the grouped partial aggregates of one analysis over
+    one table together with the highest WATERMARK_COLUMN value they cover,
+    so the next run only has to aggregate the rows of newer snapshots.
+    Entries are written back by save(); the analyzed database is never
+    written to.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._entries = json.load(f)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def put(self, key: str, state: dict) -> None:
+        self._entries[key] = state
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the entries if they changed (atomically, via a temp file)"""
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+def merge_groups(groups: List[list], rows: Sequence[Sequence[Any]], key_len: int, ops: List[str]) -> List[list]:
+    """Fold newly aggregated rows (key columns, then partials) into saved groups"""
+    merged = {tuple(group[:key_len]): list(group) for group in groups}
+    for row in rows:
+        key = tuple(row[:key_len])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = list(row)
+            continue
+        for i, op in enumerate(ops, start=key_len):
+            current[i] = MERGE_OPS[op](current[i], row[i])
+    return list(merged.values())
+
+def json_rows_source(columns: List[str]) -> str:
+    """SELECT body that turns a JSON array of rows (bound as ?) back into columns"""
+    extracts = ', '.join(f"json_extract(value, '$[{i}]') AS {col}" for i, col in enumerate(columns))
+    return f"SELECT {extracts} FROM json_each(?)"
+
+def partial_signature(table: str, keys: List[str], partials: List[Tuple[str, str, str]], where: Optional[str]) -> list:
+    """What a saved state was computed with; any change invalidates it"""
+    return [table, list(keys), [list(p) for p in partials], where]
@@ -0,0 +1,92 @@
+# src/db/connection.py
+import sqlite3
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from .catalog import TableCatalog
+
+# Pragmas applied to every analysis connection. The analyzer only reads, so
+# the defaults favour a large page cache and memory-mapped I/O.
+DEFAULT_READ_PROFILE = {
+    'mmap_size': 256 * 1024 * 1024,   # bytes
+    'cache_size': -64 * 1024,         # negative => KiB (64 MiB)
+    'temp_store': 'MEMORY',
+    'query_only': True,
+    'cached_statements': 256,
+    'arraysize': 1000,                # rows per fetchmany() when results are streamed
+}
+
+class ConnectionManager:
+    """Owns the SQLite connection shared by all handlers of one analyzer"""
+
+    def __init__(self, db_path: str, read_only: bool = True, profile: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.profile = dict(DEFAULT_READ_PROFILE)
+        if profile:
+            self.profile.update(profile)
+        self._conn = None
+        self._catalog = None
+        self._readers: List[sqlite3.Connection] = []
+
+    @classmethod
+    def from_config(cls, db_path: str, config: Optional[Dict[str, Any]] = None) -> 'ConnectionManager':
+        """Build a manager from the optional 'connection' section of the analyzer config"""
+        profile = dict((config or {}).get('connection', {}))
+        read_only = profile.pop('read_only', True)
+        return cls(db_path, read_only=read_only, profile=profile)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The shared connection, opened on first use"""
+        if self._conn is None:
+            self._conn = self.connect()
+        return self._conn
+
+    @property
+    def catalog(self) -> TableCatalog:
+        """Table catalog of the shared connection"""
+        if self._catalog is None:
+            self._catalog = TableCatalog(self.conn)
+        return self._catalog
+
+    def connect(self, read_only: Optional[bool] = None, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Open a new connection with the read profile applied"""
+        read_only = self.read_only if read_only is None else read_only
+        cached_statements = self.profile.get('cached_statements', 128)
+        if read_only:
+            uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, cached_statements=cached_statements,
+                                   check_same_thread=check_same_thread)
+        else:
+            conn = sqlite3.connect(self.db_path, cached_statements=cached_statements,
+                                   check_same_thread=check_same_thread)
+        self._apply_profile(conn, read_only)
+        return conn
+
+    def readers(self, count: int) -> List[sqlite3.Connection]:
+        """`count` read-only connections for parallel queries, opened on first use.
+
+        They may be used from any thread, one thread at a time each.
+        """
+        while len(self._readers) < count:
+            self._readers.append(self.connect(read_only=True, check_same_thread=False))
+        return self._readers[:count]
+
+    def _apply_profile(self, conn: sqlite3.Connection, read_only: bool) -> None:
+        for pragma in ('mmap_size', 'cache_size', 'temp_store'):
+            value = self.profile.get(pragma)
+            if value is not None:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+        # query_only only makes sense for connections that are meant to read
+        if read_only and self.profile.get('query_only'):
+            conn.execute("PRAGMA query_only = ON")
+
+    def close(self) -> None:
+        """Close the shared connection and the parallel readers if they were opened"""
+        for reader in self._readers:
+            reader.close()
+        self._readers = []
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._catalog = None
@@ -0,0 +1,122 @@
+# src/db/consolidate_handler.py
+import time
+from typing import Dict, List, Optional
+from .base_handler import BaseDBHandler
+from .catalog import INTERNAL_PREFIX, ARENA_REGISTRY_TABLE
+from constants import *
+
+def arena_table_name(kind: str) -> str:
+    return f"{INTERNAL_PREFIX}arenas_{kind}"
+
+class ConsolidateHandler(BaseDBHandler):
+    """Folds the per-arena tables of a kind into one long-format table.
+
+    `arenas-0__overall`, `arenas-1__overall`, ... become the rows of
+    `_je_arenas_overall` with an explicit arena_id column, indexed on
+    (metadata_id, arena_id) and (arena_id), so per-arena analyses run as
+    one GROUP BY instead of a UNION ALL over hundreds of tables. Each source
+    is recorded in ARENA_REGISTRY_TABLE with its MAX(rowid) and in-place
+    write count (see track_writes); a refresh only appends the rows added
+    since and reloads sources that were updated, shrunk or re-created.
+    """
+
+    def consolidate(self, kinds: Optional[List[str]] = None) -> List[dict]:
+        """Build or refresh the long-format tables of the given (default: all) kinds"""
+        with self._get_write_cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {ARENA_REGISTRY_TABLE} (
+                    source_table TEXT PRIMARY KEY,
+                    kind TEXT,
+                    arena_table TEXT,
+                    arena_id INTEGER,
+                    source_max_rowid INTEGER,
+                    built_at REAL,
+                    source_writes INTEGER
+                )
+            """)
+            self.add_registry_writes_column(cur, ARENA_REGISTRY_TABLE)
+        if not kinds:
+            parsed = [self.catalog.parse_table_name(table) for table in self.catalog.arena_tables()]
+            kinds = sorted({name['kind'] for name in parsed if not name['stats']})
+        reports = [self.build_arena_table(kind) for kind in kinds]
+        return [report for report in reports if report]
+
+    def _source_columns(self, sources: List[str]) -> Dict[str, str]:
+        """Union of the source columns (name -> declared type), in first-seen order"""
+        columns = {}
+        for table in sources:
+            for name, col_type in self.get_table_schema(table):
+                if name != 'arena_id':
+                    columns.setdefault(name, col_type)
+        return columns
+
+    def build_arena_table(self, kind: str) -> Optional[dict]:
+        sources = self.catalog.arena_kind_tables(kind)
+        if not sources:
+            return None
+        arena_table = arena_table_name(kind)
+        recorded = self.catalog.arena_sources().get(kind, (arena_table, {}))[1]
+        columns = self._source_columns([table for _, table in sources])
+
+        start = time.perf_counter()
+        appended = reloaded = 0
+        with self._get_write_cursor() as cur:
+            definitions = ', '.join(f'"{name}" {col_type}' for name, col_type in columns.items())
+            cur.execute(f'CREATE TABLE IF NOT EXISTS "{arena_table}" (arena_id INTEGER, {definitions})')
+            cur.execute(f'PRAGMA table_info("{arena_table}")')
+            existing = {row[1] for row in cur.fetchall()}
+            for name, col_type in columns.items():
+                if name not in existing:
+                    cur.execute(f'ALTER TABLE "{arena_table}" ADD COLUMN "{name}" {col_type}')
+
+            current = {table for _, table in sources}
+            for table, (arena_id, _, _) in recorded.items():
+                if table not in current:
+                    cur.execute(f'DELETE FROM "{arena_table}" WHERE arena_id = ?', (arena_id,))
+                    cur.execute(f"DELETE FROM {ARENA_REGISTRY_TABLE} WHERE source_table = ?", (table,))
+
+            for arena_id, table in sources:
+                high = self.max_rowid(table)
+                writes = self.track_writes(cur, table)
+                _, low, recorded_writes = recorded.get(table, (None, None, None))
+                if low is None or high is None or high < low or writes != recorded_writes:
+                    # New, updated or re-created source: (re)load all of it
+                    cur.execute(f'DELETE FROM "{arena_table}" WHERE arena_id = ?', (arena_id,))
+                    low = None
+                    reloaded += 1
+                if high is not None and high != low:
+                    table_columns = ', '.join(f'"{name}"' for name, _ in self.get_table_schema(table)
+                                              if name != 'arena_id')
+                    cur.execute(f'INSERT INTO "{arena_table}" (arena_id, {table_columns}) '
+                                f'SELECT ?, {table_columns} FROM "{table}" WHERE rowid > ?', (arena_id, low or 0))
+                    appended += cur.rowcount
+                cur.execute(f"INSERT OR REPLACE INTO {ARENA_REGISTRY_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (table, kind, arena_table, arena_id, high, time.time(), writes))
+
+            if 'metadata_id' in columns:
+                cur.execute(f'CREATE INDEX IF NOT EXISTS "{INTERNAL_PREFIX}idx_{arena_table}_meta" '
+                            f'ON "{arena_table}" (metadata_id, arena_id)')
+            cur.execute(f'CREATE INDEX IF NOT EXISTS "{INTERNAL_PREFIX}idx_{arena_table}_arena" '
+                        f'ON "{arena_table}" (arena_id)')
+            cur.execute(f'SELECT COUNT(*) FROM "{arena_table}"')
+            rows = cur.fetchone()[0]
+
+        return {
+            'kind': kind,
+            'arena_table': arena_table,
+            'sources': len(sources),
+            'reloaded_sources': reloaded,
+            'appended_rows': appended,
+            'rows': rows,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def print_report(self, reports: List[dict]) -> None:
+        if not reports:
+            print("No per-arena tables to consolidate")
+            return
+        headers = ["Kind", "Arena Table", "Sources", "Reloaded", "Appended Rows", "Rows", "Seconds"]
+        rows = [[r['kind'], r['arena_table'], r['sources'], r['reloaded_sources'], r['appended_rows'],
+                 r['rows'], f"{r['seconds']:.3f}"] for r in reports]
+        print("\n=== Consolidated arena tables ===")
+        self.formatter.print_table(headers, rows, len(headers))
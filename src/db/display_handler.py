@@ -1,17 +1,16 @@
 # src/db/display_handler.py
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple, Union
 from .base_handler import BaseDBHandler
+from .streaming import iter_chunks
 from constants import *
-import pandas as pd
 
 class DisplayHandler(BaseDBHandler):
     """Handles data display and formatting"""
-    def display_raw_data(self, table_pattern: str = None, limit: int = 10):
+    def display_raw_data(self, table_pattern: str = None, limit: int = 10, timestamp = None):
         with self._get_cursor() as cursor:
             
             # Get all table names
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            all_tables = [row[0] for row in cursor.fetchall()]
+            all_tables = self.list_tables()
             print("Available tables:")
             for table in all_tables:
                 print(f"- {table}")
@@ -24,31 +23,49 @@ class DisplayHandler(BaseDBHandler):
                 
                 for table in matching_tables:
                     print(f"\nDisplaying data for table: {table}")
-                    cursor.execute(f"SELECT * FROM {table} LIMIT {limit}")
+                    # The CLI passes [rows, columns]
+                    row_limit = limit[0] if isinstance(limit, (list, tuple)) else limit
+                    condition, params = self.snapshot_filter(table, timestamp)
+                    where = f" WHERE {condition}" if condition else ""
+                    cursor.execute(f'SELECT * FROM "{table}"{where} LIMIT ?', params + (row_limit,))
                     columns = [description[0] for description in cursor.description]
-                    rows = cursor.fetchall()
                     
                     print("Columns:", columns)
-                    for row in rows:
-                        print(row)
+                    for rows in iter_chunks(cursor):
+                        print("\n".join(map(str, rows)))
             else:
                 print("Please specify a table pattern to display data.")    
 
+    def export_raw_data(self, exporter, table_pattern: str = None, timestamp = None) -> None:
+        """Export every row of the tables whose name contains table_pattern (see display_raw_data)"""
+        if not table_pattern:
+            raise ValueError("Please specify a table pattern to export data.")
+        for table in [table for table in self.list_tables() if table_pattern in table]:
+            self.export_table_data(exporter, table, timestamp)
+
+    def export_table_data(self, exporter, table_name: str, timestamp = None) -> int:
+        """Stream all rows (of the snapshots a timestamp or TimeFilter selects) of a table to a ResultExporter"""
+        condition, params = self.snapshot_filter(table_name, timestamp)
+        where = f" WHERE {condition}" if condition else ""
+        with self._get_cursor() as cur:
+            cur.execute(f'SELECT * FROM "{table_name}"{where}', params)
+            columns = [description[0] for description in cur.description]
+            return exporter.write(table_name, columns, cur)
+
     def print_table_data(self, table_name: str, timestamp = None, limit=[20, 15]) -> None:
         """Print data from a table in tabular format"""
         schema = self.get_table_schema(table_name)
         headers = [col[0] for col in schema]
         print(f"\n=== {table_name} (Showing first {limit[0]} rows and first {limit[1]} columns):headers={headers}")
+        condition, params = self.snapshot_filter(table_name, timestamp)
+        where = f" WHERE {condition}" if condition else ""
         with self._get_cursor() as cur:
-            if timestamp:
-                cur.execute(f'SELECT * FROM "{table_name}" WHERE timestamp = "{timestamp}" LIMIT {limit[0]}')
-            else:
-                cur.execute(f'SELECT * FROM "{table_name}" LIMIT {limit[0]}')
-            rows = cur.fetchall()
+            cur.execute(f'SELECT * FROM "{table_name}"{where} LIMIT ?', params + (limit[0],))
             # print table name with capital letters
             
             print(f"\n=== {table_name.upper()} (Showing first {limit[0]} rows and first {limit[1]} columns):")
-            self.formatter.print_table(headers, rows, limit[1])
+            # Rows are formatted while they are read from the cursor
+            self.formatter.print_table(headers, cur, limit[1])
 
     def print_metadata_summary(self) -> None:
         """Print summary of metadata table with related data counts"""
@@ -95,6 +112,7 @@ class DisplayHandler(BaseDBHandler):
             self.formatter.print_table(headers, rows)
 
     def get_tables(self, graph_spec) -> List:
+        import pandas as pd
         with self._get_cursor() as cursor:
             table_prefix, x_column, y_column, *legend_column = graph_spec.split(',')
             legend_column = legend_column[0] if legend_column else None
@@ -114,4 +132,59 @@ class DisplayHandler(BaseDBHandler):
                 df = pd.read_sql_query(query, self.conn)
                 df['table'] = table
                 data.append(df)
-            return data
\ No newline at end of file
+            return data
+
+    def series_points(self, table_name: str, x_expr: str, y_expr: Union[str, Sequence[str]], buckets: int,
+                      timestamp = None) -> Tuple[List[tuple], int, Optional[float]]:
+        """(x, summed y) points of a table for plotting, thinned in SQL when there are many.
+
+        y is summed per x value. When more than `buckets` points remain, the
+        numeric x range is cut into `buckets` equal buckets and each keeps
+        only its lowest and highest point (plus the overall first and last),
+        so at most about 2 * buckets rows leave SQLite and spikes survive for
+        LTTB to pick. Returns (points ordered by x, number of points before
+        thinning, bucket width or None when nothing was thinned).
+
+        With a list of y expressions all of them are loaded in one scan:
+        points are (x, y1, y2, ...) and a bucket keeps the lowest and
+        highest point of every y, so each series thins as it would alone.
+        """
+        y_exprs = [y_expr] if isinstance(y_expr, str) else list(y_expr)
+        sums = ', '.join(f"SUM(CAST({y} AS FLOAT)) AS y{i}" for i, y in enumerate(y_exprs))
+        ys = ', '.join(f"y{i}" for i in range(len(y_exprs)))
+        ranks = ', '.join(f"ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY y{i} IS NULL, y{i}, pos) AS lowest{i}, "
+                          f"ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY y{i} IS NULL, y{i} DESC, pos) AS highest{i}"
+                          for i in range(len(y_exprs)))
+        extremes = ' OR '.join(f"lowest{i} = 1 OR highest{i} = 1" for i in range(len(y_exprs)))
+        condition, params = self.snapshot_filter(table_name, timestamp)
+        where = f"WHERE {condition}" if condition else ""
+        query = f"""
+            WITH points AS (
+                SELECT {x_expr} AS x, {sums}
+                FROM "{table_name}"
+                {where}
+                GROUP BY 1
+            ),
+            bounds AS (
+                SELECT x, {ys}, CAST(x AS REAL) AS pos, COUNT(*) OVER () AS total,
+                       MIN(CAST(x AS REAL)) OVER () AS lo, MAX(CAST(x AS REAL)) OVER () AS hi
+                FROM points
+                WHERE COALESCE({ys}, NULL) IS NOT NULL
+            ),
+            ranked AS (
+                SELECT *, {ranks}
+                FROM (SELECT *, CAST((pos - lo) * ? / NULLIF(hi - lo, 0) AS INTEGER) AS bucket FROM bounds)
+            )
+            SELECT x, {ys}, total, lo, hi
+            FROM ranked
+            WHERE total <= ? OR {extremes} OR pos = lo OR pos = hi
+            ORDER BY pos, x
+        """
+        with self._get_cursor() as cur:
+            cur.execute(query, params + (buckets, buckets))
+            rows = cur.fetchall()
+        if not rows:
+            return [], 0, None
+        total, lo, hi = rows[0][-3:]
+        width = (hi - lo) / buckets if total > buckets and hi is not None and hi > lo else None
+        return [row[:-3] for row in rows], total, width
@@ -0,0 +1,77 @@
+# src/db/index_handler.py
+import time
+from typing import List, Tuple
+from .base_handler import BaseDBHandler
+from .catalog import INTERNAL_PREFIX, INDEX_REGISTRY_TABLE
+from config.schemas_generator import get_primary_key_columns
+from constants import *
+
+# Columns analyses filter, join and window on
+LOOKUP_COLUMNS = ('timestamp', 'metadata_id')
+
+def index_name(table_name: str, suffix: str) -> str:
+    return f"{INTERNAL_PREFIX}idx_{table_name}_{suffix}"
+
+class IndexHandler(BaseDBHandler):
+    """Builds and records the indexes the analyses rely on.
+
+    Every stats table (and its typed copy, if any) gets an index on
+    (timestamp, metadata_id) and one on the primary-key columns the schema
+    generator identifies; when the first is a prefix of the second only the
+    primary-key index is built. Indexes are recorded in INDEX_REGISTRY_TABLE
+    so analyses can check for them with has_index().
+    """
+
+    def build_indexes(self, table_pattern: str = '.*') -> List[dict]:
+        with self._get_write_cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {INDEX_REGISTRY_TABLE} (
+                    index_name TEXT PRIMARY KEY,
+                    table_name TEXT,
+                    columns TEXT,
+                    created_at REAL
+                )
+            """)
+        typed = self.catalog.typed_tables()
+        reports = []
+        for table in self.get_matching_tables(table_pattern):
+            targets = [table] + ([typed[table][0]] if table in typed else [])
+            for target in targets:
+                for suffix, columns in self.index_specs(target):
+                    reports.append(self._create_index(target, suffix, columns))
+        with self._get_write_cursor() as cur:
+            cur.execute("ANALYZE")
+        self.print_report(reports)
+        return reports
+
+    def index_specs(self, table_name: str) -> List[Tuple[str, List[str]]]:
+        """(suffix, columns) of the indexes a table should have"""
+        columns = [name for name, _ in self.get_table_schema(table_name)]
+        lookup = [col for col in LOOKUP_COLUMNS if col in columns]
+        primary_key = get_primary_key_columns([{'name': col} for col in columns])
+        specs = []
+        if lookup and primary_key[:len(lookup)] != lookup:
+            specs.append(('ts', lookup))
+        if primary_key:
+            specs.append(('pk', primary_key))
+        return specs
+
+    def _create_index(self, table_name: str, suffix: str, columns: List[str]) -> dict:
+        name = index_name(table_name, suffix)
+        start = time.perf_counter()
+        with self._get_write_cursor() as cur:
+            quoted = ', '.join(f'"{col}"' for col in columns)
+            cur.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table_name}" ({quoted})')
+            cur.execute(f"INSERT OR REPLACE INTO {INDEX_REGISTRY_TABLE} VALUES (?, ?, ?, ?)",
+                        (name, table_name, ','.join(columns), time.time()))
+        return {'index': name, 'table': table_name, 'columns': columns,
+                'build_seconds': time.perf_counter() - start}
+
+    def print_report(self, reports: List[dict]) -> None:
+        if not reports:
+            print("No tables to index")
+            return
+        headers = ["Table", "Index", "Columns", "Build s"]
+        rows = [[r['table'], r['index'], ', '.join(r['columns']), f"{r['build_seconds']:.3f}"] for r in reports]
+        print("\n=== Indexes ===")
+        self.formatter.print_table(headers, rows, len(headers))
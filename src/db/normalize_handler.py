@@ -0,0 +1,140 @@
+# src/db/normalize_handler.py
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+from .base_handler import BaseDBHandler
+from .catalog import INTERNAL_PREFIX, TYPED_REGISTRY_TABLE
+from config.schemas_generator import can_be_integer
+from constants import *
+
+def typed_table_name(table_name: str) -> str:
+    return f"{INTERNAL_PREFIX}typed_{table_name}"
+
+class NormalizeHandler(BaseDBHandler):
+    """Builds typed INTEGER/REAL shadow copies of the TEXT stats tables.
+
+    Column types come from the schema generator's numeric inference, checked
+    against every row. Each copy is recorded in TYPED_REGISTRY_TABLE with
+    the source's MAX(rowid) and in-place write count (see track_writes),
+    and analyses switch to it through resolve_table() for as long as the
+    source has neither grown nor been updated.
+    """
+
+    def normalize(self, table_pattern: str = '.*') -> List[dict]:
+        """Build typed copies of all matching tables and print what they save"""
+        with self._get_write_cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {TYPED_REGISTRY_TABLE} (
+                    source_table TEXT PRIMARY KEY,
+                    typed_table TEXT,
+                    source_max_rowid INTEGER,
+                    built_at REAL,
+                    source_writes INTEGER
+                )
+            """)
+            self.add_registry_writes_column(cur, TYPED_REGISTRY_TABLE)
+        reports = []
+        for table in self.get_matching_tables(table_pattern):
+            report = self.build_typed_table(table)
+            if report:
+                reports.append(report)
+        self.print_report(reports)
+        return reports
+
+    def infer_column_types(self, table_name: str) -> List[Tuple[str, str]]:
+        """(column, INTEGER|REAL|TEXT) for every column of a table"""
+        with self._get_cursor() as cur:
+            columns = [name for name, _ in self.get_table_schema(table_name)]
+            candidates = [col for col in columns if can_be_integer(cur, table_name, col)]
+            if not candidates:
+                return [(col, 'TEXT') for col in columns]
+            # The generator samples; confirm on every row in one scan. Letters
+            # other than an exponent mark text, '.'/'e' mark real values.
+            checks = []
+            for col in candidates:
+                checks.append(f"""SUM(CAST("{col}" AS TEXT) GLOB '*[A-DF-Za-df-z]*')""")
+                checks.append(f"""SUM(CAST("{col}" AS TEXT) GLOB '*[.eE]*')""")
+            cur.execute(f"""SELECT {', '.join(checks)} FROM "{table_name}" """)
+            counts = cur.fetchone()
+        types = {}
+        for i, col in enumerate(candidates):
+            text_rows, real_rows = counts[2 * i] or 0, counts[2 * i + 1] or 0
+            types[col] = 'TEXT' if text_rows else ('REAL' if real_rows else 'INTEGER')
+        return [(col, types.get(col, 'TEXT')) for col in columns]
+
+    def build_typed_table(self, table_name: str) -> Optional[dict]:
+        """(Re)build the typed copy of one table; None if nothing is numeric"""
+        columns = self.infer_column_types(table_name)
+        numeric = [col for col, col_type in columns if col_type != 'TEXT']
+        if not numeric:
+            return None
+        typed_table = typed_table_name(table_name)
+        definitions = ', '.join(f'"{col}" {col_type}' for col, col_type in columns)
+        values = ', '.join(
+            f"""CASE WHEN TRIM(CAST("{col}" AS TEXT)) = '' THEN NULL ELSE CAST("{col}" AS {col_type}) END"""
+            if col_type != 'TEXT' else f'"{col}"'
+            for col, col_type in columns)
+
+        start = time.perf_counter()
+        with self._get_write_cursor() as cur:
+            cur.execute(f'SELECT MAX(rowid) FROM "{table_name}"')
+            watermark = cur.fetchone()[0]
+            writes = self.track_writes(cur, table_name)
+            cur.execute(f'DROP TABLE IF EXISTS "{typed_table}"')
+            cur.execute(f'CREATE TABLE "{typed_table}" ({definitions})')
+            cur.execute(f'INSERT INTO "{typed_table}" SELECT {values} FROM "{table_name}" ORDER BY rowid')
+            cur.execute(f"INSERT OR REPLACE INTO {TYPED_REGISTRY_TABLE} VALUES (?, ?, ?, ?, ?)",
+                        (table_name, typed_table, watermark, time.time(), writes))
+        build_seconds = time.perf_counter() - start
+
+        return {
+            'table': table_name,
+            'typed_columns': len(numeric),
+            'source_bytes': self._table_bytes(table_name),
+            'typed_bytes': self._table_bytes(typed_table),
+            'build_seconds': build_seconds,
+            'source_scan_seconds': self._time_scan(table_name, numeric, cast=True),
+            'typed_scan_seconds': self._time_scan(typed_table, numeric, cast=False),
+        }
+
+    def _table_bytes(self, table_name: str) -> Optional[int]:
+        """On-disk size of a table, if SQLite was built with the dbstat table"""
+        try:
+            with self._get_cursor() as cur:
+                cur.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (table_name,))
+                return cur.fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def _time_scan(self, table_name: str, columns: List[str], cast: bool) -> float:
+        """Time one aggregate pass over the numeric columns, as analyses run it"""
+        exprs = [f'SUM(CAST("{col}" AS FLOAT))' if cast else f'SUM("{col}")' for col in columns]
+        start = time.perf_counter()
+        with self._get_cursor() as cur:
+            cur.execute(f'SELECT {", ".join(exprs)} FROM "{table_name}"')
+            cur.fetchone()
+        return time.perf_counter() - start
+
+    def print_report(self, reports: List[dict]) -> None:
+        if not reports:
+            print("No tables with numeric columns to normalize")
+            return
+        def kb(size):
+            return f"{size / 1024:.1f}" if size is not None else "N/A"
+        headers = ["Table", "Typed Cols", "Source KB", "Typed KB", "Build s", "Scan ms (text)", "Scan ms (typed)", "Speedup"]
+        rows = []
+        for r in reports:
+            speedup = r['source_scan_seconds'] / r['typed_scan_seconds'] if r['typed_scan_seconds'] else 0
+            rows.append([r['table'], r['typed_columns'], kb(r['source_bytes']), kb(r['typed_bytes']),
+                         f"{r['build_seconds']:.3f}", f"{r['source_scan_seconds'] * 1000:.2f}",
+                         f"{r['typed_scan_seconds'] * 1000:.2f}", f"{speedup:.2f}x"])
+        print("\n=== Typed table normalization ===")
+        self.formatter.print_table(headers, rows, len(headers))
+        source = sum(r['source_bytes'] or 0 for r in reports)
+        typed = sum(r['typed_bytes'] or 0 for r in reports)
+        if source and typed:
+            print(f"Space: {source / 1024:.1f} KB as text -> {typed / 1024:.1f} KB typed "
+                  f"({(source - typed) / 1024:.1f} KB saved)")
+        source_scan = sum(r['source_scan_seconds'] for r in reports)
+        typed_scan = sum(r['typed_scan_seconds'] for r in reports)
+        print(f"Scan time: {source_scan * 1000:.2f} ms as text -> {typed_scan * 1000:.2f} ms typed")
@@ -0,0 +1,85 @@
+# src/db/result_cache.py
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Optional
+
+# Bump when the stored value layout changes; older entries then never match
+CACHE_FORMAT = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def cache_path(db_path: str) -> str:
+    """Default sidecar file for the cached results of a database"""
+    return f"{db_path}.results.sqlite"
+
+def cache_key(*parts: Any) -> str:
+    """Stable hash of what a result was asked for (database, analysis config, arguments)"""
+    encoded = json.dumps([CACHE_FORMAT, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+class ResultCache:
+    """Analysis results of earlier runs, kept in a SQLite sidecar file.
+
+    Entries are looked up by cache_key() and carry the fingerprint of the
+    data they were computed from (see BaseDBHandler.data_fingerprint); an
+    entry whose fingerprint no longer matches is dropped on lookup. Values
+    are stored as JSON, so tuples come back as lists. The file is kept
+    below max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                value TEXT,
+                size INTEGER,
+                last_used REAL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key: str, fingerprint: Any) -> Optional[Any]:
+        """The cached value, or None when missing or computed from other data"""
+        row = self.conn.execute("SELECT fingerprint, value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[0] != json.dumps(fingerprint, default=str):
+            self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        self.conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return json.loads(row[1])
+
+    def put(self, key: str, fingerprint: Any, value: Any) -> bool:
+        """Store a value; False when it cannot be encoded or is larger than the whole cache"""
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError):
+            return False
+        if len(encoded) > self.max_bytes:
+            return False
+        self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                          (key, json.dumps(fingerprint, default=str), encoded, len(encoded), time.time()))
+        self._evict()
+        self.conn.commit()
+        return True
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the values fit in max_bytes"""
+        self.conn.execute("""
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS kept
+                    FROM results
+                ) WHERE kept > ?
+            )
+        """, (self.max_bytes,))
+
+    def close(self) -> None:
+        self.conn.close()
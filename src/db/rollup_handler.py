@@ -0,0 +1,104 @@
+# src/db/rollup_handler.py
+import time
+from typing import List, Optional
+from .base_handler import BaseDBHandler
+from .catalog import INTERNAL_PREFIX, ROLLUP_REGISTRY_TABLE
+from .stats_handler import ARENA_OVERALL_TABLE
+from constants import *
+
+# Counters pre-summed per snapshot: rollup column -> source column
+ROLLUP_COLUMNS = {
+    'total_allocated': 'allocated',
+    'total_nmalloc': 'nmalloc',
+    'total_ndalloc': 'ndalloc',
+    'total_rps_nmalloc': 'rps_nmalloc',
+    'total_rps_ndalloc': 'rps_ndalloc',
+}
+
+def rollup_table_name(table_name: str) -> str:
+    return f"{INTERNAL_PREFIX}rollup_{table_name}"
+
+class RollupHandler(BaseDBHandler):
+    """Maintains per-snapshot rollups of the overall arena stats.
+
+    The rollup holds one row per (timestamp, metadata_id) with the summed
+    counters of ROLLUP_COLUMNS. Stats are normally only appended, so a
+    refresh aggregates the rows past the MAX(rowid) recorded in
+    ROLLUP_REGISTRY_TABLE and adds them to the existing snapshot rows; it
+    starts over when the source was updated in place (see track_writes).
+    Analyses read the rollup through resolve_rollup() while it is current.
+    """
+
+    def refresh(self, table_name: str = ARENA_OVERALL_TABLE, rebuild: bool = False) -> Optional[dict]:
+        """Bring the rollup of table_name up to date; None if the table is missing"""
+        if not self.catalog.has_table(table_name):
+            print(f"Table not found: {table_name}")
+            return None
+        rollup_table = rollup_table_name(table_name)
+        _, watermark, writes = self.catalog.rollups().get(table_name, (None, None, None))
+        current = self.max_rowid(table_name)
+        # A shrunken or updated source was rewritten, not appended to; start over
+        if (rebuild or watermark is None or current is None or current < watermark
+                or writes is None or self.write_count(table_name) != writes):
+            watermark = None
+
+        sums = ', '.join(f'SUM(CAST("{src}" AS FLOAT))' for src in ROLLUP_COLUMNS.values())
+        updates = ', '.join(f'{col} = {col} + excluded.{col}' for col in ROLLUP_COLUMNS)
+        start = time.perf_counter()
+        with self._get_write_cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {ROLLUP_REGISTRY_TABLE} (
+                    source_table TEXT PRIMARY KEY,
+                    rollup_table TEXT,
+                    source_max_rowid INTEGER,
+                    built_at REAL,
+                    source_writes INTEGER
+                )
+            """)
+            self.add_registry_writes_column(cur, ROLLUP_REGISTRY_TABLE)
+            writes = self.track_writes(cur, table_name)
+            if watermark is None:
+                cur.execute(f'DROP TABLE IF EXISTS "{rollup_table}"')
+            # timestamp/metadata_id are untyped so they keep the source's values
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS "{rollup_table}" (
+                    timestamp,
+                    metadata_id,
+                    {', '.join(f'{col} REAL' for col in ROLLUP_COLUMNS)},
+                    source_rows INTEGER,
+                    PRIMARY KEY (timestamp, metadata_id)
+                )
+            """)
+            cur.execute(f"""
+                INSERT INTO "{rollup_table}"
+                SELECT timestamp, metadata_id, {sums}, COUNT(*)
+                FROM "{table_name}"
+                WHERE rowid > ?
+                GROUP BY timestamp, metadata_id
+                ON CONFLICT (timestamp, metadata_id) DO UPDATE SET
+                    {updates}, source_rows = source_rows + excluded.source_rows
+            """, (watermark or 0,))
+            new_snapshots = cur.rowcount
+            cur.execute(f"INSERT OR REPLACE INTO {ROLLUP_REGISTRY_TABLE} VALUES (?, ?, ?, ?, ?)",
+                        (table_name, rollup_table, current, time.time(), writes))
+            cur.execute(f'SELECT COUNT(*) FROM "{rollup_table}"')
+            snapshots = cur.fetchone()[0]
+        return {
+            'table': table_name,
+            'rollup': rollup_table,
+            'mode': 'incremental' if watermark is not None else 'full',
+            'source_rows': current - (watermark or 0) if current else 0,
+            'updated_snapshots': new_snapshots,
+            'snapshots': snapshots,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def print_report(self, reports: List[dict]) -> None:
+        if not reports:
+            print("No rollups refreshed")
+            return
+        headers = ["Table", "Rollup", "Mode", "New Rows", "Updated Snapshots", "Snapshots", "Seconds"]
+        rows = [[r['table'], r['rollup'], r['mode'], r['source_rows'], r['updated_snapshots'],
+                 r['snapshots'], f"{r['seconds']:.3f}"] for r in reports]
+        print("\n=== Snapshot rollups ===")
+        self.formatter.print_table(headers, rows, len(headers))
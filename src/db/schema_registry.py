@@ -0,0 +1,83 @@
+# src/db/schema_registry.py
+import json
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from constants import *
+
+# Characters that make a schema key a regex rather than a literal table name
+REGEX_META = re.compile(r'[.^$*+?{}\[\]\\|()]')
+# Per-arena table names: 'arenas-0__overall', 'stats-arenas-12__bins_v0', ...
+ARENA_ID_RE = re.compile(r'(?<![A-Za-z0-9_])arenas-\d+(?=%s)' % re.escape(SECTION_TABLE_CON))
+ARENA_TEMPLATE = 'arenas-{N}'
+
+class SchemaRegistry:
+    """Table schemas indexed for constant-time lookup.
+
+    Literal keys are looked up in a dict. Per-arena entries that share the
+    same schema are collapsed into one template ('arenas-{N}__overall') so
+    lookup cost and memory do not grow with the number of arenas. Keys that
+    contain regex syntax are precompiled and only tried as a last resort.
+    """
+
+    def __init__(self, schemas: Dict[str, Any]):
+        self._exact: Dict[str, Any] = {}
+        self._templates: Dict[str, Any] = {}
+        self._patterns: List[Tuple[re.Pattern, Any]] = []
+        self._resolved: Dict[str, Optional[Any]] = {}
+
+        template_groups: Dict[str, List[Tuple[str, Any]]] = {}
+        for key, schema in schemas.items():
+            if REGEX_META.search(key):
+                self._patterns.append((re.compile('^' + key + '$'), schema))
+            elif ARENA_ID_RE.search(key):
+                template_groups.setdefault(self.template_for(key), []).append((key, schema))
+            else:
+                self._exact[key] = schema
+
+        for template, entries in template_groups.items():
+            first = entries[0][1]
+            if all(schema == first for _, schema in entries):
+                self._templates[template] = first
+            else:
+                # Arenas disagree on the layout; keep them as literal entries
+                self._exact.update(entries)
+
+    @classmethod
+    def from_file(cls, schema_path: str) -> 'SchemaRegistry':
+        with open(schema_path, 'r') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def template_for(table_name: str) -> str:
+        """Replace the arena id of a per-arena table name with a placeholder"""
+        return ARENA_ID_RE.sub(ARENA_TEMPLATE, table_name)
+
+    def get(self, table_name: str, default: Any = None) -> Any:
+        """Schema for a table: exact name, then arena template, then patterns"""
+        if table_name in self._resolved:
+            schema = self._resolved[table_name]
+            return default if schema is None else schema
+
+        schema = self._exact.get(table_name)
+        if schema is None and self._templates:
+            schema = self._templates.get(self.template_for(table_name))
+        if schema is None:
+            for pattern, candidate in self._patterns:
+                if pattern.match(table_name):
+                    schema = candidate
+                    break
+        self._resolved[table_name] = schema
+        return default if schema is None else schema
+
+    def resolve(self, table_name: str) -> Dict[str, Any]:
+        """Like get(), but raise ValueError when no schema applies"""
+        schema = self.get(table_name)
+        if schema is None:
+            raise ValueError(f"No schema found for table: {table_name}")
+        return schema
+
+    def __contains__(self, table_name: str) -> bool:
+        return self.get(table_name) is not None
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._templates) + len(self._patterns)
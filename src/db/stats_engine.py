@@ -0,0 +1,163 @@
+# src/db/stats_engine.py
+import sqlite3
+from typing import Dict, List, Tuple, Any, Optional
+import numpy as np
+from .streaming import iter_chunks
+from ..utils.quantile_sketch import KLLSketch
+
+STATS_METRICS = ['SUM', 'AVG', 'STD', 'P50', 'P90', 'P99']
+STATS_PERCENTILES = [(50, 'P50'), (90, 'P90'), (99, 'P99')]
+# Percentiles are 'exact' (every value kept) or from a KLL 'sketch' of bounded size
+QUANTILE_MODES = ('exact', 'sketch')
+# Rank error of sketch percentiles
+DEFAULT_QUANTILE_ERROR = 0.01
+# Key/label columns: shown with their first value instead of statistics
+STATS_IGNORED_COLUMNS = {'id', 'timestamp', 'section', 'table_name', 'metadata_id', 'metric', 'bins', 'size',
+                         'large', 'extents', 'decaying', 'ind', 'Key', 'Value', 'name', 'regs'}
+
+def numeric_value_expr(col: str) -> str:
+    """SQL expression yielding the column as FLOAT when it looks numeric, else NULL"""
+    return (f"""CASE WHEN CAST("{col}" AS TEXT) GLOB '*[0-9.]*' """
+            f"""AND CAST("{col}" AS TEXT) NOT GLOB '*[A-Za-z]*' THEN CAST("{col}" AS FLOAT) END""")
+
+def _sqlite_sort_key(value: Any) -> Tuple:
+    """Order values the way SQLite's GROUP BY does: NULL < numbers < text < blobs"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value.encode())
+    return (3, bytes(value))
+
+def _snapshot_order(timestamps: np.ndarray) -> Tuple[List[Any], np.ndarray]:
+    """Distinct timestamps of an object array in ascending SQLite order, and every row's rank in them"""
+    try:
+        # Timestamps of one type, the usual case, compare like SQLite's
+        distinct, ranks = np.unique(timestamps, return_inverse=True)
+        return list(distinct), ranks
+    except TypeError:
+        # NULLs or mixed types: order the few distinct values, then look rows up
+        distinct = sorted(set(timestamps), key=_sqlite_sort_key)
+        order = {value: rank for rank, value in enumerate(distinct)}
+        return distinct, np.fromiter((order[value] for value in timestamps), dtype=np.int64, count=len(timestamps))
+
+def format_stat(value: Any, numeric: bool) -> str:
+    """Text report form of a compute_table_stats() value"""
+    if value is None:
+        return "N/A"
+    return f"{value:.2f}" if numeric else f"{value}"
+
+def compute_table_stats(cursor: sqlite3.Cursor, table_name: str, typed_columns: Optional[set] = None,
+                        quantiles: str = 'exact', epsilon: float = DEFAULT_QUANTILE_ERROR,
+                        where: str = "", params: tuple = ()
+                        ) -> Tuple[List[str], Dict[str, Dict[str, Any]], List[str]]:
+    """Compute the `--mode stats` metrics for every column of a table in one scan.
+
+    All columns are fetched by a single query, `arraysize` rows at a time;
+    the GLOB/CAST numeric filter runs once per value inside it and the
+    metrics are computed with NumPy. As in the per-column queries this
+    replaces, SUM/AVG/STD describe the earliest snapshot (first timestamp
+    group) while the percentiles use the nearest-rank value over the whole
+    table. Columns in typed_columns are known to hold INTEGER/REAL values
+    (typed copies) and skip the filter.
+
+    quantiles='exact' keeps every numeric value for the percentiles;
+    quantiles='sketch' feeds them into a KLLSketch per column instead, so
+    memory stays bounded whatever the table size and the percentiles are
+    off by about epsilon in rank.
+
+    where (with its params) restricts the rows, e.g. to the snapshots of
+    a TimeFilter (see BaseDBHandler.snapshot_filter).
+
+    Returns (columns, results, numeric_columns) where results maps each
+    metric name to the value of every column: a float for numeric columns,
+    the first value for key/label columns and None when there is none
+    (see format_stat for the text report).
+    """
+    if quantiles not in QUANTILE_MODES:
+        raise ValueError(f"Unknown quantiles mode: {quantiles}")
+    if quantiles == 'sketch' and not 0 < epsilon < 1:
+        raise ValueError(f"Quantile error must be between 0 and 1, got {epsilon}")
+    cursor.execute(f"SELECT * FROM '{table_name}' LIMIT 1")
+    columns = [desc[0] for desc in cursor.description]
+    results = {metric: {} for metric in STATS_METRICS}
+    numeric_cols = []
+
+    typed_columns = typed_columns or set()
+    select = []
+    for col in columns:
+        if col in STATS_IGNORED_COLUMNS:
+            select.append(f'"{col}"')
+        elif col in typed_columns:
+            select.append(f'"{col}"')
+        else:
+            select.append(numeric_value_expr(col))
+    has_timestamp = 'timestamp' in columns
+    if has_timestamp:
+        select.append('timestamp')
+    where_sql = f" WHERE {where}" if where else ""
+    cursor.execute(f"SELECT {', '.join(select)} FROM '{table_name}'{where_sql}", params)
+
+    # Only what each metric needs is kept across chunks: the values of the
+    # earliest snapshot seen so far, and all values or a sketch of them
+    first_row = None
+    numeric = [i for i, col in enumerate(columns) if col not in STATS_IGNORED_COLUMNS]
+    earliest: Dict[int, Tuple[Tuple, List[np.ndarray]]] = {}
+    values: Dict[int, Any] = {i: KLLSketch(epsilon) if quantiles == 'sketch' else [] for i in numeric}
+    for rows in iter_chunks(cursor):
+        first_row = first_row or rows[0]
+        by_column = list(zip(*rows))
+        if has_timestamp:
+            distinct, ranks = _snapshot_order(np.array(by_column[-1], dtype=object))
+        for i in numeric:
+            data = np.array(by_column[i], dtype=float)
+            mask = ~np.isnan(data)
+            if not mask.any():
+                continue
+            if quantiles == 'sketch':
+                values[i].update(data[mask])
+            else:
+                values[i].append(data[mask])
+            if not has_timestamp:
+                continue
+            rank = ranks[mask].min()
+            key = _sqlite_sort_key(distinct[rank])
+            snapshot = data[mask & (ranks == rank)]
+            if i not in earliest or key < earliest[i][0]:
+                earliest[i] = (key, [snapshot])
+            elif key == earliest[i][0]:
+                earliest[i][1].append(snapshot)
+
+    for i, col in enumerate(columns):
+        if col in STATS_IGNORED_COLUMNS:
+            first = first_row[i] if first_row else None
+            for metric in STATS_METRICS:
+                results[metric][col] = first
+            continue
+
+        if i not in earliest:
+            for metric in STATS_METRICS:
+                results[metric][col] = None
+            continue
+
+        first_snapshot = np.concatenate(earliest[i][1])
+        mean = first_snapshot.mean()
+        variance = max(float(np.mean(first_snapshot * first_snapshot) - mean * mean), 0.0)
+        results['SUM'][col] = float(first_snapshot.sum())
+        results['AVG'][col] = float(mean)
+        results['STD'][col] = float(np.sqrt(variance))
+
+        if quantiles == 'sketch':
+            for p, metric in STATS_PERCENTILES:
+                results[metric][col] = values[i].quantile(p / 100)
+        else:
+            valid = np.concatenate(values[i])
+            count = len(valid)
+            offsets = [max(count * p // 100 - 1, 0) for p, _ in STATS_PERCENTILES]
+            partitioned = np.partition(valid, sorted(set(offsets)))
+            for offset, (_, metric) in zip(offsets, STATS_PERCENTILES):
+                results[metric][col] = float(partitioned[offset])
+        numeric_cols.append(col)
+
+    return columns, results, numeric_cols
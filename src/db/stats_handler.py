@@ -1,18 +1,29 @@
 # src/db/stats_handler.py
-from typing import List, Dict, Any, Optional
+import sys
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from .base_handler import BaseDBHandler
-import pandas as pd
-import numpy as np
+from .streaming import iter_rows
+from .time_filter import TimeFilter
 from constants import *
 
+if TYPE_CHECKING:
+    # pandas is only needed by the bins helpers; keep it off the import path
+    import pandas as pd
+
+ARENA_OVERALL_TABLE = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+FRAGMENTATION_TABLE = "bins"
+
+# Identifier columns skipped by calculate_table_stats()
+TABLE_STATS_IGNORED_COLUMNS = {'id', 'timestamp', 'section', 'table_name', 'metadata_id'}
+
 class StatsHandler(BaseDBHandler):
     def generate_comprehensive_report(self, window_size: int = 5, 
-                                leak_threshold: float = 10.0) -> Dict:
-        """Generate a comprehensive analysis report"""
-        trends = self.analyze_memory_trends(window_size=window_size)
-        fragmentation = self.analyze_fragmentation()
-        efficiency = self.analyze_arena_efficiency()
-        leaks = self.detect_potential_leaks(threshold_percent=leak_threshold)
+                                leak_threshold: float = 10.0, timestamp = None) -> Dict:
+        """Generate a comprehensive analysis report (of the snapshots a timestamp or TimeFilter selects)"""
+        trends = self.analyze_memory_trends(window_size=window_size, timestamp=timestamp)
+        fragmentation = self.analyze_fragmentation(timestamp)
+        efficiency = self.analyze_arena_efficiency(timestamp)
+        leaks = self.detect_potential_leaks(threshold_percent=leak_threshold, timestamp=timestamp)
         try:
             report = {
                 'memory_trends': trends,
@@ -27,23 +38,34 @@ class StatsHandler(BaseDBHandler):
                 }
             }
         except Exception as e:
-            print(f"Error generating comprehensive report: {e}")
+            print(f"Error generating comprehensive report: {e}", file=sys.stderr)
             return None
         return report
 
-    def analyze_memory_trends(self, table_names: List[str] = None, window_size: int = 5) -> Dict:
+    def analyze_memory_trends(self, table_names: List[str] = None, window_size: int = 5, timestamp = None) -> Dict:
         """Analyze memory allocation trends over time"""
-        with self._get_cursor() as cur:
-            query = f"""
-            WITH arena_data AS (
+        rollup = self.resolve_rollup(ARENA_OVERALL_TABLE)
+        if rollup:
+            condition, params = self.snapshot_filter(rollup, timestamp)
+            arena_data = f"""
                 SELECT 
                     timestamp,
-                    SUM(CAST(allocated AS FLOAT)) as total_allocated,
-                    SUM(CAST(nmalloc AS FLOAT)) as total_allocs,
-                    SUM(CAST(ndalloc AS FLOAT)) as total_deallocs
-                FROM merged_arena_stats{SECTION_TABLE_CON}overall
+                    SUM(total_allocated) as total_allocated,
+                    SUM(total_nmalloc) as total_allocs,
+                    SUM(total_ndalloc) as total_deallocs
+                FROM "{rollup}"
+                {f"WHERE {condition}" if condition else ""}
                 GROUP BY timestamp
-            ),
+            """
+        else:
+            arena_data, params = self.aggregate_source('memory_trends', ARENA_OVERALL_TABLE, ['timestamp'], [
+                ('total_allocated', 'SUM(CAST(allocated AS FLOAT))', 'sum'),
+                ('total_allocs', 'SUM(CAST(nmalloc AS FLOAT))', 'sum'),
+                ('total_deallocs', 'SUM(CAST(ndalloc AS FLOAT))', 'sum'),
+            ], timestamp=timestamp)
+        with self._get_cursor() as cur:
+            query = f"""
+            WITH arena_data AS ({arena_data}),
             trend_data AS (
                 SELECT 
                     timestamp,
@@ -61,28 +83,26 @@ class StatsHandler(BaseDBHandler):
             SELECT * FROM trend_data
             ORDER BY timestamp
             """
-            cur.execute(query, (window_size,))
+            cur.execute(query, params + (window_size,))
             return [dict(zip([col[0] for col in cur.description], row)) 
                     for row in cur.fetchall()]
         
-    def analyze_fragmentation(self) -> Dict:
+    def analyze_fragmentation(self, timestamp = None) -> Dict:
         """Analyze memory fragmentation patterns"""
+        # AVG(util) is kept as SUM and COUNT so snapshots can be merged
+        bin_totals, params = self.aggregate_source('fragmentation', FRAGMENTATION_TABLE, ['metadata_id', 'timestamp'], [
+            ('total_allocated_regions', 'SUM(CAST(curregs AS FLOAT))', 'sum'),
+            ('total_slabs', 'SUM(CAST(curslabs AS FLOAT))', 'sum'),
+            ('total_nonfull_slabs', 'SUM(CAST(nonfull_slabs AS FLOAT))', 'sum'),
+            ('utilization_sum', 'SUM(CAST(util AS FLOAT))', 'sum'),
+            ('utilization_count', 'COUNT(util)', 'sum'),
+        ], timestamp=timestamp)
         with self._get_cursor() as cur:
-            query = """
-            WITH bin_stats AS (
-                SELECT 
-                    metadata_id,
-                    timestamp,
-                    SUM(CAST(curregs AS FLOAT)) as total_allocated_regions,
-                    SUM(CAST(curslabs AS FLOAT)) as total_slabs,
-                    SUM(CAST(nonfull_slabs AS FLOAT)) as total_nonfull_slabs,
-                    AVG(CAST(util AS FLOAT)) as average_utilization
-                FROM bins
-                GROUP BY metadata_id, timestamp
-            )
+            query = f"""
+            WITH bin_stats AS ({bin_totals})
             SELECT 
                 timestamp,
-                average_utilization,
+                utilization_sum / NULLIF(utilization_count, 0) as average_utilization,
                 (total_nonfull_slabs * 100.0 / NULLIF(total_slabs, 0)) as fragmentation_ratio,
                 total_allocated_regions,
                 total_slabs,
@@ -90,12 +110,14 @@ class StatsHandler(BaseDBHandler):
             FROM bin_stats
             ORDER BY timestamp
             """
-            cur.execute(query)
+            cur.execute(query, params)
             return [dict(zip([col[0] for col in cur.description], row)) 
                     for row in cur.fetchall()]
         
-    def analyze_arena_efficiency(self) -> Dict:
+    def analyze_arena_efficiency(self, timestamp = None) -> Dict:
         """Analyze efficiency metrics for each arena"""
+        source = self.resolve_table(ARENA_OVERALL_TABLE)
+        condition, params = self.snapshot_filter(source, timestamp)
         with self._get_cursor() as cur:
             query = f"""
             WITH arena_metrics AS (
@@ -108,7 +130,8 @@ class StatsHandler(BaseDBHandler):
                     SUM(CAST(ndalloc AS FLOAT)) as deallocations,
                     SUM(CAST(rps_nmalloc as FLOAT)) as alloc_rate,
                     SUM(CAST(rps_ndalloc as FLOAT)) as dealloc_rate
-                FROM merged_arena_stats{SECTION_TABLE_CON}overall
+                FROM "{source}"
+                {f"WHERE {condition}" if condition else ""}
                 GROUP BY metadata_id, timestamp, {COL_HEADER_FILLER}
             )
             SELECT 
@@ -124,23 +147,38 @@ class StatsHandler(BaseDBHandler):
             FROM arena_metrics
             ORDER BY timestamp, arena_id
             """
-            cur.execute(query)
+            cur.execute(query, params)
             return [dict(zip([col[0] for col in cur.description], row)) 
                     for row in cur.fetchall()]
         
-    def detect_potential_leaks(self, threshold_percent: float = 10.0) -> Dict:
+    def detect_potential_leaks(self, threshold_percent: float = 10.0, timestamp = None) -> Dict:
         """Detect potential memory leaks based on allocation patterns"""
+        rollup = self.resolve_rollup(ARENA_OVERALL_TABLE)
+        if rollup:
+            condition, params = self.snapshot_filter(rollup, timestamp)
+            snapshot_totals = f"""
+                SELECT timestamp, metadata_id, total_allocated, total_nmalloc, total_ndalloc
+                FROM "{rollup}"
+                {f"WHERE {condition}" if condition else ""}
+            """
+        else:
+            snapshot_totals, params = self.aggregate_source(
+                'potential_leaks', ARENA_OVERALL_TABLE, ['timestamp', 'metadata_id'], [
+                    ('total_allocated', 'SUM(CAST(allocated AS FLOAT))', 'sum'),
+                    ('total_nmalloc', 'SUM(CAST(nmalloc AS FLOAT))', 'sum'),
+                    ('total_ndalloc', 'SUM(CAST(ndalloc AS FLOAT))', 'sum'),
+                ], timestamp=timestamp)
         with self._get_cursor() as cur:
             query = f"""
-            WITH allocation_patterns AS (
+            WITH snapshot_totals AS ({snapshot_totals}),
+            allocation_patterns AS (
                 SELECT 
                     timestamp,
                     metadata_id,
-                    SUM(CAST(allocated AS FLOAT)) as total_allocated,
-                    SUM(CAST(nmalloc AS FLOAT)) - SUM(CAST(ndalloc AS FLOAT)) as net_allocations,
-                    LAG(SUM(CAST(allocated AS FLOAT))) OVER (ORDER BY timestamp) as prev_allocated
-                FROM merged_arena_stats{SECTION_TABLE_CON}overall
-                GROUP BY timestamp, metadata_id
+                    total_allocated,
+                    total_nmalloc - total_ndalloc as net_allocations,
+                    LAG(total_allocated) OVER (ORDER BY timestamp) as prev_allocated
+                FROM snapshot_totals
             )
             SELECT 
                 timestamp,
@@ -157,22 +195,35 @@ class StatsHandler(BaseDBHandler):
             WHERE prev_allocated IS NOT NULL
             ORDER BY timestamp
             """
-            cur.execute(query, (threshold_percent,))
+            cur.execute(query, params + (threshold_percent,))
             return [dict(zip([col[0] for col in cur.description], row)) 
                     for row in cur.fetchall()]
-    def calculate_table_stats(self, table_name: str) -> dict:
-        """Calculate comprehensive statistics for a table"""
+    def calculate_table_stats(self, table_name: str, quantiles: str = 'exact',
+                              epsilon: float = 0.01, chunk_size: int = 10000) -> dict:
+        """Calculate comprehensive statistics for a table
+
+        quantiles='exact' sorts every column's values; quantiles='sketch'
+        streams the table once, chunk_size rows at a time, into KLL sketches
+        whose rank error is about epsilon, so memory stays bounded.
+        """
+        if quantiles == 'sketch':
+            sketches = self.build_column_sketches(table_name, epsilon, chunk_size)
+            if sketches is None:
+                return None
+            return {col: self._summarize_sketch(sketch) for col, sketch in sketches.items()}
+        if quantiles != 'exact':
+            raise ValueError(f"Unknown quantiles mode: {quantiles}")
+
         with self._get_cursor() as cur:
             cur.execute(f"SELECT * FROM '{table_name}' LIMIT 1")
             columns = [desc[0] for desc in cur.description]
             if not columns:
                 return None
 
-            columns2ignore = {'id', 'timestamp', 'section', 'table_name', 'metadata_id'}
             results = {}
 
             for col in columns:
-                if col in columns2ignore:
+                if col in TABLE_STATS_IGNORED_COLUMNS:
                     continue
 
                 # Calculate basic statistics
@@ -181,55 +232,28 @@ class StatsHandler(BaseDBHandler):
                         MIN(CAST(TRIM({col}) AS FLOAT)),
                         MAX(CAST(TRIM({col}) AS FLOAT)),
                         AVG(CAST(TRIM({col}) AS FLOAT)),
-                        SUM(CAST(TRIM({col}) AS FLOAT)),
-                        COUNT(*)
+                        SUM(CAST(TRIM({col}) AS FLOAT))
                     FROM '{table_name}'
                     WHERE TRIM({col}) != ''
                 """)
-                min_val, max_val, avg_val, sum_val, count = cur.fetchone()
-
-                # Print intermediate results for debugging
-                print(f"Column: {col}")
-                print(f"Min: {min_val}, Max: {max_val}, Avg: {avg_val}, Sum: {sum_val}, Count: {count}")
+                min_val, max_val, avg_val, sum_val = cur.fetchone()
 
                 # Calculate percentiles
                 cur.execute(f"""
-                    WITH sorted AS (
-                        SELECT CAST(TRIM({col}) AS FLOAT) as val,
-                            ROW_NUMBER() OVER (ORDER BY CAST(TRIM({col}) AS FLOAT)) as row_num,
-                            COUNT(*) OVER () as cnt
-                        FROM '{table_name}'
-                        WHERE TRIM({col}) != ''
-                    )
-                    SELECT 
-                        val,
-                        row_num,
-                        cnt
-                    FROM sorted
-                    ORDER BY row_num
+                    SELECT CAST(TRIM({col}) AS FLOAT) as val
+                    FROM '{table_name}'
+                    WHERE TRIM({col}) != ''
+                    ORDER BY val
                 """)
-                sorted_values = cur.fetchall()
-                
-                # Print sorted values for debugging
-                print("Sorted values:")
-                for val, row_num, cnt in sorted_values:
-                    print(f"Value: {val}, Row: {row_num}, Count: {cnt}")
-
-                # # Calculate percentiles
-                # count = len(sorted_values)
-                # p50 = sorted_values[count // 2 - 1][0] if count % 2 == 0 else sorted_values[count // 2][0]
-                # p90 = sorted_values[min(int(count * 0.9), count - 1)][0]
-                # p99 = sorted_values[min(int(count * 0.99), count - 1)][0]
-                # Calculate percentiles
+                sorted_values = [row[0] for row in cur.fetchall()]
+
                 count = len(sorted_values)
                 if count % 2 == 0:
-                    p50 = (sorted_values[count // 2 - 1][0] + sorted_values[count // 2][0]) / 2
+                    p50 = (sorted_values[count // 2 - 1] + sorted_values[count // 2]) / 2
                 else:
-                    p50 = sorted_values[count // 2][0]
-                p90 = sorted_values[min(int(count * 0.9), count - 1)][0]
-                p99 = sorted_values[min(int(count * 0.99), count - 1)][0]
-                # Print calculated percentiles
-                print(f"Calculated p50: {p50}, p90: {p90}, p99: {p99}")
+                    p50 = sorted_values[count // 2]
+                p90 = sorted_values[min(int(count * 0.9), count - 1)]
+                p99 = sorted_values[min(int(count * 0.99), count - 1)]
 
                 results[col] = {
                     'min': min_val,
@@ -243,108 +267,145 @@ class StatsHandler(BaseDBHandler):
                 }
 
             return results
-    def print_table_stats(self, table_name: str, limit=(20, 15)) -> None:
+
+    def build_column_sketches(self, table_name: str, epsilon: float = 0.01, chunk_size: int = 10000,
+                              by_timestamp: bool = False) -> Optional[Dict]:
+        """Stream a table once into one KLL sketch per column.
+
+        With by_timestamp=True the result is {timestamp: {column: sketch}},
+        so per-snapshot sketches can later be merged with
+        merge_column_sketches() without touching the raw values again.
+        """
+        from ..utils.quantile_sketch import KLLSketch
+        import numpy as np
         with self._get_cursor() as cur:
-            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            # for (table_name,) in cur.fetchall():
-            print(f"\n=== {table_name} ===")
             cur.execute(f"SELECT * FROM '{table_name}' LIMIT 1")
-            columns = [desc[0] for desc in cur.description]
-            
-            # Pre-check numeric columns
-            # numeric_cols = {col for col in columns if self.is_numeric(table_name, col)}
-            numeric_cols = []
-            # Create results dict for each metric
-            results = {
-                'SUM': {},
-                'AVG': {},
-                'STD': {},
-                'P50': {},
-                'P90': {},
-                'P99': {}
-            }
-            columns2ignore = {'id', 'timestamp', 'section', 'table_name', 'metadata_id', 'metric', 'bins', 'size', 'large', 'extents', 'decaying', 'ind', 'Key','Value', 'id', 'name', 'regs'}
-            # Calculate stats for each column
-            for col in columns:
-                if col in columns2ignore:
-                    # if self.is_numeric(table_name, col):
-                    # cur.execute(f"""
-                    #     SELECT *
-                    #     FROM '{table_name}'
-                    # """)
-                    # val = cur.fetchone()
-                    cur.execute(f"""
-                        SELECT CAST({col} AS TEXT) as val
-                        FROM '{table_name}'
-                    """)
-                    val = cur.fetchone()
-                    # print(f"Column: {col} - {val}")
-                    for metric in ['SUM', 'AVG', 'STD', 'P50', 'P90', 'P99']:
-                        results[metric][col] = f"{val[0]}" if val else "N/A"
-                    continue
-                try:
-                    # if self.is_numeric(table_name, col):
-                    cur.execute(f"""
-                        SELECT 
-                            SUM(CAST({col} as FLOAT)) as sum,
-                            AVG(CAST({col} as FLOAT)) as avg,
-                            SQRT(AVG(CAST({col} as FLOAT) * CAST({col} as FLOAT)) - 
-                                    AVG(CAST({col} as FLOAT)) * AVG(CAST({col} as FLOAT))) as std
-                        FROM '{table_name}'
-                        WHERE CAST({col} AS TEXT) GLOB '*[0-9.]*' 
-                        AND CAST({col} AS TEXT) NOT GLOB '*[A-Za-z]*'
-                        GROUP BY timestamp
-                    """)
-                    sum_avg_std = cur.fetchone()
-                    
-                    if sum_avg_std[0] is not None:
-                        results['SUM'][col] = f"{sum_avg_std[0]:.2f}"
-                        results['AVG'][col] = f"{sum_avg_std[1]:.2f}"
-                        results['STD'][col] = f"{sum_avg_std[2]:.2f}"
-                        
-                        # Calculate percentiles
-                        for p, metric in [(50, 'P50'), (90, 'P90'), (99, 'P99')]:
-                            cur.execute(f"""
-                                WITH sorted AS (
-                                    SELECT CAST({col} as FLOAT) as val
-                                    FROM '{table_name}'
-                                    WHERE CAST({col} AS TEXT) GLOB '*[0-9.]*' 
-                                    AND CAST({col} AS TEXT) NOT GLOB '*[A-Za-z]*'
-                                    ORDER BY CAST({col} as FLOAT)
-                                )
-                                SELECT val
-                                FROM sorted
-                                LIMIT 1
-                                OFFSET (SELECT COUNT(*) * {p} / 100 - 1 FROM sorted)
-                            """)
-                            pvalue = cur.fetchone()
-                            results[metric][col] = f"{pvalue[0]:.2f}" if pvalue else "N/A"
-                        numeric_cols.append(col)
-                        continue
-                    for metric in results:
-                        results[metric][col] = "N/A"
-                            
-                except:
-                    for metric in results:
-                        results[metric][col] = "N/A"
-                    continue
-            if not numeric_cols:
-                print("No numeric columns found")
-                return
-            columns = columns[:limit[1]]  # Limit columns
-            # Print table
-            col_width = max(15, max(len(col) for col in columns))
-            metric_width = 8
-            
-            # Header
-            print(" " * metric_width + " | " + " | ".join(f"{col:<{col_width}}" for col in columns))
-            print("-" * metric_width + "-+-" + "-+-".join("-" * col_width for _ in columns))
-            
-            # Data rows
-            for metric in ['SUM', 'AVG', 'STD', 'P50', 'P90', 'P99']:
-                row = f"{metric:<{metric_width}} | " + " | ".join(f"{results[metric].get(col, 'N/A'):<{col_width}}" for col in columns)
-                print(row)     
-    def analyze_arenas_activity(self, table_names: List[str] = None, timestamp: str = None):
+            columns = [desc[0] for desc in cur.description
+                       if desc[0] not in TABLE_STATS_IGNORED_COLUMNS]
+            if not columns:
+                return None
+            select = [f"CASE WHEN TRIM(\"{col}\") != '' THEN CAST(TRIM(\"{col}\") AS FLOAT) END"
+                      for col in columns]
+            if by_timestamp:
+                select.append("timestamp")
+            cur.execute(f"SELECT {', '.join(select)} FROM '{table_name}'")
+
+            sketches = {}
+            def new_group():
+                return {col: KLLSketch(epsilon) for col in columns}
+            while True:
+                chunk = cur.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                if by_timestamp:
+                    timestamps = np.array([row[-1] for row in chunk], dtype=object)
+                    values = np.array([row[:-1] for row in chunk], dtype=float)
+                    for ts in dict.fromkeys(timestamps):
+                        group = sketches.setdefault(ts, new_group())
+                        rows = values[timestamps == ts]
+                        for i, col in enumerate(columns):
+                            group[col].update(rows[:, i])
+                else:
+                    if not sketches:
+                        sketches = new_group()
+                    values = np.array(chunk, dtype=float)
+                    for i, col in enumerate(columns):
+                        sketches[col].update(values[:, i])
+            if not by_timestamp and not sketches:
+                sketches = new_group()
+            return sketches
+
+    @staticmethod
+    def merge_column_sketches(sketch_maps: List[Dict]) -> Dict:
+        """Merge {column: sketch} maps (e.g. per table or per snapshot) column by column"""
+        merged = {}
+        for sketch_map in sketch_maps:
+            for col, sketch in sketch_map.items():
+                if col in merged:
+                    merged[col].merge(sketch)
+                else:
+                    merged[col] = sketch
+        return merged
+
+    @staticmethod
+    def _summarize_sketch(sketch) -> dict:
+        """Same keys as the exact calculate_table_stats() result"""
+        return {
+            'min': sketch.min if sketch.count else None,
+            'max': sketch.max if sketch.count else None,
+            'avg': sketch.sum / sketch.count if sketch.count else None,
+            'sum': sketch.sum if sketch.count else None,
+            'count': sketch.count,
+            'p50': sketch.quantile(0.5),
+            'p90': sketch.quantile(0.9),
+            'p99': sketch.quantile(0.99)
+        }
+    def print_table_stats(self, table_name: str, limit=(20, 15), quantiles: str = 'exact',
+                          epsilon: float = 0.01, timestamp=None) -> None:
+        print(self.format_table_stats(table_name, limit, quantiles, epsilon, timestamp))
+
+    def _table_stats(self, table_name: str, quantiles: str, epsilon: float, timestamp=None):
+        """compute_table_stats() of a table (or its typed copy), over the snapshots timestamp selects"""
+        # numpy is only needed here, so the engine is imported on first use
+        from .stats_engine import compute_table_stats
+        source = self.resolve_table(table_name)
+        typed_columns = self.typed_numeric_columns(source) if source != table_name else None
+        condition, params = self.snapshot_filter(source, timestamp)
+        with self._get_cursor() as cur:
+            return compute_table_stats(cur, source, typed_columns, quantiles, epsilon, condition, params)
+
+    def table_stats_rows(self, table_name: str, quantiles: str = 'exact', epsilon: float = 0.01,
+                         timestamp=None) -> Tuple[List[str], List[List[Any]]]:
+        """The `--mode stats` metrics of every column as (['metric', columns...], one row per metric).
+
+        Values are unformatted: floats for numeric columns, None where a
+        metric does not apply. quantiles and epsilon select exact or
+        sketched percentiles (see compute_table_stats); timestamp is a
+        snapshot timestamp or a TimeFilter.
+        """
+        from .stats_engine import STATS_METRICS
+        columns, results, _ = self._table_stats(table_name, quantiles, epsilon, timestamp)
+        return ['metric'] + columns, [[metric] + [results[metric].get(col) for col in columns]
+                                      for metric in STATS_METRICS]
+
+    def format_table_stats(self, table_name: str, limit=(20, 15), quantiles: str = 'exact',
+                           epsilon: float = 0.01, timestamp=None) -> str:
+        """The `--mode stats` report of one table, as printed by print_table_stats"""
+        from .stats_engine import format_stat, STATS_METRICS
+        lines = [f"\n=== {table_name} ==="]
+        columns, results, numeric_cols = self._table_stats(table_name, quantiles, epsilon, timestamp)
+        if not numeric_cols:
+            lines.append("No numeric columns found")
+            return "\n".join(lines)
+        columns = columns[:limit[1]]  # Limit columns
+        # Print table
+        col_width = max(15, max(len(col) for col in columns))
+        metric_width = 8
+
+        # Header
+        lines.append(" " * metric_width + " | " + " | ".join(f"{col:<{col_width}}" for col in columns))
+        lines.append("-" * metric_width + "-+-" + "-+-".join("-" * col_width for _ in columns))
+
+        # Data rows
+        for metric in STATS_METRICS:
+            lines.append(f"{metric:<{metric_width}} | " + " | ".join(
+                f"{format_stat(results[metric].get(col), col in numeric_cols):<{col_width}}" for col in columns))
+        return "\n".join(lines)
+
+    def analyze_arenas_activity(self, table_names: List[str] = None, timestamp: str = None,
+                                collect: bool = True, exporter=None) -> Optional[List[dict]]:
+        """Per-arena memory and allocation activity, printed per snapshot and returned as rows.
+
+        table_names is a list of tables or a regex pattern. Per-arena tables
+        of a kind that has a current consolidated table (see
+        ConsolidateHandler) are read from it in a single scan. Rows are read
+        in chunks of `arraysize`; with collect=False they are only printed
+        and None is returned. timestamp is a snapshot timestamp or a TimeFilter.
+        With a ResultExporter the rows are written to it as 'arena' instead
+        of printed, and messages go to stderr.
+        """
+        time_filter = TimeFilter.of(timestamp)
+        status = sys.stderr if exporter is not None else sys.stdout
         with self._get_cursor() as cur:
             required_columns = {
                 'metadata_id': True,
@@ -361,32 +422,70 @@ class StatsHandler(BaseDBHandler):
                 if all(col in columns for col in required_columns):
                     for col in primary_columns:
                         if col in columns:
-                            return (table, col)
+                            return col
                 return None
 
             # Get and validate tables
-            if table_names:
+            if isinstance(table_names, str):
+                all_tables = self.get_matching_tables(table_names)
+            elif table_names:
                 all_tables = table_names
             else:
-                cur.execute(f"SELECT name FROM sqlite_master WHERE type='table'")
-                all_tables = cur.fetchall()
-            arena_tables = [validate_table(t) for t in all_tables]
-            arena_tables = [t for t in arena_tables if t]
-            if not arena_tables:
+                all_tables = self.list_tables()
+
+            # (source, arena_id expression, arena ids it is restricted to, primary column);
+            # the arena id of an unconsolidated per-arena table comes from its name
+            sources = []
+            consolidated = {}
+            for table in all_tables:
+                parsed = self.catalog.parse_table_name(table)
+                kind = parsed['kind']
+                if parsed['arena_id'] is not None and not parsed['stats']:
+                    if kind not in consolidated:
+                        consolidated[kind] = self.resolve_arena_table(kind)
+                    if consolidated[kind]:
+                        continue
+                prim_col = validate_table(table)
+                if prim_col:
+                    arena_id = parsed['arena_id']
+                    sources.append((table, "NULL" if arena_id is None else str(arena_id), None, prim_col))
+            for kind, arena_table in consolidated.items():
+                if not arena_table:
+                    continue
+                prim_col = validate_table(arena_table)
+                if not prim_col:
+                    continue
+                kind_tables = self.catalog.arena_kind_tables(kind)
+                selected = set(all_tables)
+                arena_ids = [arena_id for arena_id, table in kind_tables if table in selected]
+                if len(arena_ids) == len(kind_tables):
+                    arena_ids = None
+                sources.append((arena_table, "t.arena_id", arena_ids, prim_col))
+
+            if not sources:
                 for table in all_tables:
                     cur.execute(f'PRAGMA table_info("{table}")')
                     columns = {row[1] for row in cur.fetchall()}
-                    print(f"\n\nTable {table} does not have required \ncolumns={columns}\nrequired_columns={required_columns}\n\n")
-                print(f"No valid arena tables found all_tables = {all_tables} table_names={table_names}")
-                return        
+                    print(f"\n\nTable {table} does not have required \ncolumns={columns}\nrequired_columns={required_columns}\n\n",
+                          file=status)
+                raise ValueError(f"No valid arena tables found all_tables = {all_tables} table_names={table_names}")
             # Construct UNION query for arena data
             union_queries = []
-            for (table,prim_col) in arena_tables:
+            params = []
+            self.hint_missing_index([table for table, arena_id, _, _ in sources if arena_id != "t.arena_id"],
+                                    ('metadata_id',))
+            for table, arena_id, arena_ids, prim_col in sources:
+                conditions = []
+                if time_filter:
+                    conditions.append(time_filter.condition('m.timestamp', 'je_metadata'))
+                    params.extend(time_filter.params)
+                if arena_ids is not None:
+                    conditions.append(f"t.arena_id IN ({', '.join(str(a) for a in arena_ids)})")
                 union_queries.append(f"""
                 SELECT 
                     m.timestamp,
                     t.metadata_id,
-                    '{table}' as table_name,
+                    {arena_id} as arena_id,
                     t.{prim_col} as row_name, 
                     t.allocated as allocated,
                     t.nmalloc as nmalloc,
@@ -395,7 +494,7 @@ class StatsHandler(BaseDBHandler):
                     t.rps_ndalloc dealloc_rps
                 FROM '{table}' t
                 JOIN je_metadata m ON t.metadata_id = m.id
-                {f"WHERE m.timestamp = '{timestamp}'" if timestamp else ""}
+                {f"WHERE {' AND '.join(conditions)}" if conditions else ""}
                 """)
 
             # Main analysis query
@@ -405,12 +504,7 @@ class StatsHandler(BaseDBHandler):
                 SELECT 
                     timestamp,
                     metadata_id,
-                    CAST(SUBSTR(table_name, 8, 
-                        INSTR(SUBSTR(table_name, 8), '{SECTION_TABLE_CON}') - 1) AS INTEGER) as table_type,
-                    CAST(SUBSTR(table_name, 
-                        8 + INSTR(SUBSTR(table_name, 8), '{SECTION_TABLE_CON}'), 
-                        INSTR(table_name, '{SECTION_TABLE_CON}') - (8 + INSTR(SUBSTR(table_name, 8), '{SECTION_TABLE_CON}'))) 
-                        AS INTEGER) as arena_id,
+                    arena_id,
                     SUM(allocated) as total_allocated,
                     SUM(CASE WHEN row_name = 0 THEN allocated ELSE 0 END) as small_allocated,
                     SUM(CASE WHEN row_name = 1 THEN allocated ELSE 0 END) as large_allocated,
@@ -438,20 +532,27 @@ class StatsHandler(BaseDBHandler):
             ORDER BY timestamp, metadata_id, total_allocated DESC
             """
             try:
-                cur.execute(query)
+                cur.execute(query, params)
             except Exception as e:
-                print(f"Error executing query: {e} - {query}")
+                print(f"Error executing query: {e} - {query}", file=status)
                 return
             headers = ["Timestamp", "MetaID", "Arena", "Total Mem", "Mem%", "Small%", "Large%", 
                     "Allocs", "Deallocs", "Alloc RPS", "Dealloc RPS"]
-            rows = cur.fetchall()
+            columns = [col[0] for col in cur.description]
+            if exporter is not None:
+                exporter.write('arena', columns, iter_rows(cur))
+                return None
+            collected = [] if collect else None
             
-            # Group by timestamp and metadata_id
+            # Group by timestamp and metadata_id; rows arrive in that order,
+            # so only the current snapshot is held in memory
             current_ts = None
             current_meta = None
             grouped_rows = []
             
-            for row in rows:
+            for row in iter_rows(cur):
+                if collected is not None:
+                    collected.append(dict(zip(columns, row)))
                 if current_ts != row[0] or current_meta != row[1]:
                     if grouped_rows:
                         print(f"\n=== Timestamp: {current_ts}, MetaID: {current_meta} ===")
@@ -464,6 +565,7 @@ class StatsHandler(BaseDBHandler):
             if grouped_rows:
                 print(f"\n=== Timestamp: {current_ts}, MetaID: {current_meta} ===")
                 self.formatter.print_table(headers, grouped_rows)
+            return collected
     def combine_stats(self):
         query = """
         SELECT d.timestamp, d.metadata_id, d.decaying, d.time, d.npages, d.sweeps, d.madvises, d.purged,
@@ -489,13 +591,10 @@ class StatsHandler(BaseDBHandler):
         result = self.execute_query(query)
         return result
 
-    def execute_query(self, query):
-        cursor = self.conn.cursor()
-        cursor.execute(query)
-        columns = [description[0] for description in cursor.description]
-        data = cursor.fetchall()
-        cursor.close()
-        return {'columns': columns, 'data': data}
+    def execute_query(self, query, stream: bool = False):
+        """{'columns', 'data'} of a query; with stream=True 'data' is a lazy StreamingResult"""
+        result = self.stream_query(query)
+        return {'columns': result.columns, 'data': result if stream else result.fetchall()}
     # def analyze_arenas_activity(self, table_names: List[str] = None, timestamp: str = None) -> List[dict]:
     #     with self._get_cursor() as cur:
     #         required_columns = {
@@ -599,7 +698,7 @@ class StatsHandler(BaseDBHandler):
 
     #         return results
 
-    def _analyze_bins_by_size(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_bins_by_size(self, df: "pd.DataFrame") -> Dict[str, Any]:
         size_groups = df.groupby("size")
         return {
             "count": size_groups.size().to_dict(),
@@ -607,18 +706,18 @@ class StatsHandler(BaseDBHandler):
             "avg_utilization": size_groups["util"].mean().to_dict(),
         }
 
-    def _identify_allocation_hotspots(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _identify_allocation_hotspots(self, df: "pd.DataFrame") -> List[Dict[str, Any]]:
         hotspots = df.nlargest(5, "nmalloc")
         return hotspots[["bins", "size", "nmalloc", "ndalloc", "util"]].to_dict("records")
 
-    def _analyze_fragmentation(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_fragmentation(self, df: "pd.DataFrame") -> Dict[str, Any]:
         return {
             "avg_utilization": df["util"].mean(),
             "low_util_bins": df[df["util"] < 0.5]["bins"].tolist(),
             "nonfull_slabs_ratio": (df["nonfull_slabs"].sum() / df["curslabs"].sum()),
         }
 
-    def _analyze_lock_contention(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_lock_contention(self, df: "pd.DataFrame") -> Dict[str, Any]:
         return {
             "total_lock_ops": df["n_lock_ops"].sum(),
             "total_wait_time": df["total_wait_ns"].sum(),
@@ -626,7 +725,7 @@ class StatsHandler(BaseDBHandler):
             "max_threads_contention": df["max_n_thds"].max(),
         }
 
-    def _analyze_size_efficiency(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _analyze_size_efficiency(self, df: "pd.DataFrame") -> List[Dict[str, Any]]:
         df["wasted_space"] = df["size"] - df["allocated"] / df["curregs"]
         inefficient_sizes = df.nlargest(5, "wasted_space")
         return inefficient_sizes[["bins", "size", "wasted_space"]].to_dict("records")
\ No newline at end of file
@@ -0,0 +1,52 @@
+# src/db/streaming.py
+import sqlite3
+from typing import Iterator, List, Optional
+
+# Rows fetched per cursor.fetchmany() call unless the connection profile sets 'arraysize'
+DEFAULT_ARRAYSIZE = 1000
+
+def iter_chunks(cursor: sqlite3.Cursor, arraysize: Optional[int] = None) -> Iterator[List[tuple]]:
+    """Rows of an executed cursor, `arraysize` (default: cursor.arraysize) at a time"""
+    size = arraysize or cursor.arraysize
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+def iter_rows(cursor: sqlite3.Cursor, arraysize: Optional[int] = None) -> Iterator[tuple]:
+    """Rows of an executed cursor, fetched in chunks of `arraysize`"""
+    for chunk in iter_chunks(cursor, arraysize):
+        yield from chunk
+
+class StreamingResult:
+    """Lazy rows of an executed query, usable where a result's 'data' list is expected.
+
+    Rows are fetched arraysize at a time while the result is iterated, so
+    a consumer that handles them as they arrive (TableFormatter,
+    ResultExporter) needs memory for one chunk, not the whole result. It
+    can be iterated once; the cursor is closed when it is exhausted or on
+    close().
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, arraysize: Optional[int] = None):
+        self.cursor = cursor
+        self.arraysize = arraysize or cursor.arraysize
+        self.columns = [description[0] for description in cursor.description]
+
+    def chunks(self) -> Iterator[List[tuple]]:
+        try:
+            yield from iter_chunks(self.cursor, self.arraysize)
+        finally:
+            self.close()
+
+    def __iter__(self) -> Iterator[tuple]:
+        for chunk in self.chunks():
+            yield from chunk
+
+    def fetchall(self) -> List[tuple]:
+        """The remaining rows as a list, for consumers that need several passes"""
+        return list(self)
+
+    def close(self) -> None:
+        self.cursor.close()
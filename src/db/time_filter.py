@@ -0,0 +1,148 @@
+# src/db/time_filter.py
+import re
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+# Snapshots are stamped in nanoseconds (the graph mode divides by 1e9 as well)
+TIMESTAMP_UNITS_PER_SECOND = 1_000_000_000
+DURATION_UNITS = {'ns': 1e-9, 'us': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(ns|us|ms|s|m|h|d)\s*$')
+
+def parse_duration(value: str) -> Optional[int]:
+    """Timestamp units in a duration such as '90s', '15m', '1h' or '7d'; None if it has no unit"""
+    match = _DURATION.match(str(value))
+    if not match:
+        return None
+    return int(float(match.group(1)) * DURATION_UNITS[match.group(2)] * TIMESTAMP_UNITS_PER_SECOND)
+
+class TimeFilter:
+    """Which snapshots a run reads, as a WHERE condition on a `timestamp` column.
+
+    - timestamp: one snapshot (what --timestamp has always selected)
+    - since / until: inclusive bounds. A timestamp is compared as given; a
+      duration ('1h', '30m') is measured back from the newest snapshot of
+      the table being filtered.
+    - every_nth: every n-th snapshot in the range, starting with the first
+    - resample: the first snapshot of each interval (a duration, or a
+      number of timestamp units)
+
+    All values are bound as parameters, so the condition text depends only
+    on which options are set (see shape) and prepared statements are
+    shared between values. The raw tables store timestamps as TEXT, so
+    ranges and sample order compare them as integers; a single timestamp
+    is matched as given, which an index on timestamp (`je-analyze index`)
+    turns into a lookup.
+    """
+
+    def __init__(self, timestamp: Any = None, since: Any = None, until: Any = None,
+                 every_nth: Optional[int] = None, resample: Any = None):
+        if every_nth is not None and resample is not None:
+            raise ValueError("--every-nth and --resample cannot be combined")
+        if every_nth is not None and int(every_nth) < 1:
+            raise ValueError(f"--every-nth must be at least 1, got {every_nth}")
+        self.timestamp = timestamp
+        self.since = self._bound(since)
+        self.until = self._bound(until)
+        self.every_nth = int(every_nth) if every_nth is not None else None
+        self.resample = None
+        if resample is not None:
+            interval = parse_duration(resample)
+            if interval is None:
+                try:
+                    interval = int(resample)
+                except ValueError:
+                    raise ValueError(f"--resample takes a duration (e.g. 30s, 5m, 1h) or timestamp units, got {resample}")
+            if interval < 1:
+                raise ValueError(f"--resample interval must be positive, got {resample}")
+            self.resample = interval
+
+    @staticmethod
+    def _bound(value: Any) -> Optional[Tuple[Any, bool]]:
+        """(value, is a duration before the newest snapshot) of a since/until option"""
+        if value is None:
+            return None
+        ago = parse_duration(value)
+        if ago is not None:
+            return ago, True
+        try:
+            return int(value), False
+        except ValueError:
+            raise ValueError(f"--since/--until take a timestamp or a duration (e.g. 30m, 1h), got {value}")
+
+    @classmethod
+    def of(cls, value: Union[None, str, 'TimeFilter']) -> Optional['TimeFilter']:
+        """A filter from a TimeFilter or a single snapshot timestamp; None when nothing is filtered"""
+        if isinstance(value, cls):
+            return value or None
+        return None if value is None else cls(timestamp=value)
+
+    def __bool__(self) -> bool:
+        return any(v is not None for v in (self.timestamp, self.since, self.until, self.every_nth, self.resample))
+
+    def __repr__(self) -> str:
+        # Also what result cache keys are built from
+        return (f"TimeFilter(timestamp={self.timestamp!r}, since={self.since!r}, until={self.until!r}, "
+                f"every_nth={self.every_nth!r}, resample={self.resample!r})")
+
+    @property
+    def shape(self) -> Tuple:
+        """What the condition text depends on; equal shapes give identical SQL"""
+        return (self.timestamp is not None,
+                None if self.since is None else self.since[1],
+                None if self.until is None else self.until[1],
+                self.every_nth is not None, self.resample is not None)
+
+    def _range(self, column: str, source: str) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        if self.timestamp is not None:
+            clauses.append(f"{column} = ?")
+            params.append(self.timestamp)
+        for bound, op in ((self.since, '>='), (self.until, '<=')):
+            if bound is None:
+                continue
+            value, ago = bound
+            if ago:
+                clauses.append(f"CAST({column} AS INTEGER) {op} "
+                               f"(SELECT MAX(CAST(timestamp AS INTEGER)) FROM {source}) - ?")
+            else:
+                clauses.append(f"CAST({column} AS INTEGER) {op} ?")
+            params.append(value)
+        return clauses, params
+
+    def _build(self, column: str, source: str) -> Tuple[str, List[Any]]:
+        clauses, params = self._range(column, source)
+        if self.every_nth is None and self.resample is None:
+            return ' AND '.join(clauses), params
+        # The sample is drawn from the snapshots in range, so it replaces the range clauses
+        inner, params = self._range('timestamp', source)
+        where = f" WHERE {' AND '.join(inner)}" if inner else ''
+        if self.every_nth is not None:
+            sample = (f"SELECT timestamp FROM (SELECT timestamp, "
+                      f"ROW_NUMBER() OVER (ORDER BY CAST(timestamp AS INTEGER)) AS n "
+                      f"FROM (SELECT DISTINCT timestamp FROM {source}{where})) WHERE (n - 1) % ? = 0")
+            params.append(self.every_nth)
+        else:
+            # The bare timestamp comes from the row holding the MIN
+            sample = (f"SELECT timestamp FROM (SELECT timestamp, MIN(CAST(timestamp AS INTEGER)) "
+                      f"FROM {source}{where} GROUP BY CAST(timestamp AS INTEGER) / ?)")
+            params.append(self.resample)
+        return f"{column} IN ({sample})", params
+
+    def condition(self, column: str = 'timestamp', source: str = 'je_metadata') -> str:
+        """Condition on `column`, a timestamp of the rows of `source` (a quoted table name), with ? placeholders"""
+        return self._build(column, source)[0]
+
+    @property
+    def params(self) -> Tuple[Any, ...]:
+        """Values bound to the placeholders of condition(), in order"""
+        return tuple(self._build('timestamp', 'je_metadata')[1])
+
+    def table_condition(self, source: str, columns: Sequence[str]) -> Optional[str]:
+        """Condition on the rows of a table with these columns: on its own timestamp, else via je_metadata.
+
+        None when the table has neither a timestamp nor a metadata_id column.
+        """
+        if 'timestamp' in columns:
+            return self.condition('timestamp', source)
+        if 'metadata_id' in columns:
+            return f"metadata_id IN (SELECT id FROM je_metadata WHERE {self.condition('timestamp', 'je_metadata')})"
+        return None
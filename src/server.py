@@ -0,0 +1,251 @@
+# src/server.py
+import contextlib
+import hmac
+import http.client
+import http.server
+import io
+import json
+import os
+import secrets
+import socket as socket_module
+import socketserver
+import stat
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Options that configure the analyzer itself; they are fixed when the server
+# starts, so requests that set them are warned
+SERVER_OPTIONS = ('config', 'jobs', 'incremental', 'checkpoint_file', 'no_cache', 'cache_file')
+
+def socket_path(db_path: str) -> str:
+    """Default Unix socket of the server of a database"""
+    return f"{db_path}.sock"
+
+def token_path(db_path: str) -> str:
+    """File holding the token clients of the server of a database must send"""
+    return f"{db_path}.serve-token"
+
+def _write_token(path: str) -> str:
+    """A fresh random token, written to a file only its owner can read"""
+    token = secrets.token_urlsafe(32)
+    if os.path.exists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    return token
+
+def read_token(path: str) -> str:
+    with open(path) as f:
+        return f.read().strip()
+
+class _UnixHTTPServer(socketserver.UnixStreamServer):
+    """HTTP on a Unix socket; http.server.HTTPServer expects a (host, port) address"""
+
+    def server_bind(self) -> None:
+        # Only the owner may connect; the mode is set at creation so there is no window
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket_module.socket(socket_module.AF_UNIX, socket_module.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    server_version = 'je-analyze'
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else 'local'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # AnalysisServer logs one line per analysis instead
+
+    def _refused(self) -> bool:
+        """Reply with an error to requests that are not from a je-analyze client holding the token"""
+        if self.headers.get('Origin') is not None:
+            # Browsers send Origin on cross-site requests; clients never do
+            self._reply(403, _response(1, stderr="Error: cross-origin requests are not accepted\n"))
+            return True
+        token = self.headers.get('Authorization', '')
+        if not hmac.compare_digest(token.encode(), f"Bearer {self.server.analysis.token}".encode()):
+            self._reply(401, _response(1, stderr="Error: missing or wrong server token\n"))
+            return True
+        return False
+
+    def do_GET(self) -> None:
+        if self._refused():
+            return
+        if self.path != '/status':
+            return self._reply(404, _response(1, stderr=f"Error: unknown path {self.path}\n"))
+        self._reply(200, self.server.analysis.status())
+
+    def do_POST(self) -> None:
+        # Read the body first so that refused clients get their reply instead of a reset connection
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self._refused():
+            return
+        if self.path != '/analyze':
+            return self._reply(404, _response(1, stderr=f"Error: unknown path {self.path}\n"))
+        if self.headers.get_content_type() != 'application/json':
+            return self._reply(415, _response(1, stderr="Error: requests must be application/json\n"))
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            return self._reply(400, _response(1, stderr=f"Error: invalid request: {e}\n"))
+        self._reply(200, self.server.analysis.handle(request))
+
+    def _reply(self, code: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def _response(status: int, stdout: str = '', stderr: str = '', seconds: float = 0.0) -> Dict[str, Any]:
+    return {'status': status, 'stdout': stdout, 'stderr': stderr, 'seconds': seconds}
+
+class AnalysisServer:
+    """Answers je-analyze requests from one long-lived JeAnalyzer.
+
+    The connection, table catalog, compiled analyses, prepared query
+    templates and result cache stay warm between requests, so a request
+    costs only its queries. The catalog and cached results still follow
+    the database as it grows (see TableCatalog and ResultCache).
+
+    Requests are the regular je-analyze options, parsed with the CLI
+    parser and run by `run(analyzer, args)` in the client's working
+    directory. They are handled one at a time on the thread that opened
+    the analyzer, which SQLite connections require. The reply carries the
+    captured stdout, stderr and exit status.
+
+    Requests write files (--output, graphs) with the server's permissions,
+    so only its owner may send them: the Unix socket is created 0600, every
+    request must carry the token of the 0600 token_path() file, and JSON
+    bodies are required and browser (Origin) requests refused, so web pages
+    cannot post to the HTTP port.
+    """
+
+    def __init__(self, analyzer, parser, run: Callable, socket: Optional[str] = None, port: Optional[int] = None):
+        if socket is None and port is None:
+            raise ValueError("AnalysisServer needs a socket path or a port")
+        self.analyzer = analyzer
+        self.parser = parser
+        self.run = run
+        self.socket = socket
+        self.started = time.time()
+        self.requests = 0
+        if socket is not None:
+            _remove_stale_socket(socket)
+            self.httpd = _UnixHTTPServer(socket, _RequestHandler)
+            self.address = socket
+        else:
+            self.httpd = http.server.HTTPServer(('127.0.0.1', port), _RequestHandler)
+            self.address = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.httpd.analysis = self
+        # Written once the address is ours, so a refused second server leaves the live one's token alone
+        self.token_file = token_path(analyzer.db_path)
+        self.token = _write_token(self.token_file)
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request ({'args': [...], 'cwd': ..., 'db_path': ...}) and capture its output"""
+        start = time.perf_counter()
+        stdout, stderr = io.StringIO(), io.StringIO()
+        status = 0
+        cwd = os.getcwd()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                db_path = request.get('db_path')
+                if db_path and os.path.realpath(db_path) != os.path.realpath(self.analyzer.db_path):
+                    raise ValueError(f"this server analyzes {self.analyzer.db_path}, not {db_path}")
+                args = self.parser.parse_args([self.analyzer.db_path, *request.get('args', [])])
+                ignored = [name for name in SERVER_OPTIONS if getattr(args, name) != self.parser.get_default(name)]
+                if ignored:
+                    print(f"[serve] ignoring {', '.join('--' + name.replace('_', '-') for name in ignored)}: "
+                          f"fixed when the server started", file=sys.stderr)
+                os.chdir(request.get('cwd') or cwd)
+                self.run(self.analyzer, args)
+            except SystemExit as e:
+                # argparse errors and --help
+                status = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                status = 1
+            finally:
+                os.chdir(cwd)
+        self.requests += 1
+        seconds = time.perf_counter() - start
+        print(f"[serve] {' '.join(request.get('args', []))}: status {status}, {seconds * 1000:.1f} ms",
+              file=sys.stderr)
+        return _response(status, stdout.getvalue(), stderr.getvalue(), seconds)
+
+    def status(self) -> Dict[str, Any]:
+        return {'db_path': os.path.realpath(self.analyzer.db_path), 'address': self.address,
+                'requests': self.requests, 'uptime': time.time() - self.started}
+
+    def serve(self) -> None:
+        """Answer requests until shutdown() or Ctrl-C, then release the socket and the analyzer"""
+        print(f"Serving {self.analyzer.db_path} on {self.address}", file=sys.stderr)
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.httpd.server_close()
+            for path in (self.socket, self.token_file):
+                if path is not None and os.path.exists(path):
+                    os.unlink(path)
+            self.analyzer.close()
+
+    def shutdown(self) -> None:
+        """Stop serve() from another thread"""
+        self.httpd.shutdown()
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove the socket of a server that is gone; refuse to take over a live one"""
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise ValueError(f"{path} exists and is not a socket")
+    probe = socket_module.socket(socket_module.AF_UNIX, socket_module.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise ValueError(f"a server is already listening on {path}")
+
+def query(db_path: str, args: List[str], socket: Optional[str] = None, port: Optional[int] = None,
+          timeout: Optional[float] = None, token: Optional[str] = None) -> Dict[str, Any]:
+    """Send je-analyze options to a server; returns its {'status', 'stdout', 'stderr', 'seconds'}
+
+    The token is read from the server's token file unless given.
+    """
+    if token is None:
+        token = read_token(token_path(db_path))
+    body = json.dumps({'db_path': os.path.realpath(db_path), 'args': list(args), 'cwd': os.getcwd()})
+    if socket is not None:
+        conn = _UnixHTTPConnection(socket, timeout)
+    else:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request('POST', '/analyze', body, {'Content-Type': 'application/json',
+                                                'Authorization': f"Bearer {token}"})
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
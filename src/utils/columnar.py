@@ -0,0 +1,104 @@
+# src/utils/columnar.py
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+class ColumnarResult(dict):
+    """An analysis result ({'columns': [...], 'data': [rows]}) with column-wise access.
+
+    It is still the plain dict analyses have always returned (printing,
+    exports and the result cache use it unchanged). On top of that, columns
+    are looked up by name in O(1) and converted to NumPy arrays on first
+    use, so totals are vectorized and top-k selection is linear.
+    NumPy is imported only when a column is first needed.
+    """
+
+    def __init__(self, columns: Sequence[str], data: List[Sequence[Any]]):
+        super().__init__(columns=list(columns), data=data)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self['columns'])}
+        self._arrays: Dict[str, Any] = {}
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> 'ColumnarResult':
+        if isinstance(result, cls):
+            return result
+        data = result['data']
+        return cls(result['columns'], data if isinstance(data, list) else list(data))
+
+    @property
+    def num_rows(self) -> int:
+        return len(self['data'])
+
+    def has(self, name: str) -> bool:
+        return name in self.index
+
+    def column(self, name: str):
+        """Values of a column as an array: int64/float64 when numeric (None -> NaN), else object"""
+        array = self._arrays.get(name)
+        if array is None:
+            import numpy as np
+            i = self.index[name]
+            values = [row[i] for row in self['data']]
+            array = np.asarray(values)
+            if array.dtype.kind not in 'iufb':
+                try:
+                    array = np.array([np.nan if v is None else v for v in values], dtype=float)
+                except (TypeError, ValueError):
+                    array = np.array(values, dtype=object)
+            self._arrays[name] = array
+        return array
+
+    def total(self, name: str) -> Union[int, float]:
+        """Sum of a numeric column, ignoring NULLs"""
+        import numpy as np
+        array = self.column(name)
+        total = np.nansum(array) if array.dtype.kind == 'f' else array.sum()
+        return total.item() if hasattr(total, 'item') else total
+
+    def top_k(self, key, k: int) -> List[int]:
+        """Row indices of the k largest values of a column (or of an array), largest first.
+
+        Same rows and order as sorted(data, key=..., reverse=True)[:k]: ties
+        keep their row order. argpartition finds the k-th largest value in
+        linear time and only the k selected rows are sorted. Text (object)
+        columns cannot be negated, so they are sorted in Python, NULLs last.
+        """
+        import numpy as np
+        values = self.column(key) if isinstance(key, str) else np.asarray(key)
+        n = len(values)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        if values.dtype.kind == 'O':
+            return sorted(range(n), key=lambda i: (values[i] is not None, values[i]), reverse=True)[:k]
+        if values.dtype.kind == 'f':
+            values = np.where(np.isnan(values), -np.inf, values)
+        kth = values[np.argpartition(values, n - k)[n - k]]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        selected = np.sort(np.concatenate([above, ties]))
+        order = np.argsort(-values[selected], kind='stable')
+        return selected[order].tolist()
+
+    def cube(self, value: str, groups: Sequence[str], index: str = 'timestamp') -> Tuple[List[Any], List[tuple], Any]:
+        """A long (index, groups..., value) result as a 2-D array: (index labels, group keys, values).
+
+        values[i, j] is `value` of group keys[j] at labels[i] (NaN where that
+        group has no row). Labels and keys keep their order of appearance, so
+        an over-time result gives its snapshots in time order.
+        """
+        import numpy as np
+        data = self['data']
+        at = self.index[index]
+        by = [self.index[group] for group in groups]
+        labels = list(dict.fromkeys(row[at] for row in data))
+        keys = list(dict.fromkeys(tuple(row[g] for g in by) for row in data))
+        label_pos = {label: i for i, label in enumerate(labels)}
+        key_pos = {key: j for j, key in enumerate(keys)}
+        rows = np.fromiter((label_pos[row[at]] for row in data), dtype=np.intp, count=len(data))
+        cols = np.fromiter((key_pos[tuple(row[g] for g in by)] for row in data), dtype=np.intp, count=len(data))
+        values = np.full((len(labels), len(keys)), np.nan)
+        values[rows, cols] = self.column(value)
+        return labels, keys, values
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """One row as a column name -> value dict"""
+        return dict(zip(self['columns'], self['data'][i]))
@@ -0,0 +1,41 @@
+# src/utils/downsample.py
+from typing import Sequence
+
+# Horizontal pixels per plotted point; one point per pixel column is already
+# more than a line plot can show
+PIXELS_PER_POINT = 2
+# Series with more points than this are drawn without markers
+MARKER_MAX_POINTS = 100
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int):
+    """Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets.
+
+    x must be sorted. The first and last points are kept; every bucket in
+    between keeps the point forming the largest triangle with the point
+    kept before it and the average of the next bucket, so spikes and dips
+    survive where plain averaging or striding would flatten them. All
+    indices are returned when there are no more than `threshold` points.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    # The n - 2 inner points are split into threshold - 2 buckets
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.intp) + 1
+    edges[-1] = n - 1
+    kept = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs((x[kept] - next_x) * (y[start:end] - y[kept])
+                      - (x[kept] - x[start:end]) * (next_y - y[kept]))
+        kept = start + int(np.argmax(area))
+        selected[i + 1] = kept
+    return selected
@@ -0,0 +1,167 @@
+# src/utils/exporter.py
+import csv
+import json
+import os
+import re
+import sys
+from itertools import islice
+from typing import Any, Iterable, List, Optional, TextIO
+
+# Formats accepted by --output-format; 'text' prints tables with TableFormatter
+OUTPUT_FORMATS = ['text', 'csv', 'jsonl', 'parquet', 'arrow']
+# Formats written by pyarrow, one file per result set
+COLUMNAR_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+# Rows converted and written at a time
+EXPORT_BATCH_ROWS = 10000
+# Column naming the result set (analysis, table) a row belongs to
+RESULT_COLUMN = 'result'
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+def _text_value(value: Any) -> Optional[str]:
+    return None if value is None else str(_json_value(value))
+
+class ResultExporter:
+    """Writes result sets in a machine-readable format instead of text tables.
+
+    Rows are consumed from any iterable (a cursor streams straight through)
+    EXPORT_BATCH_ROWS at a time, so memory stays bounded whatever the
+    result size.
+
+    - csv / jsonl: every result set goes to one stream (`output`, default
+      stdout) with a leading RESULT_COLUMN naming it. CSV repeats the header
+      line whenever the columns change between result sets.
+    - parquet / arrow (needs pyarrow): `output` is a directory that gets one
+      file per result set, named after it. Column types are taken from the
+      first batch of rows; a column whose first batch mixes value types
+      (SQLite allows it in any column) or has no values is exported as text.
+    """
+
+    def __init__(self, output_format: str, output: Optional[str] = None):
+        if output_format not in OUTPUT_FORMATS or output_format == 'text':
+            raise ValueError(f"Unknown export format: {output_format} (choose from {', '.join(OUTPUT_FORMATS[1:])})")
+        self.output_format = output_format
+        self.output = output
+        self._stream: Optional[TextIO] = None
+        self._csv_writer = None
+        self._csv_header = None
+        self._files: List[str] = []
+        if output_format in COLUMNAR_FORMATS:
+            if not output:
+                raise ValueError(f"--output-format {output_format} needs --output <directory>")
+            try:
+                import pyarrow
+            except ImportError:
+                raise ValueError(f"--output-format {output_format} requires pyarrow (pip install pyarrow)")
+            os.makedirs(output, exist_ok=True)
+
+    @property
+    def stream(self) -> TextIO:
+        if self._stream is None:
+            self._stream = open(self.output, 'w', newline='') if self.output else sys.stdout
+        return self._stream
+
+    def write(self, name: str, columns: List[str], rows: Iterable[Iterable[Any]]) -> int:
+        """Export one result set; returns the number of rows written"""
+        rows = iter(rows)
+        if self.output_format in COLUMNAR_FORMATS:
+            return self._write_columnar(name, list(columns), rows)
+        count = 0
+        while True:
+            batch = list(islice(rows, EXPORT_BATCH_ROWS))
+            if not batch:
+                return count
+            if self.output_format == 'csv':
+                self._write_csv(name, list(columns), batch)
+            else:
+                self._write_jsonl(name, list(columns), batch)
+            count += len(batch)
+
+    def write_result(self, name: str, result: Any) -> int:
+        """Export an analysis result: a {'columns', 'data'} dict or a list of them"""
+        if isinstance(result, list):
+            return sum(self.write_result(name, r) for r in result)
+        return self.write(name, result['columns'], result['data'])
+
+    def _write_csv(self, name: str, columns: List[str], batch: List[Iterable[Any]]) -> None:
+        if self._csv_writer is None:
+            self._csv_writer = csv.writer(self.stream)
+        header = [RESULT_COLUMN] + columns
+        if header != self._csv_header:
+            self._csv_writer.writerow(header)
+            self._csv_header = header
+        self._csv_writer.writerows([name, *row] for row in batch)
+
+    def _write_jsonl(self, name: str, columns: List[str], batch: List[Iterable[Any]]) -> None:
+        lines = []
+        for row in batch:
+            record = {RESULT_COLUMN: name}
+            record.update(zip(columns, map(_json_value, row)))
+            lines.append(json.dumps(record))
+        self.stream.write("\n".join(lines) + "\n")
+
+    def _file_for(self, name: str) -> str:
+        base = re.sub(r'[^A-Za-z0-9_.-]+', '_', name) or 'result'
+        path = os.path.join(self.output, f"{base}.{COLUMNAR_FORMATS[self.output_format]}")
+        suffix = 1
+        while path in self._files:
+            suffix += 1
+            path = os.path.join(self.output, f"{base}_{suffix}.{COLUMNAR_FORMATS[self.output_format]}")
+        self._files.append(path)
+        return path
+
+    def _write_columnar(self, name: str, columns: List[str], rows) -> int:
+        import pyarrow as pa
+        path = self._file_for(name)
+        schema, writer, count = None, None, 0
+        text_columns = set()
+        try:
+            # The first batch is written even when empty, so every result set gets a file
+            batch = list(islice(rows, EXPORT_BATCH_ROWS))
+            while batch or schema is None:
+                by_column = list(zip(*batch)) if batch else [()] * len(columns)
+                if schema is None:
+                    arrays = []
+                    for i, values in enumerate(by_column):
+                        try:
+                            array = pa.array([_json_value(v) for v in values])
+                        except (pa.ArrowInvalid, pa.ArrowTypeError):
+                            array = pa.array([], type=pa.null())
+                        if pa.types.is_null(array.type):
+                            text_columns.add(i)
+                            array = pa.array([_text_value(v) for v in values], type=pa.string())
+                        arrays.append(array)
+                    schema = pa.schema([pa.field(col, array.type) for col, array in zip(columns, arrays)])
+                    writer = self._open_writer(path, schema)
+                else:
+                    try:
+                        arrays = [pa.array([_text_value(v) if i in text_columns else _json_value(v) for v in values],
+                                           type=field.type)
+                                  for i, (values, field) in enumerate(zip(by_column, schema))]
+                    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                        raise ValueError(f"{name}: a column changes type after the first {count} rows ({e}); "
+                                         f"export it as csv or jsonl instead")
+                writer.write_batch(pa.record_batch(arrays, schema=schema))
+                count += len(batch)
+                batch = list(islice(rows, EXPORT_BATCH_ROWS))
+            return count
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _open_writer(self, path: str, schema):
+        import pyarrow as pa
+        if self.output_format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(path, schema)
+        return pa.ipc.new_file(path, schema)
+
+    def close(self) -> None:
+        if self._stream is not None and self._stream is not sys.stdout:
+            self._stream.close()
+        elif self._stream is not None:
+            self._stream.flush()
+        self._stream = None
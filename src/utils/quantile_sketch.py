@@ -0,0 +1,112 @@
+# src/utils/quantile_sketch.py
+import math
+from typing import Dict, Any, Iterable, List, Optional
+import numpy as np
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Memory is O(k) regardless of how many values are added; the rank error
+    of quantile() is roughly `epsilon` (k is derived from it). Sketches
+    built over different tables or snapshots can be merged, and merging
+    gives the same guarantees as feeding all values into one sketch.
+    """
+
+    def __init__(self, epsilon: float = 0.01, k: Optional[int] = None, seed: Optional[int] = None):
+        self.epsilon = epsilon
+        self.k = k or max(8, int(math.ceil(1.7 / epsilon)))
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(level) for level in self._levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self._levels)))
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self._levels):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep the odd element out at this level, promote every other one
+                keep = items[len(items) - 1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[int(self._rng.integers(2))::2]
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+                self._levels[level] = keep
+                break
+
+    def update(self, values: Iterable[float]) -> None:
+        """Add a chunk of values (NaN entries are ignored)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Fold another sketch into this one and return self"""
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at rank q (0..1); None for an empty sketch"""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h, dtype=float) for h, level in enumerate(self._levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        index = int(np.searchsorted(cumulative, q * cumulative[-1], side='left'))
+        return float(items[order][min(index, len(items) - 1)])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state, e.g. for persisting per-snapshot sketches"""
+        return {
+            'epsilon': self.epsilon,
+            'k': self.k,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'levels': [level.tolist() for level in self._levels],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'KLLSketch':
+        sketch = cls(epsilon=state['epsilon'], k=state['k'])
+        sketch.count = state['count']
+        sketch.sum = state.get('sum', 0.0)
+        if sketch.count:
+            sketch.min, sketch.max = state['min'], state['max']
+        sketch._levels = [np.asarray(level, dtype=float) for level in state['levels']] or [np.empty(0)]
+        return sketch
@@ -1,6 +1,14 @@
 # src/utils/table_formatter.py
-from typing import List, Any
+import sys
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TextIO
 from constants import *
+
+# Rows read before the column widths are fixed; later rows are streamed
+WIDTH_SAMPLE_ROWS = 1000
+# Lines joined into one write
+WRITE_CHUNK_LINES = 512
+
 class TableFormatter:
     """Handles all table formatting and display logic"""
     @staticmethod
@@ -10,11 +18,38 @@ class TableFormatter:
             try:
                 val = f"{int(cell):,}"
             except ValueError:
-                val = f"{float(cell):,.2f}" 
+                val = f"{float(cell):,.2f}"
         except ValueError:
             val = cell
         return val
 
+    @staticmethod
+    def cell_formatter() -> Callable[[Any], str]:
+        """Formats a value the way get_printed_cell(str(value)) does, dispatching on its type.
+
+        SQLite hands back int, float, str, bytes or None, so numbers skip the
+        parse attempts; text is parsed once per distinct value.
+        """
+        text_cache = {}
+
+        def format_cell(value: Any) -> str:
+            kind = type(value)
+            if kind is int:
+                return f"{value:,}"
+            if kind is float:
+                return f"{value:,.2f}"
+            if value is None:
+                return ''
+            if kind is not str:
+                value = str(value)
+            printed = text_cache.get(value)
+            if printed is None:
+                printed = TableFormatter.get_printed_cell(value)
+                if len(text_cache) < WIDTH_SAMPLE_ROWS * 10:
+                    text_cache[value] = printed
+            return printed
+        return format_cell
+
     @staticmethod
     def get_column_widths(headers: List[str], rows: List[List[Any]]) -> List[int]:
         """Calculate optimal width for each column"""
@@ -27,10 +62,11 @@ class TableFormatter:
     @staticmethod
     def print_horizontal_line(widths: List[int]) -> None:
         """Print a horizontal separator line"""
-        line = "+"
-        for width in widths:
-            line += "-" * (width + 2) + "+"
-        print(line)
+        print(TableFormatter.horizontal_line(widths))
+
+    @staticmethod
+    def horizontal_line(widths: List[int]) -> str:
+        return "+" + "+".join("-" * (width + 2) for width in widths) + "+"
 
     @staticmethod
     def print_row(row: List[Any], widths: List[int]) -> None:
@@ -41,21 +77,62 @@ class TableFormatter:
         print(line)
 
     @staticmethod
-    def print_table(headers: List[str], rows: List[List[Any]], limit_col=15) -> None:
-        """Print complete table with headers and rows"""
-        # Convert all values to strings and handle None
-        str_rows = [[str(cell) if cell is not None else '' for cell in row[:limit_col]] for row in rows]
-        headers = headers[:limit_col]
+    def format_line(cells: List[str], widths: List[int]) -> str:
+        """One table line from already formatted cells"""
+        return "|" + "".join(f" {cell:<{width}} |" for cell, width in zip(cells, widths))
+
+    @staticmethod
+    def iter_table_lines(headers: List[str], rows: Iterable[Iterable[Any]], limit_col=15,
+                         sample_rows: int = WIDTH_SAMPLE_ROWS) -> Iterator[str]:
+        """Lines of a table, produced while `rows` is consumed.
+
+        Column widths are taken from the headers and the first sample_rows
+        rows; a later value that is wider only widens its own line. Every
+        value is formatted once.
+        """
+        headers = [TableFormatter.get_printed_cell(str(header)) for header in headers[:limit_col]]
+        format_cell = TableFormatter.cell_formatter()
+        rows = iter(rows)
+
+        def formatted(batch):
+            return [[format_cell(cell) for cell in islice(row, limit_col)] for row in batch]
+
+        sample = formatted(islice(rows, sample_rows))
+        widths = [len(header) for header in headers]
+        for cells in sample:
+            for i, cell in enumerate(cells):
+                if len(cell) > widths[i]:
+                    widths[i] = len(cell)
+        separator = TableFormatter.horizontal_line(widths)
+        yield separator
+        yield TableFormatter.format_line(headers, widths)
+        yield separator
+        for cells in sample:
+            yield TableFormatter.format_line(cells, widths)
+        while True:
+            page = formatted(islice(rows, sample_rows))
+            if not page:
+                break
+            for cells in page:
+                yield TableFormatter.format_line(cells, widths)
+        yield separator
+
+    @staticmethod
+    def write_table(headers: List[str], rows: Iterable[Iterable[Any]], limit_col=15,
+                    out: Optional[TextIO] = None) -> None:
+        """Stream a table to `out` (default: stdout) in chunks of WRITE_CHUNK_LINES lines"""
+        out = out or sys.stdout
+        lines = TableFormatter.iter_table_lines(headers, rows, limit_col)
+        while True:
+            chunk = list(islice(lines, WRITE_CHUNK_LINES))
+            if not chunk:
+                break
+            out.write("\n".join(chunk) + "\n")
+
+    @staticmethod
+    def print_table(headers: List[str], rows: Iterable[Iterable[Any]], limit_col=15) -> None:
+        """Print complete table with headers and rows (any iterable, e.g. a cursor)"""
         try:
-            # Get column widths
-            widths = TableFormatter.get_column_widths(headers, str_rows)
-            
-            # Print table
-            TableFormatter.print_horizontal_line(widths)
-            TableFormatter.print_row(headers, widths)
-            TableFormatter.print_horizontal_line(widths)
-            for row in str_rows:
-                TableFormatter.print_row(row, widths)
-            TableFormatter.print_horizontal_line(widths)
+            TableFormatter.write_table(headers, rows, limit_col)
         except Exception as e:
             print(f"Error printing table: {e}")
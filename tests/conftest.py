@@ -4,6 +4,7 @@ import sqlite3
 import os
 import json
 from pathlib import Path
+from tests.helpers import TABLE_COUNT
 from constants import *
 
 @pytest.fixture
@@ -195,4 +196,22 @@ def sample_db(test_db_path):
     """, sample_data)
     conn.commit()
     conn.close()
-    return test_db_path
\ No newline at end of file
+    return test_db_path
+
+@pytest.fixture
+def arena_tables_db(sample_db, tmp_path):
+    """sample_db plus many per-arena tables matched by one pattern, and their schema file"""
+    conn = sqlite3.connect(sample_db)
+    schemas = {}
+    for arena in range(TABLE_COUNT):
+        table = f"arenas-{arena}{SECTION_TABLE_CON}extents"
+        conn.execute(f'CREATE TABLE "{table}" (metadata_id INTEGER, timestamp TEXT, extents INTEGER, ndirty INTEGER)')
+        conn.executemany(f'INSERT INTO "{table}" VALUES (?, ?, ?, ?)',
+                         [(1, '123456789', ext, arena * 100 + ext) for ext in range(5)])
+        schemas[table] = {'columns': [{'name': c} for c in ('metadata_id', 'timestamp', 'extents', 'ndirty')]}
+    conn.commit()
+    conn.close()
+    schema_path = str(tmp_path / "schemas.json")
+    with open(schema_path, 'w') as f:
+        json.dump(schemas, f)
+    return sample_db, schema_path
@@ -0,0 +1,18 @@
+# tests/helpers.py
+from constants import *
+
+# Per-arena extents tables in the arena_tables_db fixture
+TABLE_COUNT = 12
+
+def make_config(jobs):
+    """Analyzer config with one 'extents' analysis over the arena_tables_db tables"""
+    return {
+        'jobs': jobs,
+        'analyses': {
+            'extents': {
+                'table': f"^arenas-.*{SECTION_TABLE_CON}extents$",
+                'metrics': [{'name': 'dirty', 'operation': 'sum', 'column': 'ndirty'}],
+                'groupby': ['extents'],
+            }
+        }
+    }
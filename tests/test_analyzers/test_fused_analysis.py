@@ -0,0 +1,100 @@
+# tests/test_analyzers/test_fused_analysis.py
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from tests.helpers import make_config, TABLE_COUNT
+from constants import *
+
+def make_fused_config(jobs):
+    config = make_config(jobs)
+    table = config['analyses']['extents']['table']
+    config['analyses'].update({
+        'extents_peak': {
+            'table': table,
+            'metrics': [{'name': 'peak_dirty', 'operation': 'max', 'column': 'ndirty'},
+                        {'name': 'dirty', 'operation': 'sum', 'column': 'ndirty'},
+                        {'name': 'avg_dirty', 'operation': 'avg', 'column': 'ndirty'}],
+            'groupby': ['extents'],
+            'sort': {'by': 'peak_dirty', 'order': 'desc'},
+        },
+        'extents_busy': {
+            'table': table,
+            'metrics': [{'name': 'busy', 'operation': 'expression',
+                         'formula': {'row_operation': 'ndirty', 'aggregation': 'sum', 'having': '> 2'}}],
+            'groupby': ['extents'],
+        },
+        'extents_by_dirty': {
+            'table': table,
+            'metrics': [{'name': 'dirty', 'operation': 'sum', 'column': 'ndirty'},
+                        {'name': 'avg_extent', 'operation': 'avg', 'column': 'extents'},
+                        {'name': 'extents', 'operation': 'count', 'column': 'extents'},
+                        {'name': 'first_extent', 'operation': 'min', 'column': 'extents'}],
+            'groupby': ['ndirty'],
+            'sort': {'by': 'dirty', 'order': 'desc'},
+        },
+        'extents_by_snapshot': {
+            'table': table,
+            'metrics': [{'name': 'dirty', 'operation': 'sum', 'column': 'ndirty'}],
+            'groupby': ['timestamp'],
+        },
+    })
+    return config
+
+NAMES = ['extents', 'extents_peak', 'extents_busy', 'extents_by_dirty', 'extents_by_snapshot']
+
+class TestFusedAnalysis:
+    def test_fused_results_match_separate_runs(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        for jobs in (1, 3):
+            analyzer = GenericAnalyzer(db_path, schema_path, make_fused_config(jobs))
+            scans = []
+            run_queries = analyzer._run_queries
+            analyzer._run_queries = lambda queries: scans.append(queries) or run_queries(queries)
+            fused = analyzer.analyze_fused(NAMES)
+            # extents_by_dirty rolls its groups up from the shared (extents, ndirty)
+            # aggregation; per-snapshot groups would be as large as the table
+            assert set(fused) == {'extents', 'extents_peak', 'extents_busy', 'extents_by_dirty'}
+            assert len(scans) == 1
+            for name, results in fused.items():
+                assert len(results) == TABLE_COUNT
+                assert results == analyzer.analyze(name)
+            analyzer.close()
+
+    def test_fused_with_timestamp(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_fused_config(1))
+        for timestamp in ('123456789', 'no-such-snapshot'):
+            fused = analyzer.analyze_fused(NAMES, timestamp)
+            for name, results in fused.items():
+                assert results == analyzer.analyze(name, timestamp)
+        analyzer.close()
+
+    def test_unfusable_analyses_are_left_out(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        config = make_fused_config(1)
+        config['analyses']['extents_peak']['metrics'].append(
+            {'name': 'missing', 'operation': 'sum', 'column': 'no_such_column'})
+        analyzer = GenericAnalyzer(db_path, schema_path, config)
+        # extents_peak fails schema validation, leaving extents without a partner
+        assert analyzer.analyze_fused(['extents', 'extents_peak']) == {}
+        analyzer.close()
+
+    def test_unmergeable_metrics_need_their_grouping(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        config = make_fused_config(1)
+        config['analyses']['extents_distinct'] = {
+            'table': config['analyses']['extents']['table'],
+            'metrics': [{'name': 'levels', 'operation': 'expression',
+                         'formula': {'row_operation': 'DISTINCT ndirty', 'aggregation': 'count'}}],
+            'groupby': ['extents'],
+        }
+        analyzer = GenericAnalyzer(db_path, schema_path, config)
+        names = NAMES + ['extents_distinct']
+        # extents_distinct cannot be rolled up, so the others join its grouping
+        # except extents_by_dirty, which needs a finer one
+        assert analyzer._fusion_clusters(names) == [
+            ['extents_by_snapshot'], ['extents_distinct', 'extents', 'extents_peak', 'extents_busy'],
+            ['extents_by_dirty']]
+        fused = analyzer.analyze_fused(names)
+        assert set(fused) == {'extents_distinct', 'extents', 'extents_peak', 'extents_busy'}
+        for name, results in fused.items():
+            assert results == analyzer.analyze(name)
+        analyzer.close()
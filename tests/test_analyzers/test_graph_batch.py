@@ -0,0 +1,62 @@
+# tests/test_analyzers/test_graph_batch.py
+import os
+import pytest
+from src.analyzer.je_analyzer import JeAnalyzer
+from src.analyzer.graph_batch import read_graph_batch
+from src.db.display_handler import DisplayHandler
+from tests.helpers import make_config, TABLE_COUNT
+from constants import *
+
+pytest.importorskip('matplotlib')
+
+def _specs():
+    arenas = f"arenas-.*{SECTION_TABLE_CON}extents"
+    return [f"{arenas},extents,ndirty", f"{arenas},extents,metadata_id",
+            f"arenas-1.*{SECTION_TABLE_CON}extents,extents,ndirty"]
+
+class TestGraphBatch:
+    def test_read_batch_file(self, tmp_path):
+        path = tmp_path / "pack.txt"
+        path.write_text("# incident pack\na,x,y\n\n  b,x,z  # bins\n")
+        assert read_graph_batch(str(path)) == ['a,x,y', 'b,x,z']
+
+    def test_several_columns_in_one_scan(self, arena_tables_db):
+        db_path, _ = arena_tables_db
+        handler = DisplayHandler(db_path)
+        table = f"arenas-3{SECTION_TABLE_CON}extents"
+        points, total, width = handler.series_points(table, 'extents', ['ndirty', 'metadata_id'], 2)
+        for i, column in enumerate(['ndirty', 'metadata_id'], start=1):
+            alone = handler.series_points(table, 'extents', column, 2)
+            assert set(alone[0]) <= {(point[0], point[i]) for point in points}
+            assert alone[1:] == (total, width)
+        handler.close()
+
+    def test_shared_loads_and_parallel_render(self, arena_tables_db, tmp_path, monkeypatch):
+        db_path, schema_path = arena_tables_db
+        analyzer = JeAnalyzer(db_path, dict(make_config(2), schema_path=schema_path))
+        loads = []
+        series_points = analyzer.display_handler.series_points
+        def counting(table, x_expr, y_expr, *args):
+            loads.append((table, tuple(y_expr)))
+            return series_points(table, x_expr, y_expr, *args)
+        monkeypatch.setattr(analyzer.display_handler, 'series_points', counting)
+        monkeypatch.chdir(tmp_path)
+        analyzer.plot_graph_batch(_specs())
+        # One load per table, carrying both columns
+        assert len(loads) == TABLE_COUNT
+        assert {columns for _, columns in loads} == {('ndirty', 'metadata_id')}
+        assert len([name for name in os.listdir(tmp_path) if name.endswith('.png')]) == 3
+        analyzer.close()
+
+    def test_bad_column_only_loses_its_own_series(self, arena_tables_db, tmp_path, monkeypatch, capsys):
+        db_path, schema_path = arena_tables_db
+        analyzer = JeAnalyzer(db_path, dict(make_config(1), schema_path=schema_path))
+        monkeypatch.chdir(tmp_path)
+        specs = _specs()[:1] + [f"arenas-.*{SECTION_TABLE_CON}extents,extents,no_such_column"]
+        figures = [analyzer._graph_plan(spec) for spec in specs]
+        analyzer._plot_figures(figures)
+        assert len(figures[0]['series']) == TABLE_COUNT
+        assert figures[1]['series'] == []
+        assert "column 'no_such_column'" in capsys.readouterr().out
+        assert [name for name in os.listdir(tmp_path) if name.endswith('.png')] == [figures[0]['output_file']]
+        analyzer.close()
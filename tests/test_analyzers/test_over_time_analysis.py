@@ -0,0 +1,71 @@
+# tests/test_analyzers/test_over_time_analysis.py
+import sqlite3
+import numpy as np
+import pytest
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from src.db.time_filter import TimeFilter
+from src.utils.columnar import ColumnarResult
+from tests.helpers import make_config, TABLE_COUNT
+from constants import *
+
+SNAPSHOTS = ['123456789', '123456790', '123456791']
+
+@pytest.fixture
+def snapshots_db(arena_tables_db):
+    """arena_tables_db with every arena table holding several snapshots"""
+    db_path, schema_path = arena_tables_db
+    conn = sqlite3.connect(db_path)
+    for arena in range(TABLE_COUNT):
+        table = f"arenas-{arena}{SECTION_TABLE_CON}extents"
+        for n, ts in enumerate(SNAPSHOTS[1:], start=1):
+            conn.executemany(f'INSERT INTO "{table}" VALUES (?, ?, ?, ?)',
+                             [(n + 1, ts, ext, (arena * 100 + ext) * (n + 1)) for ext in range(4 - n)])
+    conn.commit()
+    conn.close()
+    return db_path, schema_path
+
+def _fused_config():
+    config = make_config(1)
+    config['analyses']['extents_count'] = {
+        'table': config['analyses']['extents']['table'],
+        'metrics': [{'name': 'rows', 'operation': 'count', 'column': 'ndirty'}],
+        'groupby': ['extents'],
+    }
+    return config
+
+class TestOverTimeAnalysis:
+    def test_matches_one_run_per_timestamp(self, snapshots_db):
+        db_path, schema_path = snapshots_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(1))
+        over_time = analyzer.analyze('extents', over_time=True)
+        assert len(over_time) == TABLE_COUNT
+        per_snapshot = {ts: analyzer.analyze('extents', ts) for ts in SNAPSHOTS}
+        for i, result in enumerate(over_time):
+            assert result['columns'] == ['timestamp', 'extents', 'dirty']
+            expected = [(ts, *row) for ts in SNAPSHOTS for row in per_snapshot[ts][i]['data']]
+            assert result['data'] == expected
+        analyzer.close()
+
+    def test_fused_and_filtered(self, snapshots_db):
+        db_path, schema_path = snapshots_db
+        analyzer = GenericAnalyzer(db_path, schema_path, _fused_config())
+        time_filter = TimeFilter(since='123456790')
+        fused = analyzer.analyze_fused(['extents', 'extents_count'], time_filter, over_time=True)
+        assert set(fused) == {'extents', 'extents_count'}
+        for name in fused:
+            assert fused[name] == analyzer.analyze(name, time_filter, over_time=True)
+            assert {row[0] for result in fused[name] for row in result['data']} == set(SNAPSHOTS[1:])
+        analyzer.close()
+
+    def test_cube(self, snapshots_db):
+        db_path, schema_path = snapshots_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(1))
+        # Tables come in catalog order, arenas-0 first
+        result = analyzer.analyze('extents', over_time=True)[0]
+        labels, keys, values = ColumnarResult.from_result(result).cube('dirty', ['extents'])
+        assert labels == SNAPSHOTS
+        assert keys == [(ext,) for ext in range(5)]
+        assert values.shape == (3, 5)
+        assert values[0].tolist() == [0, 1, 2, 3, 4]
+        assert values[2, :2].tolist() == [0, 3] and np.isnan(values[2, 2:]).all()
+        analyzer.close()
@@ -0,0 +1,60 @@
+# tests/test_analyzers/test_parallel_analysis.py
+import sqlite3
+import pytest
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from tests.helpers import make_config, TABLE_COUNT
+from constants import *
+
+class TestParallelAnalysis:
+    def test_parallel_matches_serial_in_table_order(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        serial = GenericAnalyzer(db_path, schema_path, make_config(1))
+        parallel = GenericAnalyzer(db_path, schema_path, make_config(4))
+        expected = serial.analyze('extents')
+        assert len(expected) == TABLE_COUNT
+        assert parallel.analyze('extents') == expected
+        # Readers are opened once and reused by later analyses
+        readers = parallel.connection.readers(4)
+        assert parallel.analyze('extents') == expected
+        assert parallel.connection.readers(4) == readers
+        serial.close()
+        parallel.close()
+
+    def test_readers_are_read_only(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(2))
+        for reader in analyzer.connection.readers(2):
+            with pytest.raises(sqlite3.OperationalError):
+                reader.execute("CREATE TABLE should_fail (x INTEGER)")
+        analyzer.close()
+        assert analyzer.connection._readers == []
+
+    def test_default_jobs_follow_cpu_count(self, arena_tables_db, monkeypatch):
+        db_path, schema_path = arena_tables_db
+        monkeypatch.setattr('os.cpu_count', lambda: 3)
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(None))
+        assert analyzer.jobs == 3
+        analyzer.close()
+
+class TestParallelTableStats:
+    def test_reports_match_serial_in_order(self, arena_tables_db):
+        from src.analyzer.parallel_stats import table_stats_reports
+        from src.db.stats_handler import StatsHandler
+        db_path, _ = arena_tables_db
+        handler = StatsHandler(db_path)
+        tables = handler.list_tables()
+        expected = [handler.format_table_stats(table) for table in tables]
+        handler.close()
+
+        reports = list(table_stats_reports(db_path, {}, tables, jobs=3))
+        assert [table for table, _, _ in reports] == tables
+        assert [report for _, report, _ in reports] == expected
+        assert all(seconds >= 0 for _, _, seconds in reports)
+
+    def test_batches_keep_order(self):
+        from src.analyzer.parallel_stats import batch_tables
+        tables = [f"t{i}" for i in range(10)]
+        batches = batch_tables(tables, jobs=2)
+        assert sum(batches, []) == tables
+        assert len(batches) == 5
+        assert batch_tables(['a'], jobs=8) == [['a']]
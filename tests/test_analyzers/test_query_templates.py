@@ -0,0 +1,30 @@
+# tests/test_analyzers/test_query_templates.py
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from tests.helpers import make_config, TABLE_COUNT
+from constants import *
+
+class TestQueryTemplates:
+    def test_one_template_per_schema_shape(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(1))
+        first = analyzer.analyze('extents')
+        assert len(first) == TABLE_COUNT
+        # All arena tables share their columns, so they share one template
+        assert len(analyzer._query_templates) == 1
+        assert analyzer.analyze('extents') == first
+        assert len(analyzer._query_templates) == 1
+        analyzer.close()
+
+    def test_timestamp_is_bound_as_parameter(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(1))
+        table = f"arenas-0{SECTION_TABLE_CON}extents"
+        schema = analyzer._get_schema_for_table(table)
+        query, params = analyzer._build_query('extents', table, schema, "1' OR '1'='1")
+        assert "1' OR" not in query
+        assert params == ("1' OR '1'='1",)
+        assert all(not result['data'] for result in analyzer.analyze('extents', "no-such-snapshot"))
+        assert analyzer.analyze('extents', '123456789') == analyzer.analyze('extents')
+        # Filtered and unfiltered runs use separate templates
+        assert len(analyzer._query_templates) == 2
+        analyzer.close()
@@ -1,6 +1,9 @@
 # tests/test_analyzers/test_stats_analysis.py
 import pytest
-from src.analyzer.je_analyzer import JeAnalyzer
+import random
+import sqlite3
+from src.analyzer.je_analyzer import JeAnalyzer, load_config
+from src.cli import build_parser, run
 from src.db.stats_handler import StatsHandler
 import json
 from constants import *
@@ -100,4 +103,76 @@ class TestStatsAnalysis:
         stats = stats_handler.calculate_table_stats(f"merged_arena_stats{SECTION_TABLE_CON}overall")
         
         # Verify NULL values are handled correctly
-        assert stats['allocated']['count'] == 4  # Should count non-NULL values
\ No newline at end of file
+        assert stats['allocated']['count'] == 4  # Should count non-NULL values
+
+class TestSketchStats:
+    def test_sketch_matches_exact_on_small_tables(self, sample_db):
+        """Sketches stay exact until they first compact"""
+        stats_handler = StatsHandler(sample_db)
+        stats = stats_handler.calculate_table_stats(f"merged_arena_stats{SECTION_TABLE_CON}overall", quantiles='sketch')
+
+        assert stats['allocated']['count'] == 4
+        assert stats['allocated']['sum'] == 7000.0
+        assert stats['allocated']['min'] == 1000.0
+        assert stats['allocated']['max'] == 2500.0
+        assert stats['allocated']['p90'] == 2500.0
+
+    def test_per_timestamp_sketches_merge(self, sample_db):
+        stats_handler = StatsHandler(sample_db)
+        table = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+        per_snapshot = stats_handler.build_column_sketches(table, by_timestamp=True, chunk_size=1)
+        assert len(per_snapshot) == 2
+
+        merged = stats_handler.merge_column_sketches(list(per_snapshot.values()))
+        assert merged['allocated'].count == 4
+        assert merged['allocated'].sum == 7000.0
+        assert merged['nmalloc'].quantile(1.0) == 1200.0
+
+    def test_stats_mode_with_sketch_quantiles(self, sample_db, capsys):
+        values = list(range(20000))
+        random.Random(1).shuffle(values)
+        conn = sqlite3.connect(sample_db)
+        for table in ('spread_a', 'spread_b'):
+            conn.execute(f"CREATE TABLE {table} (timestamp TEXT, value INTEGER)")
+            conn.executemany(f"INSERT INTO {table} VALUES (?, ?)", [(str(i % 10), v) for i, v in enumerate(values)])
+        conn.commit()
+        conn.close()
+        for jobs in (1, 2):
+            analyzer = JeAnalyzer(sample_db, dict(load_config('config/analyzer_config.json'), jobs=jobs))
+            capsys.readouterr()
+            run(analyzer, build_parser().parse_args([sample_db, '--mode', '^stats$', '--table', '^spread_',
+                                                     '--quantiles', 'sketch', '--quantile-error', '0.01']))
+            out = capsys.readouterr().out
+            assert out.count('=== spread_') == 2 and 'P50' in out
+            run(analyzer, build_parser().parse_args([sample_db, '--mode', '^stats$', '--table', '^spread_a$',
+                                                     '--quantiles', 'sketch', '--output-format', 'jsonl']))
+            records = {r['metric']: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+            analyzer.close()
+            # Percentiles are within the rank error; SUM of the earliest snapshot stays exact
+            for metric, rank in (('P50', 10000), ('P90', 18000), ('P99', 19800)):
+                assert abs(records[metric]['value'] + 1 - rank) <= 0.01 * len(values)
+            assert records['SUM']['value'] == float(sum(values[0::10]))
+
+class TestStatsTimeWindow:
+    def test_stats_mode_applies_the_time_window(self, sample_db, capsys):
+        table = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+        for jobs in (1, 2):
+            analyzer = JeAnalyzer(sample_db, dict(load_config('config/analyzer_config.json'), jobs=jobs))
+            capsys.readouterr()
+            run(analyzer, build_parser().parse_args([sample_db, '--mode', '^stats$', '--table', f'^{table}$',
+                                                     '--since', '123456790', '--output-format', 'jsonl']))
+            records = {r['metric']: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+            # Only the second snapshot: 1500 and 2500
+            assert records['SUM']['allocated'] == 4000.0
+            assert records['P50']['allocated'] == 1500.0
+            run(analyzer, build_parser().parse_args([sample_db, '--mode', '^stats$', '--table', f'^{table}$',
+                                                     '--until', '123456789']))
+            out = capsys.readouterr().out
+            assert '3000.00' in out and '2500.00' not in out
+            analyzer.close()
+
+    def test_meta_mode_warns_that_it_ignores_the_window(self, sample_db, capsys):
+        analyzer = JeAnalyzer(sample_db, load_config('config/analyzer_config.json'))
+        run(analyzer, build_parser().parse_args([sample_db, '--mode', '^meta$', '--since', '1h']))
+        assert 'time window is not applied' in capsys.readouterr().err
+        analyzer.close()
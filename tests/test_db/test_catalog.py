@@ -0,0 +1,36 @@
+# tests/test_db/test_catalog.py
+import sqlite3
+from src.db.catalog import TableCatalog
+from constants import *
+
+class TestTableCatalog:
+    def test_indexes_by_section_arena_and_stats(self, sample_db):
+        conn = sqlite3.connect(sample_db)
+        conn.execute(f"CREATE TABLE 'arenas-3{SECTION_TABLE_CON}overall' (x INTEGER)")
+        conn.execute(f"CREATE TABLE 'stats-arenas-3{SECTION_TABLE_CON}overall' (x INTEGER)")
+        catalog = TableCatalog(conn)
+
+        assert catalog.arena_ids() == [3]
+        assert catalog.arena_tables(3) == [f"arenas-3{SECTION_TABLE_CON}overall",
+                                          f"stats-arenas-3{SECTION_TABLE_CON}overall"]
+        assert 'stats-merged_arena_stats__bins_v1' in catalog.stats_tables()
+        assert f"merged_arena_stats{SECTION_TABLE_CON}overall" in catalog.section_tables('merged_arena_stats')
+        assert len(catalog.kind_tables('overall')) == 3
+        conn.close()
+
+    def test_match_semantics(self, sample_db):
+        conn = sqlite3.connect(sample_db)
+        catalog = TableCatalog(conn)
+        assert catalog.match('bins_v1') == ['bins_v1', 'stats-merged_arena_stats__bins_v1']
+        assert catalog.match('bins_v1', how='match') == ['bins_v1']
+        conn.close()
+
+    def test_rebuilt_on_schema_change(self, sample_db):
+        conn = sqlite3.connect(sample_db)
+        catalog = TableCatalog(conn)
+        assert not catalog.has_table('late_table')
+        assert catalog.match('late') == []
+        conn.execute("CREATE TABLE late_table (x INTEGER)")
+        assert catalog.has_table('late_table')
+        assert catalog.match('late') == ['late_table']
+        conn.close()
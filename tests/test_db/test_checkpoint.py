@@ -0,0 +1,114 @@
+# tests/test_db/test_checkpoint.py
+import json
+from src.db.checkpoint import CheckpointStore, merge_groups, checkpoint_path
+from src.db.stats_handler import StatsHandler
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from constants import *
+
+OVERALL = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+
+ACTIVITY_CONFIG = {
+    'analyses': {
+        'activity': {
+            'table': 'bins_v1',
+            'metrics': [
+                {'name': 'bin_size', 'operation': 'max', 'column': 'size'},
+                {'name': 'total_requests', 'operation': 'sum', 'column': 'nrequests'},
+                {'name': 'utilization', 'operation': 'avg', 'column': 'util'},
+                {'name': 'total_pages', 'operation': 'expression',
+                 'formula': {'row_operation': 'pgs * curslabs', 'aggregation': 'sum'}},
+            ],
+            'groupby': ['bins'],
+            'sort': {'by': 'total_requests', 'order': 'desc'},
+        }
+    }
+}
+
+def stats_analyses(handler):
+    return (handler.analyze_memory_trends(window_size=3),
+            handler.detect_potential_leaks(threshold_percent=5.0),
+            handler.analyze_fragmentation())
+
+def add_snapshot(db_path):
+    handler = StatsHandler(db_path)
+    with handler._get_write_cursor() as cur:
+        cur.execute(f"INSERT INTO {OVERALL} VALUES (10, '123456791', '0', '5000', '900', '100', '1', '1')")
+        cur.execute("INSERT INTO bins VALUES (11, '123456791', '300', '30', '3', '90')")
+        cur.execute("INSERT INTO bins_v1 (timestamp, metadata_id, bins, size, nrequests, util, pgs, curslabs) "
+                    "VALUES (123456791, 12, 0, 8, 100, 0.5, 1, 4)")
+    handler.close()
+
+def test_merge_groups():
+    groups = [['a', 1, 5], ['b', 2, 1]]
+    merged = merge_groups(groups, [('a', 3, 2), ('c', 1, None)], 1, ['sum', 'max'])
+    assert sorted(merged) == [['a', 4, 5], ['b', 2, 1], ['c', 1, None]]
+
+class TestIncrementalAnalyses:
+    def test_stats_analyses_match_full_scan(self, sample_db, tmp_path):
+        store_path = str(tmp_path / "state.json")
+        handler = StatsHandler(sample_db)
+        handler.checkpoints = CheckpointStore(store_path)
+        assert stats_analyses(handler) == stats_analyses(StatsHandler(sample_db))
+        handler.checkpoints.save()
+        handler.close()
+
+        add_snapshot(sample_db)
+        handler = StatsHandler(sample_db)
+        handler.checkpoints = CheckpointStore(store_path)
+        incremental = stats_analyses(handler)
+        handler.checkpoints = None
+        assert incremental == stats_analyses(handler)
+        assert incremental[0][-1]['total_allocated'] == 5000.0
+        handler.close()
+
+    def test_only_new_snapshots_are_scanned(self, sample_db, tmp_path):
+        store_path = str(tmp_path / "state.json")
+        handler = StatsHandler(sample_db)
+        handler.checkpoints = CheckpointStore(store_path)
+        handler.analyze_memory_trends()
+        handler.checkpoints.save()
+        state = handler.checkpoints.get(f"memory_trends:{OVERALL}")
+        assert state['watermark'] == 3
+        assert len(state['groups']) == 2
+
+        statements = []
+        handler.conn.set_trace_callback(statements.append)
+        handler.analyze_memory_trends()
+        handler.conn.set_trace_callback(None)
+        # Nothing new: no aggregation over the source, just the saved groups
+        assert not any('GROUP BY timestamp' in sql and 'json_each' not in sql for sql in statements)
+        handler.close()
+
+        with open(store_path) as f:
+            assert f"memory_trends:{OVERALL}" in json.load(f)
+
+    def test_rewritten_table_resets_state(self, sample_db, tmp_path):
+        handler = StatsHandler(sample_db)
+        handler.checkpoints = CheckpointStore(str(tmp_path / "state.json"))
+        handler.analyze_memory_trends()
+        with handler._get_write_cursor() as cur:
+            cur.execute(f"DELETE FROM {OVERALL} WHERE metadata_id = 3")
+        assert [row['total_allocated'] for row in handler.analyze_memory_trends()] == [3000.0]
+        handler.close()
+
+    def test_generic_analysis_matches_full_scan(self, sample_db, tmp_path):
+        schema_path = str(tmp_path / "schemas.json")
+        with open(schema_path, 'w') as f:
+            json.dump({'bins_v1': {'columns': [{'name': c} for c in ('bins', 'size', 'nrequests', 'util')]}}, f)
+        expected = GenericAnalyzer(sample_db, schema_path, ACTIVITY_CONFIG).analyze('activity')
+        store_path = str(tmp_path / "state.json")
+        analyzer = GenericAnalyzer(sample_db, schema_path, ACTIVITY_CONFIG)
+        analyzer.checkpoints = CheckpointStore(store_path)
+        assert analyzer.analyze('activity') == expected
+        analyzer.checkpoints.save()
+        analyzer.close()
+
+        add_snapshot(sample_db)
+        analyzer = GenericAnalyzer(sample_db, schema_path, ACTIVITY_CONFIG)
+        expected = analyzer.analyze('activity')
+        analyzer.checkpoints = CheckpointStore(store_path)
+        assert analyzer.analyze('activity') == expected
+        analyzer.close()
+
+def test_checkpoint_path():
+    assert checkpoint_path('/data/stats.db') == '/data/stats.db.checkpoints.json'
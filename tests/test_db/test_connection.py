@@ -0,0 +1,33 @@
+# tests/test_db/test_connection.py
+import sqlite3
+import pytest
+from src.db.connection import ConnectionManager
+from src.analyzer.je_analyzer import JeAnalyzer, load_config
+from constants import *
+
+class TestConnectionManager:
+    def test_read_only_rejects_writes(self, sample_db):
+        manager = ConnectionManager(sample_db)
+        with pytest.raises(sqlite3.OperationalError):
+            manager.conn.execute("CREATE TABLE should_fail (x INTEGER)")
+        manager.close()
+
+    def test_profile_is_applied(self, sample_db):
+        manager = ConnectionManager(sample_db, profile={'cache_size': -1234})
+        assert manager.conn.execute("PRAGMA cache_size").fetchone()[0] == -1234
+        assert manager.conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        manager.close()
+
+    def test_from_config(self, sample_db):
+        manager = ConnectionManager.from_config(sample_db, {'connection': {'read_only': False, 'cache_size': -100}})
+        assert manager.read_only is False
+        assert manager.profile['cache_size'] == -100
+        manager.close()
+
+    def test_analyzer_handlers_share_connection(self, sample_db):
+        analyzer = JeAnalyzer(sample_db, load_config('config/analyzer_config.json'))
+        conn = analyzer.connection.conn
+        assert analyzer.stats_handler.conn is conn
+        assert analyzer.display_handler.conn is conn
+        assert analyzer.generic_analyzer.conn is conn
+        analyzer.close()
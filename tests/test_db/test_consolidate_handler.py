@@ -0,0 +1,149 @@
+# tests/test_db/test_consolidate_handler.py
+import sqlite3
+import pytest
+from src.db.consolidate_handler import ConsolidateHandler, arena_table_name
+from src.db.stats_handler import StatsHandler
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from src.db.time_filter import TimeFilter
+from constants import *
+
+ARENAS = 5
+COMPARISON_CONFIG = {
+    'analyses': {
+        'arena_comparison': {
+            'table': 'unused',
+            'metrics': [
+                {'name': 'total_allocated', 'operation': 'sum', 'column': 'allocated'},
+                {'name': 'allocation_rate', 'operation': 'sum', 'column': 'nmalloc'},
+            ],
+            'special': 'arena_pattern',
+        }
+    }
+}
+
+def arena_table(arena_id):
+    return f"arenas-{arena_id}{SECTION_TABLE_CON}overall"
+
+@pytest.fixture
+def arenas_db(sample_db):
+    conn = sqlite3.connect(sample_db)
+    for arena in range(ARENAS):
+        conn.execute(f'''CREATE TABLE "{arena_table(arena)}" (metadata_id INTEGER, timestamp TEXT,
+            {COL_HEADER_FILLER} TEXT, allocated TEXT, nmalloc TEXT, ndalloc TEXT, rps_nmalloc TEXT, rps_ndalloc TEXT)''')
+        for metadata_id, row in ((1, 0), (1, 1), (3, 0), (3, 1)):
+            conn.execute(f'INSERT INTO "{arena_table(arena)}" VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (metadata_id, str(123456789 + metadata_id // 3), str(row), str(100 * (arena + 1) + row),
+                          str(10 + arena), str(5 + row), '1', '1'))
+    conn.commit()
+    conn.close()
+    return sample_db
+
+def arena_results(db_path, tables):
+    handler = StatsHandler(db_path)
+    rows = handler.analyze_arenas_activity(tables)
+    handler.close()
+    return rows
+
+class TestConsolidateHandler:
+    def test_consolidated_activity_matches_per_table(self, arenas_db):
+        tables = [arena_table(arena) for arena in range(ARENAS)]
+        expected = arena_results(arenas_db, tables)
+        expected_subset = arena_results(arenas_db, tables[:2])
+        assert {row['arena_id'] for row in expected} == set(range(ARENAS))
+
+        handler = ConsolidateHandler(arenas_db)
+        reports = handler.consolidate(['overall'])
+        assert reports[0]['rows'] == 4 * ARENAS
+        assert handler.resolve_arena_table('overall') == arena_table_name('overall')
+        assert arena_table_name('overall') not in handler.list_tables()
+        handler.close()
+
+        assert arena_results(arenas_db, tables) == expected
+        # A subset of the arenas is filtered inside the consolidated table
+        assert arena_results(arenas_db, tables[:2]) == expected_subset
+
+    def test_arena_activity_hints_once(self, arenas_db, capsys):
+        arena_results(arenas_db, [arena_table(arena) for arena in range(ARENAS)])
+        err = capsys.readouterr().err
+        assert err.count("je-analyze index") == 1
+        assert f"{ARENAS} tables lack an index on metadata_id" in err
+
+    def test_incremental_refresh(self, arenas_db):
+        handler = ConsolidateHandler(arenas_db)
+        handler.consolidate(['overall'])
+        with handler._get_write_cursor() as cur:
+            cur.execute(f'INSERT INTO "{arena_table(2)}" VALUES (3, \'123456790\', \'0\', \'7\', \'1\', \'1\', \'1\', \'1\')')
+        assert handler.resolve_arena_table('overall') is None
+
+        report = handler.build_arena_table('overall')
+        assert report['appended_rows'] == 1
+        assert report['reloaded_sources'] == 0
+        assert report['rows'] == 4 * ARENAS + 1
+        assert handler.resolve_arena_table('overall') == arena_table_name('overall')
+
+        with handler._get_write_cursor() as cur:
+            cur.execute(f'DROP TABLE "{arena_table(4)}"')
+        assert handler.resolve_arena_table('overall') is None
+        report = handler.build_arena_table('overall')
+        assert report['rows'] == 4 * (ARENAS - 1) + 1
+        handler.close()
+
+    def test_arena_comparison_uses_consolidated_table(self, arenas_db, tmp_path):
+        analyzer = GenericAnalyzer(arenas_db, 'config/table_schemas_gen.json', COMPARISON_CONFIG)
+        expected = analyzer.analyze('arena_comparison')
+        assert len(expected['data']) == ARENAS
+
+        ConsolidateHandler(arenas_db).consolidate()
+        statements = []
+        analyzer.conn.set_trace_callback(statements.append)
+        assert analyzer.analyze('arena_comparison') == expected
+        analyzer.conn.set_trace_callback(None)
+        assert not any('UNION ALL' in sql for sql in statements)
+        analyzer.close()
+
+    def test_arena_comparison_applies_the_time_window(self, arenas_db):
+        analyzer = GenericAnalyzer(arenas_db, 'config/table_schemas_gen.json', COMPARISON_CONFIG)
+        # Arena n holds 100(n+1) + row for rows 0 and 1 of both snapshots
+        window = TimeFilter(since='123456790')
+        expected = {arena: 2 * 100 * (arena + 1) + 1 for arena in range(ARENAS)}
+        for consolidate in (False, True):
+            if consolidate:
+                ConsolidateHandler(arenas_db).consolidate()
+            result = analyzer.analyze('arena_comparison', window)
+            columns = result['columns']
+            totals = {row[columns.index('arena_id')]: row[columns.index('total_allocated')]
+                      for row in result['data']}
+            assert totals == expected
+        analyzer.close()
+
+    def test_rewritten_sources_are_reloaded(self, arenas_db):
+        tables = [arena_table(arena) for arena in range(ARENAS)]
+        handler = ConsolidateHandler(arenas_db)
+        handler.consolidate(['overall'])
+        writer = sqlite3.connect(arenas_db)
+        writer.execute(f'UPDATE "{arena_table(1)}" SET allocated = \'999999\' WHERE rowid = 1')
+        writer.commit()
+        assert handler.resolve_arena_table('overall') is None
+        report = handler.build_arena_table('overall')
+        assert report['reloaded_sources'] == 1
+        assert report['rows'] == 4 * ARENAS
+
+        # Re-created with more rows than before: MAX(rowid) alone looks like an append
+        writer.execute(f'CREATE TABLE "{arena_table(3)}_new" AS SELECT * FROM "{arena_table(0)}"')
+        writer.execute(f'INSERT INTO "{arena_table(3)}_new" SELECT * FROM "{arena_table(0)}"')
+        writer.execute(f'DROP TABLE "{arena_table(3)}"')
+        writer.execute(f'ALTER TABLE "{arena_table(3)}_new" RENAME TO "{arena_table(3)}"')
+        writer.commit()
+        writer.close()
+        assert handler.resolve_arena_table('overall') is None
+        report = handler.build_arena_table('overall')
+        assert report['reloaded_sources'] == 1
+        assert report['rows'] == 4 * ARENAS + 4
+        handler.close()
+
+        consolidated = arena_results(arenas_db, tables)
+        handler = StatsHandler(arenas_db)
+        handler.conn.execute(f'DROP TABLE "{arena_table_name("overall")}"')
+        handler.conn.commit()
+        handler.close()
+        assert consolidated == arena_results(arenas_db, tables)
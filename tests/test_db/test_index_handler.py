@@ -0,0 +1,63 @@
+# tests/test_db/test_index_handler.py
+from src.db.index_handler import IndexHandler, index_name
+from src.db.display_handler import DisplayHandler
+from constants import *
+
+OVERALL = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+
+class TestIndexHandler:
+    def test_builds_and_records_indexes(self, sample_db):
+        handler = IndexHandler(sample_db)
+        reports = handler.build_indexes(OVERALL)
+        assert reports and all(r['table'] == OVERALL for r in reports)
+        with handler._get_cursor() as cur:
+            cur.execute("SELECT name FROM sqlite_master WHERE type='index'")
+            existing = {row[0] for row in cur.fetchall()}
+        assert {r['index'] for r in reports} <= existing
+        assert handler.has_index(OVERALL, ('timestamp',))
+        assert handler.has_index(OVERALL, ('timestamp', 'metadata_id'))
+        assert not handler.has_index(OVERALL, ('allocated',))
+        # Registry and sqlite_stat1 stay out of the listings
+        assert all(not t.startswith(('_je_', 'sqlite_')) for t in handler.list_tables())
+        handler.close()
+
+    def test_rebuild_is_idempotent(self, sample_db):
+        handler = IndexHandler(sample_db)
+        first = handler.build_indexes(OVERALL)
+        second = handler.build_indexes(OVERALL)
+        assert [r['index'] for r in first] == [r['index'] for r in second]
+        handler.close()
+
+    def test_hint_until_indexed(self, sample_db, capsys):
+        display = DisplayHandler(sample_db)
+        display.hint_missing_index(OVERALL, ('timestamp',))
+        display.hint_missing_index(OVERALL, ('timestamp',))
+        assert capsys.readouterr().err.count("je-analyze index") == 1
+
+        IndexHandler(sample_db).build_indexes(OVERALL)
+        capsys.readouterr()
+        display._index_hints.clear()
+        display.hint_missing_index(OVERALL, ('timestamp',))
+        assert capsys.readouterr().err == ""
+        display.close()
+
+    def test_one_hint_for_many_tables(self, sample_db, capsys):
+        display = DisplayHandler(sample_db)
+        display.hint_missing_index([OVERALL, 'bins', 'bins_v1'], ('metadata_id',))
+        display.hint_missing_index(['bins'], ('metadata_id',))
+        err = capsys.readouterr().err
+        assert err.count("je-analyze index") == 1
+        assert "3 tables lack an index on metadata_id" in err
+        display.close()
+
+    def test_dropped_index_is_not_reported(self, sample_db):
+        handler = IndexHandler(sample_db)
+        reports = handler.build_indexes(OVERALL)
+        with handler._get_write_cursor() as cur:
+            for r in reports:
+                cur.execute(f'DROP INDEX "{r["index"]}"')
+        assert not handler.has_index(OVERALL, ('timestamp',))
+        handler.close()
+
+def test_index_name():
+    assert index_name('t', 'pk') == '_je_idx_t_pk'
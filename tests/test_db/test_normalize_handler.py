@@ -0,0 +1,80 @@
+# tests/test_db/test_normalize_handler.py
+import sqlite3
+import pytest
+from src.db.normalize_handler import NormalizeHandler, typed_table_name
+from src.db.stats_handler import StatsHandler
+from constants import *
+
+OVERALL = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+
+class TestNormalizeHandler:
+    def test_infers_column_types(self, sample_db):
+        handler = NormalizeHandler(sample_db)
+        types = dict(handler.infer_column_types(OVERALL))
+        assert types['allocated'] == 'INTEGER'
+        assert types['timestamp'] == 'INTEGER'
+        handler.close()
+
+    def test_typed_copy_is_used_until_source_grows(self, sample_db):
+        handler = NormalizeHandler(sample_db)
+        reports = handler.normalize(OVERALL)
+        handler.close()
+        assert [r['table'] for r in reports] == [OVERALL]
+
+        stats_handler = StatsHandler(sample_db)
+        assert stats_handler.resolve_table(OVERALL) == typed_table_name(OVERALL)
+        assert OVERALL in stats_handler.list_tables()
+        assert typed_table_name(OVERALL) not in stats_handler.list_tables()
+        # Same results from the typed copy
+        assert stats_handler.detect_potential_leaks(threshold_percent=5.0)[0]['total_allocated'] == 4000.0
+
+        with stats_handler._get_write_cursor() as cur:
+            cur.execute(f"INSERT INTO {OVERALL} VALUES (9, '123456799', '0', '1', '1', '1', '1', '1')")
+        assert stats_handler.resolve_table(OVERALL) == OVERALL
+        stats_handler.close()
+
+    def test_failed_rebuild_keeps_the_old_copy(self, sample_db, monkeypatch):
+        handler = NormalizeHandler(sample_db)
+        handler.normalize(OVERALL)
+        infer_column_types = handler.infer_column_types
+        # The new copy is created, then filling it fails
+        monkeypatch.setattr(handler, 'infer_column_types', lambda table: [
+            (col, 'INTEGER CHECK (0)' if col == 'allocated' else col_type)
+            for col, col_type in infer_column_types(table)])
+        with pytest.raises(sqlite3.OperationalError):
+            handler.build_typed_table(OVERALL)
+        handler.close()
+
+        stats_handler = StatsHandler(sample_db)
+        typed = stats_handler.resolve_table(OVERALL)
+        assert typed == typed_table_name(OVERALL)
+        assert stats_handler.conn.execute(f'SELECT COUNT(*) FROM "{typed}"').fetchone()[0] == 4
+        stats_handler.close()
+
+    def test_typed_copy_is_dropped_after_in_place_writes(self, sample_db):
+        handler = NormalizeHandler(sample_db)
+        handler.normalize(OVERALL)
+        handler.close()
+
+        stats_handler = StatsHandler(sample_db)
+        assert stats_handler.resolve_table(OVERALL) == typed_table_name(OVERALL)
+        # Another process rewrites a row without adding any
+        writer = sqlite3.connect(sample_db)
+        writer.execute(f"UPDATE {OVERALL} SET allocated = '999999' WHERE rowid = 1")
+        writer.commit()
+        assert stats_handler.resolve_table(OVERALL) == OVERALL
+        writer.close()
+        stats_handler.close()
+
+        handler = NormalizeHandler(sample_db)
+        handler.normalize(OVERALL)
+        handler.close()
+        stats_handler = StatsHandler(sample_db)
+        assert stats_handler.resolve_table(OVERALL) == typed_table_name(OVERALL)
+        # A source dropped and re-created with as many rows is not tracked any more
+        with stats_handler._get_write_cursor() as cur:
+            cur.execute(f'CREATE TABLE "{OVERALL}_copy" AS SELECT * FROM "{OVERALL}"')
+            cur.execute(f'DROP TABLE "{OVERALL}"')
+            cur.execute(f'ALTER TABLE "{OVERALL}_copy" RENAME TO "{OVERALL}"')
+        assert stats_handler.resolve_table(OVERALL) == OVERALL
+        stats_handler.close()
@@ -0,0 +1,81 @@
+# tests/test_db/test_result_cache.py
+import sqlite3
+import pytest
+from src.analyzer.je_analyzer import JeAnalyzer
+from src.db.result_cache import ResultCache, cache_key
+from tests.helpers import make_config
+from constants import *
+
+class TestResultCache:
+    def test_hit_and_fingerprint_mismatch(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "results.sqlite"))
+        key = cache_key("db", "analysis", {"table": "t"}, None)
+        assert cache.get(key, [1]) is None
+        assert cache.put(key, [1], {'columns': ['a'], 'data': [(1,)]})
+        assert cache.get(key, [1]) == {'columns': ['a'], 'data': [[1]]}
+        # Computed from other data: dropped
+        assert cache.get(key, [2]) is None
+        assert cache.get(key, [1]) is None
+        cache.close()
+
+    def test_keys_differ_by_arguments(self):
+        assert cache_key("db", "analysis", {}, None) != cache_key("db", "analysis", {}, "123")
+        assert cache_key("db", "analysis", {"a": 1, "b": 2}) == cache_key("db", "analysis", {"b": 2, "a": 1})
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=250)
+        value = ['x' * 90]
+        cache.put('a', [], value)
+        cache.put('b', [], value)
+        cache.get('a', [])
+        cache.put('c', [], value)
+        assert cache.get('a', []) == value
+        assert cache.get('b', []) is None
+        assert cache.get('c', []) == value
+        # Values larger than the whole cache are not stored
+        assert not cache.put('d', [], ['x' * 300])
+        cache.close()
+
+    def test_analyzer_reuses_result_until_tables_change(self, arena_tables_db, tmp_path):
+        db_path, schema_path = arena_tables_db
+        config = dict(make_config(1), schema_path=schema_path)
+        cache_file = str(tmp_path / "results.sqlite")
+        analyzer = JeAnalyzer(db_path, config, cache_file=cache_file)
+        first = analyzer.run_analysis('extents')
+        analyzer.close()
+
+        analyzer = JeAnalyzer(db_path, config, cache_file=cache_file)
+        analyzer.generic_analyzer.analyze = lambda *args: (_ for _ in ()).throw(AssertionError("not cached"))
+        assert analyzer.run_analysis('extents') == [{'columns': r['columns'], 'data': [list(row) for row in r['data']]}
+                                                    for r in first]
+        analyzer.close()
+
+        conn = sqlite3.connect(db_path)
+        conn.execute(f'INSERT INTO "arenas-3{SECTION_TABLE_CON}extents" VALUES (2, ?, 0, 1000)', ('223456789',))
+        conn.commit()
+        conn.close()
+        analyzer = JeAnalyzer(db_path, config, cache_file=cache_file)
+        updated = analyzer.run_analysis('extents')
+        total = lambda results: sum(row[1] for result in results for row in result['data'])
+        assert total(updated) == total(first) + 1000
+        analyzer.close()
+
+    @pytest.mark.parametrize('journal_mode', ['delete', 'wal'])
+    def test_in_place_updates_invalidate(self, arena_tables_db, tmp_path, journal_mode):
+        db_path, schema_path = arena_tables_db
+        config = dict(make_config(1), schema_path=schema_path)
+        cache_file = str(tmp_path / "results.sqlite")
+        writer = sqlite3.connect(db_path)
+        writer.execute(f"PRAGMA journal_mode={journal_mode}")
+        total = lambda results: sum(row[1] for result in results for row in result['data'])
+        analyzer = JeAnalyzer(db_path, config, cache_file=cache_file)
+        first = total(analyzer.run_analysis('extents'))
+        # Same row count and MAX(rowid), only a value changes
+        writer.execute(f'UPDATE "arenas-3{SECTION_TABLE_CON}extents" SET ndirty = ndirty + 1000000 WHERE rowid = 1')
+        writer.commit()
+        assert total(analyzer.run_analysis('extents')) == first + 1000000
+        writer.execute(f'DELETE FROM "arenas-3{SECTION_TABLE_CON}extents" WHERE rowid = 1')
+        writer.commit()
+        assert total(analyzer.run_analysis('extents')) == first - 300
+        analyzer.close()
+        writer.close()
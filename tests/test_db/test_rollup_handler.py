@@ -0,0 +1,97 @@
+# tests/test_db/test_rollup_handler.py
+import sqlite3
+import pytest
+from src.db.rollup_handler import RollupHandler, ROLLUP_COLUMNS, rollup_table_name
+from src.db.stats_handler import StatsHandler
+from constants import *
+
+OVERALL = f"merged_arena_stats{SECTION_TABLE_CON}overall"
+
+def analyses(handler):
+    return handler.analyze_memory_trends(), handler.detect_potential_leaks(threshold_percent=5.0)
+
+class TestRollupHandler:
+    def test_rollup_matches_full_scan(self, sample_db):
+        stats_handler = StatsHandler(sample_db)
+        expected = analyses(stats_handler)
+
+        report = RollupHandler(sample_db).refresh()
+        assert report['mode'] == 'full'
+        assert report['snapshots'] == 2
+        assert stats_handler.resolve_rollup(OVERALL) == rollup_table_name(OVERALL)
+        assert analyses(stats_handler) == expected
+        assert rollup_table_name(OVERALL) not in stats_handler.list_tables()
+        stats_handler.close()
+
+    def test_incremental_refresh(self, sample_db):
+        handler = RollupHandler(sample_db)
+        handler.refresh()
+        with handler._get_write_cursor() as cur:
+            # One row for an existing snapshot, one for a new snapshot
+            cur.execute(f"INSERT INTO {OVERALL} VALUES (3, '123456790', '2', '500', '1', '1', '1', '1')")
+            cur.execute(f"INSERT INTO {OVERALL} VALUES (5, '123456791', '0', '9000', '1', '1', '1', '1')")
+        assert handler.resolve_rollup(OVERALL) is None
+
+        report = handler.refresh()
+        assert report['mode'] == 'incremental'
+        assert report['source_rows'] == 2
+        assert report['snapshots'] == 3
+        with handler._get_cursor() as cur:
+            cur.execute(f'SELECT total_allocated, source_rows FROM "{rollup_table_name(OVERALL)}" '
+                        f"WHERE timestamp = '123456790'")
+            assert cur.fetchone() == (4500.0, 3)
+
+        handler.close()
+
+        stats_handler = StatsHandler(sample_db)
+        rolled = analyses(stats_handler)
+        stats_handler.use_rollups = False
+        assert rolled == analyses(stats_handler)
+        stats_handler.close()
+
+    def test_stale_rollup_is_ignored(self, sample_db):
+        handler = RollupHandler(sample_db)
+        handler.refresh()
+        with handler._get_write_cursor() as cur:
+            cur.execute(f"INSERT INTO {OVERALL} VALUES (5, '123456791', '0', '9000', '1', '1', '1', '1')")
+        handler.close()
+
+        stats_handler = StatsHandler(sample_db)
+        assert stats_handler.resolve_rollup(OVERALL) is None
+        assert stats_handler.analyze_memory_trends()[-1]['total_allocated'] == 9000.0
+        stats_handler.close()
+
+    def test_in_place_update_forces_full_rebuild(self, sample_db):
+        handler = RollupHandler(sample_db)
+        handler.refresh()
+        writer = sqlite3.connect(sample_db)
+        writer.execute(f"UPDATE {OVERALL} SET allocated = '999999' WHERE rowid = 1")
+        writer.commit()
+        writer.close()
+        assert handler.resolve_rollup(OVERALL) is None
+
+        report = handler.refresh()
+        assert report['mode'] == 'full'
+        handler.close()
+
+        stats_handler = StatsHandler(sample_db)
+        assert stats_handler.resolve_rollup(OVERALL) == rollup_table_name(OVERALL)
+        rolled = analyses(stats_handler)
+        assert rolled[0][0]['total_allocated'] == 1001999.0
+        stats_handler.use_rollups = False
+        assert rolled == analyses(stats_handler)
+        stats_handler.close()
+
+    def test_failed_rebuild_keeps_the_old_rollup(self, sample_db, monkeypatch):
+        handler = RollupHandler(sample_db)
+        handler.refresh()
+        # The rollup is dropped, then re-creating it fails
+        monkeypatch.setitem(ROLLUP_COLUMNS, 'source_rows', 'allocated')
+        with pytest.raises(sqlite3.OperationalError):
+            handler.refresh(rebuild=True)
+        handler.close()
+
+        stats_handler = StatsHandler(sample_db)
+        assert stats_handler.resolve_rollup(OVERALL) == rollup_table_name(OVERALL)
+        assert stats_handler.analyze_memory_trends()[-1]['total_allocated'] == 4000.0
+        stats_handler.close()
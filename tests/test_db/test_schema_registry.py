@@ -0,0 +1,39 @@
+# tests/test_db/test_schema_registry.py
+import json
+import pytest
+from src.db.schema_registry import SchemaRegistry
+
+OVERALL = {"columns": [{"name": "allocated", "type": "INTEGER"}], "primary_key": []}
+BINS = {"columns": [{"name": "bins", "type": "INTEGER"}], "primary_key": ["bins"]}
+
+class TestSchemaRegistry:
+    def test_arena_entries_collapse_to_template(self):
+        registry = SchemaRegistry({
+            "arenas-0__overall": OVERALL,
+            "arenas-1__overall": dict(OVERALL),
+            "stats-arenas-0__overall": OVERALL,
+        })
+        assert len(registry) == 2
+        # Arenas never listed in the schema file resolve through the template
+        assert registry.get("arenas-255__overall") == OVERALL
+        assert registry.get("stats-arenas-9__overall") == OVERALL
+
+    def test_differing_arena_schemas_stay_literal(self):
+        registry = SchemaRegistry({"arenas-0__bins_v0": BINS, "arenas-1__bins_v0": OVERALL})
+        assert registry.get("arenas-0__bins_v0") == BINS
+        assert registry.get("arenas-1__bins_v0") == OVERALL
+        assert registry.get("arenas-2__bins_v0") is None
+
+    def test_exact_then_pattern_lookup(self):
+        registry = SchemaRegistry({"merged.*__bins_v\\d": BINS, "merged_arena_stats__bins_v0": OVERALL})
+        assert registry.get("merged_arena_stats__bins_v0") == OVERALL
+        assert registry.get("merged_arena_stats__bins_v1") == BINS
+        with pytest.raises(ValueError):
+            registry.resolve("unknown_table")
+
+    def test_generated_schema_file_round_trips(self):
+        with open('config/table_schemas_gen.json') as f:
+            schemas = json.load(f)
+        registry = SchemaRegistry(schemas)
+        assert len(registry) < len(schemas)
+        assert all(registry.get(name) == schema for name, schema in schemas.items())
@@ -0,0 +1,46 @@
+# tests/test_db/test_stats_engine.py
+import sqlite3
+from src.db.stats_engine import compute_table_stats, format_stat
+from constants import *
+
+class TestStatsEngine:
+    def test_overall_table_metrics(self, sample_db):
+        conn = sqlite3.connect(sample_db)
+        columns, results, numeric_cols = compute_table_stats(conn.cursor(), f"merged_arena_stats{SECTION_TABLE_CON}overall")
+
+        assert 'allocated' in numeric_cols
+        assert 'timestamp' not in numeric_cols
+        # SUM/AVG/STD cover the earliest snapshot, percentiles the whole table
+        assert results['SUM']['allocated'] == 3000.0
+        assert results['AVG']['allocated'] == 1500.0
+        assert results['STD']['allocated'] == 500.0
+        assert results['P50']['allocated'] == 1500.0
+        assert results['P90']['allocated'] == 2000.0
+        assert results['P99']['allocated'] == 2000.0
+        assert results['P50']['timestamp'] == "123456789"
+        assert format_stat(results['SUM']['allocated'], True) == "3000.00"
+        assert format_stat(None, True) == "N/A"
+        conn.close()
+
+    def test_non_numeric_columns_are_skipped(self, sample_db):
+        conn = sqlite3.connect(sample_db)
+        conn.execute("CREATE TABLE labels (timestamp TEXT, label TEXT)")
+        conn.execute("INSERT INTO labels VALUES ('1', 'abc'), ('2', 'def')")
+        columns, results, numeric_cols = compute_table_stats(conn.cursor(), "labels")
+        assert numeric_cols == []
+        assert results['SUM']['label'] is None
+        conn.close()
+
+    def test_earliest_snapshot_across_chunks(self, sample_db):
+        conn = sqlite3.connect(sample_db)
+        conn.execute("CREATE TABLE snaps (timestamp, value INTEGER)")
+        conn.execute("INSERT INTO snaps VALUES (3, 10), (1, 20), (2, 30), (1, 40), (3, 50)")
+        # Timestamps of mixed types rank like SQLite orders them: NULL < numbers < text
+        conn.execute("CREATE TABLE mixed (timestamp, value INTEGER)")
+        conn.execute("INSERT INTO mixed VALUES ('b', 1), (10, 2), (NULL, NULL), ('a', 4), (10, 3), (2.5, 7), (2.5, 1)")
+        for table, total in (('snaps', 60.0), ('mixed', 8.0)):
+            cursor = conn.cursor()
+            cursor.arraysize = 2
+            _, results, _ = compute_table_stats(cursor, table)
+            assert results['SUM']['value'] == total
+        conn.close()
@@ -0,0 +1,84 @@
+# tests/test_db/test_streaming.py
+import sqlite3
+import pytest
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from src.analyzer.je_analyzer import JeAnalyzer
+from src.db.connection import ConnectionManager
+from src.db.stats_handler import StatsHandler
+from src.db.streaming import StreamingResult, iter_chunks, iter_rows
+from tests.helpers import make_config, TABLE_COUNT
+
+@pytest.fixture
+def numbers_conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE numbers (n INTEGER)")
+    conn.executemany("INSERT INTO numbers VALUES (?)", [(i,) for i in range(25)])
+    yield conn
+    conn.close()
+
+class TestStreaming:
+    def test_chunks_follow_arraysize(self, numbers_conn):
+        cursor = numbers_conn.execute("SELECT n FROM numbers ORDER BY n")
+        assert [len(chunk) for chunk in iter_chunks(cursor, 10)] == [10, 10, 5]
+        cursor = numbers_conn.execute("SELECT n FROM numbers ORDER BY n")
+        cursor.arraysize = 7
+        assert [row[0] for row in iter_rows(cursor)] == list(range(25))
+
+    def test_streaming_result_is_lazy_and_closes_its_cursor(self, numbers_conn):
+        cursor = numbers_conn.cursor()
+        cursor.execute("SELECT n FROM numbers ORDER BY n")
+        result = StreamingResult(cursor, arraysize=10)
+        assert result.columns == ['n']
+        chunks = result.chunks()
+        assert len(next(chunks)) == 10
+        assert [len(chunk) for chunk in chunks] == [10, 5]
+        with pytest.raises(sqlite3.ProgrammingError):
+            cursor.fetchone()
+
+    def test_handlers_use_profile_arraysize(self, sample_db):
+        connection = ConnectionManager(sample_db, profile={'arraysize': 3})
+        handler = StatsHandler(sample_db, connection)
+        result = handler.execute_query("SELECT * FROM je_metadata", stream=True)
+        assert isinstance(result['data'], StreamingResult)
+        assert result['data'].arraysize == 3
+        rows = list(result['data'])
+        assert rows == handler.execute_query("SELECT * FROM je_metadata")['data']
+        connection.close()
+
+    def test_analysis_stream_matches_analyze(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(1))
+        streamed = [{'columns': r['columns'], 'data': list(r['data'])} for r in analyzer.stream('extents')]
+        assert len(streamed) == TABLE_COUNT
+        assert streamed == analyzer.analyze('extents')
+        analyzer.close()
+
+    def test_text_mode_streams_without_result_cache(self, arena_tables_db, capsys):
+        db_path, schema_path = arena_tables_db
+        config = dict(make_config(1), schema_path=schema_path)
+        analyzer = JeAnalyzer(db_path, config)
+        expected = analyzer.generic_analyzer.analyze('extents')
+        # Materialized results are only built for the result cache
+        analyzer.generic_analyzer._run_queries = None
+        capsys.readouterr()
+        analyzer.analyze('^extents$')
+        out = capsys.readouterr().out
+        assert out.count('| extents') == TABLE_COUNT
+        assert all(f"{row[1]:,}" in out for result in expected for row in result['data'])
+        analyzer.close()
+
+    def test_arena_comparison_streams(self, sample_db):
+        config = {'analyses': {'arena_comparison': {
+            'table': 'unused', 'special': 'arena_pattern',
+            'metrics': [{'name': 'total_allocated', 'operation': 'sum', 'column': 'allocated'}]}}}
+        conn = sqlite3.connect(sample_db)
+        for arena in range(3):
+            conn.execute(f'CREATE TABLE "arenas-{arena}__overall" (timestamp TEXT, allocated TEXT)')
+            conn.execute(f'INSERT INTO "arenas-{arena}__overall" VALUES (\'123456789\', ?)', (str(arena + 1),))
+        conn.commit()
+        conn.close()
+        analyzer = GenericAnalyzer(sample_db, 'config/table_schemas_gen.json', config)
+        [streamed] = analyzer.stream('arena_comparison')
+        assert isinstance(streamed['data'], StreamingResult)
+        assert {'columns': streamed['columns'], 'data': list(streamed['data'])} == analyzer.analyze('arena_comparison')
+        analyzer.close()
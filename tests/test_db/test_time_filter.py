@@ -0,0 +1,95 @@
+# tests/test_db/test_time_filter.py
+import sqlite3
+import pytest
+from src.analyzer.generic_analyzer import GenericAnalyzer
+from src.db.time_filter import TimeFilter, parse_duration, TIMESTAMP_UNITS_PER_SECOND
+from tests.helpers import make_config, TABLE_COUNT
+
+MINUTE = 60 * TIMESTAMP_UNITS_PER_SECOND
+BASE = 1_700_000_000_000_000_000
+SNAPSHOTS = 100
+
+@pytest.fixture
+def snapshots_conn():
+    """One row per minute for SNAPSHOTS minutes, timestamps stored as TEXT like the raw tables"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE je_metadata (id INTEGER PRIMARY KEY, timestamp TEXT)")
+    conn.execute("CREATE TABLE samples (metadata_id INTEGER, timestamp TEXT, value INTEGER)")
+    conn.execute("CREATE TABLE by_meta (metadata_id INTEGER, value INTEGER)")
+    for i in range(SNAPSHOTS):
+        ts = str(BASE + i * MINUTE)
+        conn.execute("INSERT INTO je_metadata VALUES (?, ?)", (i + 1, ts))
+        conn.execute("INSERT INTO samples VALUES (?, ?, ?)", (i + 1, ts, i))
+        conn.execute("INSERT INTO by_meta VALUES (?, ?)", (i + 1, i))
+    yield conn
+    conn.close()
+
+def _selected(conn, time_filter, table='samples', columns=('metadata_id', 'timestamp', 'value')):
+    condition = time_filter.table_condition(f'"{table}"', columns)
+    rows = conn.execute(f'SELECT value FROM "{table}" WHERE {condition} ORDER BY value', time_filter.params)
+    return [row[0] for row in rows]
+
+class TestTimeFilter:
+    def test_durations(self):
+        assert parse_duration('90s') == 90 * TIMESTAMP_UNITS_PER_SECOND
+        assert parse_duration('1.5h') == 90 * MINUTE
+        assert parse_duration('123456789') is None
+
+    def test_of(self):
+        assert TimeFilter.of(None) is None
+        assert TimeFilter.of(TimeFilter()) is None
+        assert TimeFilter.of('123').params == ('123',)
+
+    def test_ranges(self, snapshots_conn):
+        assert _selected(snapshots_conn, TimeFilter(since='10m')) == list(range(89, 100))
+        assert _selected(snapshots_conn, TimeFilter(since=str(BASE + 5 * MINUTE), until=str(BASE + 7 * MINUTE))) == [5, 6, 7]
+        assert _selected(snapshots_conn, TimeFilter(until='95m')) == [0, 1, 2, 3, 4]
+        assert _selected(snapshots_conn, TimeFilter(timestamp=str(BASE + 3 * MINUTE))) == [3]
+
+    def test_sampling(self, snapshots_conn):
+        assert _selected(snapshots_conn, TimeFilter(every_nth=25)) == [0, 25, 50, 75]
+        assert _selected(snapshots_conn, TimeFilter(since='30m', every_nth=10)) == [69, 79, 89, 99]
+        # BASE is not on a 15-minute boundary, so the first interval is short
+        resampled = _selected(snapshots_conn, TimeFilter(resample='15m'))
+        assert resampled[0] == 0 and all(b - a == 15 for a, b in zip(resampled[1:], resampled[2:]))
+        with pytest.raises(ValueError):
+            TimeFilter(every_nth=2, resample='1m')
+
+    def test_mixed_width_timestamps_compare_as_integers(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE samples (timestamp TEXT, value INTEGER)")
+        # As text, '999' sorts after '1000' and '10000'
+        for value, ts in enumerate((980, 999, 1000, 1010, 10000)):
+            conn.execute("INSERT INTO samples VALUES (?, ?)", (str(ts), value))
+        columns = ('timestamp', 'value')
+        assert _selected(conn, TimeFilter(since='8990ns'), 'samples', columns) == [3, 4]
+        assert _selected(conn, TimeFilter(since='995', until='1000'), 'samples', columns) == [1, 2]
+        assert _selected(conn, TimeFilter(every_nth=2), 'samples', columns) == [0, 2, 4]
+        assert _selected(conn, TimeFilter(resample=20), 'samples', columns) == [0, 2, 4]
+        conn.close()
+        with pytest.raises(ValueError):
+            TimeFilter(since='yesterday')
+
+    def test_tables_without_timestamp_go_through_metadata(self, snapshots_conn):
+        time_filter = TimeFilter(since='10m', every_nth=5)
+        expected = _selected(snapshots_conn, time_filter)
+        assert _selected(snapshots_conn, time_filter, 'by_meta', ('metadata_id', 'value')) == expected
+        assert time_filter.table_condition('"x"', ('value',)) is None
+
+    def test_condition_text_depends_only_on_shape(self):
+        first, second = TimeFilter(since='1h', every_nth=2), TimeFilter(since='3h', every_nth=7)
+        assert first.shape == second.shape
+        assert first.condition('timestamp', '"t"') == second.condition('timestamp', '"t"')
+        assert first.params != second.params
+
+    def test_analyses_share_templates_across_windows(self, arena_tables_db):
+        db_path, schema_path = arena_tables_db
+        analyzer = GenericAnalyzer(db_path, schema_path, make_config(1))
+        everything = analyzer.analyze('extents')
+        assert analyzer.analyze('extents', TimeFilter(since='123456789')) == everything
+        assert analyzer.analyze('extents', TimeFilter(since='1h')) == everything
+        assert all(not result['data'] for result in analyzer.analyze('extents', TimeFilter(since='123456790')))
+        assert len(analyzer.analyze('extents', TimeFilter(every_nth=3))) == TABLE_COUNT
+        # One template per option shape: unfiltered, absolute since, relative since, every-nth
+        assert len(analyzer._query_templates) == 4
+        analyzer.close()
@@ -0,0 +1,83 @@
+# tests/test_server.py
+import json
+import os
+import stat
+import threading
+import pytest
+from src.cli import build_parser, run
+from src.analyzer.je_analyzer import JeAnalyzer
+from src.server import AnalysisServer, query, token_path, _UnixHTTPConnection
+from tests.helpers import make_config
+
+ANALYSIS_ARGS = ['--mode', 'extents']
+
+@pytest.fixture
+def server(arena_tables_db, tmp_path):
+    """An AnalysisServer on a Unix socket, serving from its own thread like `je-analyze serve`"""
+    db_path, schema_path = arena_tables_db
+    config = dict(make_config(1), schema_path=schema_path)
+    socket = str(tmp_path / "je.sock")
+    ready, holder = threading.Event(), []
+
+    def serve():
+        # SQLite connections stay on the thread that opened them
+        holder.append(AnalysisServer(JeAnalyzer(db_path, config), build_parser(), run, socket=socket))
+        ready.set()
+        holder[0].serve()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    assert ready.wait(10)
+    yield db_path, config, socket, holder[0]
+    holder[0].shutdown()
+    thread.join()
+
+class TestServer:
+    def test_answers_like_the_cli(self, server, capsys):
+        db_path, config, socket, _ = server
+        analyzer = JeAnalyzer(db_path, config)
+        capsys.readouterr()
+        run(analyzer, build_parser().parse_args([db_path, *ANALYSIS_ARGS]))
+        expected = capsys.readouterr().out
+        analyzer.close()
+
+        first = query(db_path, ANALYSIS_ARGS, socket=socket)
+        second = query(db_path, ANALYSIS_ARGS, socket=socket)
+        assert first['status'] == second['status'] == 0
+        assert first['stdout'] == second['stdout'] == expected
+        assert "| extents | dirty |" in expected
+
+    def test_errors_are_replies(self, server, tmp_path):
+        db_path, _, socket, analysis = server
+        response = query(db_path, ['--no-such-option'], socket=socket)
+        assert response['status'] == 2 and 'unrecognized arguments' in response['stderr']
+        response = query(str(tmp_path / "other.db"), ANALYSIS_ARGS, socket=socket, token=analysis.token)
+        assert response['status'] == 1 and 'Error:' in response['stdout']
+        response = query(db_path, ['--jobs', '4', '--list-tables'], socket=socket)
+        assert response['status'] == 0 and 'ignoring --jobs' in response['stderr']
+        assert analysis.requests == 3
+
+    def test_refuses_a_live_socket(self, server):
+        db_path, config, socket, analysis = server
+        with pytest.raises(ValueError):
+            AnalysisServer(JeAnalyzer(db_path, config), build_parser(), run, socket=socket)
+        assert query(db_path, ['--list-tables'], socket=socket)['status'] == 0
+
+    def test_only_the_owner_is_served(self, server, tmp_path):
+        db_path, _, socket, analysis = server
+        assert stat.S_IMODE(os.stat(socket).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(token_path(db_path)).st_mode) == 0o600
+        output = str(tmp_path / "pwned.csv")
+        body = json.dumps({'args': ['--list-tables', '--output-format', 'csv', '--output', output], 'cwd': '/'})
+        authorized = f"Bearer {analysis.token}"
+        for headers, code in [({'Content-Type': 'application/json'}, 401),
+                              ({'Content-Type': 'application/json', 'Authorization': 'Bearer guess'}, 401),
+                              ({'Content-Type': 'text/plain', 'Authorization': authorized}, 415),
+                              ({'Content-Type': 'application/json', 'Authorization': authorized,
+                                'Origin': 'https://evil.example'}, 403)]:
+            conn = _UnixHTTPConnection(socket)
+            conn.request('POST', '/analyze', body, headers)
+            assert conn.getresponse().status == code
+            conn.close()
+        assert not os.path.exists(output)
+        assert analysis.requests == 0
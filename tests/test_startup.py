@@ -0,0 +1,36 @@
+# tests/test_startup.py
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'pandas', 'numpy']
+# Cold-start budget for non-plotting CLI invocations (interpreter start included)
+STARTUP_BUDGET_SECONDS = 1.0
+
+def _run_cli(*args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-m', 'src.cli', *args],
+                          cwd=REPO_ROOT, capture_output=True, text=True)
+    return proc, time.perf_counter() - start
+
+class TestStartup:
+    def test_cli_import_skips_heavy_modules(self):
+        code = ("import sys, src.cli; "
+                f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        proc = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True)
+        assert proc.returncode == 0, proc.stderr
+        assert proc.stdout.strip() == ''
+
+    def test_list_tables_cold_start_budget(self, sample_db):
+        proc, elapsed = _run_cli(sample_db, '--list-tables')
+        assert proc.returncode == 0, proc.stdout + proc.stderr
+        assert 'je_metadata' in proc.stdout
+        assert elapsed < STARTUP_BUDGET_SECONDS
+
+    def test_meta_mode_cold_start_budget(self, sample_db):
+        proc, elapsed = _run_cli(sample_db, '--mode', 'meta')
+        assert proc.returncode == 0, proc.stdout + proc.stderr
+        assert 'Metadata Summary' in proc.stdout
+        assert elapsed < STARTUP_BUDGET_SECONDS
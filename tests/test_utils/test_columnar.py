@@ -0,0 +1,46 @@
+# tests/test_utils/test_columnar.py
+import json
+import math
+import random
+from src.utils.columnar import ColumnarResult
+
+def _sorted_top(values, k):
+    """Reference: indices of sorted(..., reverse=True)[:k], NULL/NaN last"""
+    key = lambda i: -math.inf if values[i] is None or values[i] != values[i] else values[i]
+    return sorted(range(len(values)), key=key, reverse=True)[:k]
+
+class TestColumnarResult:
+    def test_is_the_plain_result_dict(self):
+        result = ColumnarResult(['bins', 'pages'], [(0, 3), (1, 5)])
+        assert result == {'columns': ['bins', 'pages'], 'data': [(0, 3), (1, 5)]}
+        assert json.loads(json.dumps(result)) == {'columns': ['bins', 'pages'], 'data': [[0, 3], [1, 5]]}
+        assert result.index == {'bins': 0, 'pages': 1}
+        assert result.num_rows == 2
+        assert result.row(1) == {'bins': 1, 'pages': 5}
+        assert ColumnarResult.from_result(result) is result
+
+    def test_totals_ignore_nulls(self):
+        result = ColumnarResult(['a', 'b'], [(1, 0.5), (2, None), (3, 1.5)])
+        assert result.total('a') == 6 and isinstance(result.total('a'), int)
+        assert result.total('b') == 2.0
+
+    def test_top_k_matches_sorted_with_ties(self):
+        rng = random.Random(0)
+        values = [rng.randrange(20) for _ in range(500)]
+        result = ColumnarResult(['v'], [(v,) for v in values])
+        for k in (0, 1, 5, 37, 500, 600):
+            assert result.top_k('v', k) == _sorted_top(values, k)
+
+    def test_top_k_of_expression_and_nan(self):
+        rows = [(1.0, 2.0), (None, 1.0), (3.0, 0.5), (2.0, 2.0), (float('nan'), 9.0)]
+        result = ColumnarResult(['x', 'y'], rows)
+        assert result.top_k('x', 5) == _sorted_top([r[0] for r in rows], 5)
+        # y + extra = [4.0, 1.0, 3.5, 4.0, 9.0]: the tie keeps row order
+        assert result.top_k(result.column('y') + [2.0, 0.0, 3.0, 2.0, 0.0], 3) == [4, 0, 3]
+
+    def test_top_k_of_text_column(self):
+        names = ['small', None, 'large', 'medium', 'large']
+        result = ColumnarResult(['name'], [(name,) for name in names])
+        assert result.column('name').dtype.kind == 'O'
+        assert result.top_k('name', 3) == [0, 3, 2]
+        assert result.top_k('name', 5) == [0, 3, 2, 4, 1]
@@ -0,0 +1,46 @@
+# tests/test_utils/test_downsample.py
+import sqlite3
+import numpy as np
+from src.db.display_handler import DisplayHandler
+from src.utils.downsample import lttb
+
+def _series(n, spike_at):
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 50.0)
+    y[spike_at] = 25.0
+    return x, y
+
+class TestLTTB:
+    def test_small_series_are_kept(self):
+        assert lttb([0, 1, 2], [5, 6, 7], 10).tolist() == [0, 1, 2]
+
+    def test_keeps_endpoints_and_spikes(self):
+        x, y = _series(10000, 7321)
+        keep = lttb(x, y, 200)
+        assert len(keep) == 200
+        assert keep[0] == 0 and keep[-1] == 9999
+        assert np.all(np.diff(keep) > 0)
+        assert 7321 in keep
+
+class TestSeriesPoints:
+    def test_buckets_in_sql(self, tmp_path):
+        db_path = str(tmp_path / "series.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE series (timestamp TEXT, arena INTEGER, value TEXT)")
+        x, y = _series(5000, 4321)
+        # Two rows per x: points are the per-x sums
+        conn.executemany("INSERT INTO series VALUES (?, ?, ?)",
+                         [(str(int(t)), arena, str(v / 2)) for t, v in zip(x, y) for arena in (0, 1)])
+        conn.commit()
+        conn.close()
+        handler = DisplayHandler(db_path)
+        points, total, width = handler.series_points('series', 'timestamp', 'value', 100)
+        assert total == 5000
+        assert width == 4999 / 100
+        assert len(points) <= 2 * 101 + 2
+        assert max(value for _, value in points) == 25.0
+        assert points[0][0] == '0' and points[-1][0] == '4999'
+
+        points, total, width = handler.series_points('series', 'timestamp', 'value', 10000)
+        assert len(points) == total == 5000 and width is None
+        handler.close()
@@ -0,0 +1,100 @@
+# tests/test_utils/test_exporter.py
+import csv
+import json
+import pytest
+from src.analyzer.je_analyzer import JeAnalyzer, load_config
+from src.utils import exporter as exporter_module
+from src.utils.exporter import ResultExporter, RESULT_COLUMN
+from tests.helpers import make_config, TABLE_COUNT
+from constants import *
+
+class TestResultExporter:
+    def test_csv_repeats_header_when_columns_change(self, tmp_path):
+        path = str(tmp_path / "out.csv")
+        exporter = ResultExporter('csv', path)
+        assert exporter.write('a', ['x', 'y'], iter([(1, 'one'), (2, None)])) == 2
+        exporter.write('b', ['x', 'y'], [(3, 'three')])
+        exporter.write('c', ['z'], [(1.5,)])
+        exporter.close()
+        with open(path, newline='') as f:
+            assert list(csv.reader(f)) == [
+                [RESULT_COLUMN, 'x', 'y'], ['a', '1', 'one'], ['a', '2', ''], ['b', '3', 'three'],
+                [RESULT_COLUMN, 'z'], ['c', '1.5'],
+            ]
+
+    def test_jsonl_streams_in_batches(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(exporter_module, 'EXPORT_BATCH_ROWS', 3)
+        path = str(tmp_path / "out.jsonl")
+        exporter = ResultExporter('jsonl', path)
+
+        def rows():
+            for i in range(10):
+                yield (i, b'\x01')
+        assert exporter.write('t', ['i', 'blob'], rows()) == 10
+        exporter.close()
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        assert records[0] == {RESULT_COLUMN: 't', 'i': 0, 'blob': '01'}
+        assert [r['i'] for r in records] == list(range(10))
+
+    def test_columnar_formats_need_a_directory(self):
+        with pytest.raises(ValueError):
+            ResultExporter('parquet')
+        with pytest.raises(ValueError):
+            ResultExporter('xml', 'out')
+
+    def test_parquet_one_file_per_result(self, tmp_path, monkeypatch):
+        pq = pytest.importorskip("pyarrow.parquet")
+        monkeypatch.setattr(exporter_module, 'EXPORT_BATCH_ROWS', 4)
+        exporter = ResultExporter('parquet', str(tmp_path))
+        exporter.write('arenas-0__bins', ['i', 'v'], ((i, i / 2) for i in range(10)))
+        exporter.write('empty', ['i'], [])
+        table = pq.read_table(str(tmp_path / "arenas-0__bins.parquet"))
+        assert table.column('i').to_pylist() == list(range(10))
+        assert pq.read_table(str(tmp_path / "empty.parquet")).num_rows == 0
+
+    def test_parquet_mixed_types_are_exported_as_text(self, tmp_path, monkeypatch):
+        pq = pytest.importorskip("pyarrow.parquet")
+        monkeypatch.setattr(exporter_module, 'EXPORT_BATCH_ROWS', 2)
+        exporter = ResultExporter('parquet', str(tmp_path))
+        rows = [(1, None), ('two', None), (3, 5), (4.5, 'six')]
+        assert exporter.write('mixed', ['v', 'late'], iter(rows)) == 4
+        table = pq.read_table(str(tmp_path / "mixed.parquet"))
+        assert table.column('v').to_pylist() == ['1', 'two', '3', '4.5']
+        assert table.column('late').to_pylist() == [None, None, '5', 'six']
+        with pytest.raises(ValueError):
+            exporter.write('changes', ['v'], iter([(1,), (2,), ('three',)]))
+
+    def test_analyzer_exports_analysis_results(self, arena_tables_db, tmp_path, capsys):
+        db_path, schema_path = arena_tables_db
+        analyzer = JeAnalyzer(db_path, dict(make_config(1), schema_path=schema_path))
+        analyzer.exporter = ResultExporter('jsonl')
+        analyzer.analyze('^extents$')
+        analyzer.close()
+        # Only data on stdout; progress goes to stderr
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert len(records) == TABLE_COUNT * 5
+        assert set(records[0]) == {RESULT_COLUMN, 'extents', 'dirty'}
+
+    def test_every_mode_keeps_stdout_parseable(self, sample_db, capsys):
+        analyzer = JeAnalyzer(sample_db)
+        capsys.readouterr()
+        analyzer.exporter = ResultExporter('jsonl')
+        analyzer.analyze('arena|meta|report|bins')
+        analyzer.exporter.close()
+        analyzer.close()
+        out, err = capsys.readouterr()
+        records = [json.loads(line) for line in out.splitlines()]
+        assert {'arena', 'report.memory_trends', 'report.summary'} <= {r[RESULT_COLUMN] for r in records}
+        assert "Unknown mode: bins" in err and "not exported" in err
+
+    def test_stats_export_is_numeric(self, sample_db, capsys):
+        analyzer = JeAnalyzer(sample_db, dict(load_config('config/analyzer_config.json'), jobs=1))
+        capsys.readouterr()
+        analyzer.exporter = ResultExporter('jsonl')
+        analyzer.analyze('stats', f"merged_arena_stats{SECTION_TABLE_CON}overall")
+        analyzer.exporter.close()
+        analyzer.close()
+        records = {r['metric']: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+        assert records['SUM']['allocated'] == 3000.0
+        assert records['P90']['allocated'] == 2000.0
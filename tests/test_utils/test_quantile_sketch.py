@@ -0,0 +1,36 @@
+# tests/test_utils/test_quantile_sketch.py
+import numpy as np
+from src.utils.quantile_sketch import KLLSketch
+
+def _rank(sorted_values, value):
+    return np.searchsorted(sorted_values, value) / len(sorted_values)
+
+class TestKLLSketch:
+    def test_rank_error_within_bound(self):
+        data = np.random.default_rng(0).lognormal(size=200000)
+        sketch = KLLSketch(epsilon=0.01, seed=1)
+        for start in range(0, len(data), 5000):
+            sketch.update(data[start:start + 5000])
+
+        sorted_data = np.sort(data)
+        for q in (0.5, 0.9, 0.99):
+            assert abs(_rank(sorted_data, sketch.quantile(q)) - q) < 0.02
+        assert sketch.count == len(data)
+        assert sketch.max == sorted_data[-1]
+
+    def test_merge_and_round_trip(self):
+        data = np.random.default_rng(2).normal(size=100000)
+        left, right = KLLSketch(0.01, seed=3), KLLSketch(0.01, seed=4)
+        left.update(data[:50000])
+        right.update(data[50000:])
+        merged = KLLSketch.from_dict(left.merge(right).to_dict())
+
+        assert merged.count == len(data)
+        assert abs(_rank(np.sort(data), merged.quantile(0.5)) - 0.5) < 0.02
+
+    def test_empty_and_nan_values(self):
+        sketch = KLLSketch()
+        assert sketch.quantile(0.5) is None
+        sketch.update([np.nan, 3.0, np.nan])
+        assert sketch.count == 1
+        assert sketch.quantile(0.5) == 3.0
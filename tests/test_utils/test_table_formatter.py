@@ -0,0 +1,44 @@
+# tests/test_utils/test_table_formatter.py
+import io
+from src.utils.table_formatter import TableFormatter
+
+VALUES = [None, 0, -5, 12345678, 1.5, 0.1 + 0.2, 1e20, 'abc', '123', '1.25', '', b'ab']
+
+def _reference_lines(headers, rows, limit_col=15):
+    """Table as formatted cell by cell with get_printed_cell"""
+    str_rows = [[str(cell) if cell is not None else '' for cell in row[:limit_col]] for row in rows]
+    headers = headers[:limit_col]
+    cells = [[TableFormatter.get_printed_cell(str(cell)) for cell in row] for row in [headers] + str_rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    separator = "+" + "".join("-" * (width + 2) + "+" for width in widths)
+    lines = [TableFormatter.format_line(row, widths) for row in cells]
+    return [separator, lines[0], separator] + lines[1:] + [separator]
+
+class TestTableFormatter:
+    def test_cell_formatter_matches_get_printed_cell(self):
+        format_cell = TableFormatter.cell_formatter()
+        for value in VALUES:
+            expected = '' if value is None else TableFormatter.get_printed_cell(str(value))
+            assert format_cell(value) == expected
+
+    def test_matches_reference_layout(self):
+        headers = ['a', 'b', '1000']
+        rows = [[VALUES[(i * 7 + j) % len(VALUES)] for j in range(3)] for i in range(50)]
+        lines = list(TableFormatter.iter_table_lines(headers, rows))
+        assert lines == _reference_lines(headers, rows)
+        assert list(TableFormatter.iter_table_lines(headers, rows, limit_col=2)) == _reference_lines(headers, rows, 2)
+
+    def test_streams_rows_past_the_width_sample(self):
+        rows = ((i, f"name{i}") for i in range(25))
+        lines = list(TableFormatter.iter_table_lines(['id', 'name'], rows, sample_rows=10))
+        assert len(lines) == 25 + 4
+        # Widths come from the first 10 rows; wider later values widen only their line
+        assert lines[3] == "| 0  | name0 |"
+        assert lines[-2] == "| 24 | name24 |"
+
+    def test_write_table_in_chunks(self):
+        out = io.StringIO()
+        TableFormatter.write_table(['id'], ([i] for i in range(2000)), out=out)
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 2000 + 4
+        assert lines[-2] == "| 1,999 |"